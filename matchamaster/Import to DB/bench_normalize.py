@@ -0,0 +1,141 @@
+# bench_normalize.py
+# ------------------------------------------------------------
+# Microbenchmark normalize_and_select (jalur --legacy importer):
+# versi vektor sekarang vs versi lama per-sel (Series.map), plus cek hasil sama.
+# Data sintetis: string ber-spasi, sel kosong/NaN, angka tidak valid, header beda kapitalisasi.
+#
+#   python bench_normalize.py                    # 100rb dan 1jt baris
+#   python bench_normalize.py --rows 50000       # ukuran lain (boleh berulang)
+#   python bench_normalize.py --no-check         # lewati pembandingan hasil
+#
+# Tidak butuh DB.
+# ------------------------------------------------------------
+
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+import import_excel_to_postgres as imp
+
+def normalize_and_select_rowwise(df):
+    """Implementasi lama (per-sel), dipakai sebagai acuan hasil & waktu."""
+    rename_map = {}
+    for excel_col, pg_col in imp.COLUMN_MAP.items():
+        for c in df.columns:
+            if c.lower() == excel_col.lower():
+                rename_map[c] = pg_col
+                break
+    df = df.rename(columns=rename_map)
+    for col in imp.TARGET_COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df = df[imp.TARGET_COLUMNS].copy()
+
+    str_cols = [c for c in imp.TARGET_COLUMNS if c not in ("latitude", "longitude", "tahap")]
+    for c in str_cols:
+        df[c] = df[c].map(imp.clean_str)
+    def to_float_in_range(x):
+        # batas nilai sama dengan float_col (di luar jangkauan double precision -> None / 0)
+        f = imp.to_float_or_none(x)
+        if f is None or not abs(f) < imp.FLOAT_MAX:
+            return None
+        return 0.0 if abs(f) < imp.FLOAT_TINY else f
+    df["latitude"] = df["latitude"].map(to_float_in_range)
+    df["longitude"] = df["longitude"].map(to_float_in_range)
+
+    def to_int_or_none(x):
+        if x is None:
+            return None
+        s = str(x).strip()
+        if s == "":
+            return None
+        try:
+            f = float(s)
+        except:
+            return None
+        return int(f) if abs(f) < imp.INT_LIMIT else None
+    df["tahap"] = df["tahap"].map(to_int_or_none)
+
+    missing_idsbr = df["idsbr"].isna().sum()
+    if missing_idsbr > 0:
+        df = df[~df["idsbr"].isna()]
+    return df
+
+# Kolom kode/kategori: sedikit nilai berbeda; sisanya teks bebas / koordinat yang hampir unik
+LOW_CARD = {"tahap", "proses", "status", "kdprov", "kdkab", "kdkec", "kddesa", "kodepos",
+            "jenis_kepemilikan_usaha", "bentuk_badan_usaha", "tahun_berdiri", "jaringan_usaha",
+            "sektor_institusi", "kategori", "kbli", "sumber_profiling"}
+BLANKS = ["", "   ", None, np.nan]
+# Nilai angka yang tidak valid / batas: semua harus sama hasilnya dengan float() per sel
+NUM_ODD = ["abc", "nan", "None", "NULL", "inf", "-Infinity", "1_000", "-0", "12,5", "1e-3", " 3 ",
+           "1e400", "1e-400", "2e-320"]
+TAHAP_VALUES = ["1", "2", " 3 ", "2.0", "2.9", "x", "inf", "-1.5", "1e2", "20240101", "3e9"]
+POOL = 50_000   # objek string dipakai ulang agar 1jt baris x 31 kolom muat di RAM
+
+def _pool(values):
+    arr = np.empty(len(values), dtype=object)
+    arr[:] = values
+    return arr
+
+def synthetic_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = {}
+    for excel_col, pg_col in imp.COLUMN_MAP.items():
+        header = excel_col.upper() if pg_col == "kdprov" else excel_col   # header beda kapitalisasi
+        if pg_col == "idsbr":
+            ids = np.char.add("1", np.arange(n).astype(str)).astype(object)
+            ids[rng.random(n) < 0.01] = None
+            cols[header] = ids
+            continue
+        if pg_col == "tahap":
+            vocab = TAHAP_VALUES
+        elif pg_col in ("latitude", "longitude"):
+            vocab = [f"{v:.6f}" for v in rng.uniform(-11, 141, POOL)] + NUM_ODD
+        elif pg_col in LOW_CARD:
+            vocab = [f"{pg_col[:3].upper()}{i:02d}" for i in range(40)] + [" KODE SPASI "]
+        else:
+            vocab = [f"{pg_col} {i}" + ("  " if i % 10 == 0 else "") for i in range(POOL)]
+        pool = _pool(vocab + BLANKS)
+        # ~5% sel kosong, sisanya seragam atas kosakata
+        idx = rng.integers(0, len(vocab), n)
+        blank = rng.random(n) < 0.05
+        idx[blank] = len(vocab) + rng.integers(0, len(BLANKS), int(blank.sum()))
+        cols[header] = pool[idx]
+    cols["kolom_lain"] = np.full(n, "abaikan", dtype=object)
+    return pd.DataFrame(cols)
+
+def same_output(old, new):
+    if list(old.columns) != list(new.columns) or not old.index.equals(new.index):
+        return False, "kolom/index beda"
+    for c in old.columns:
+        a = old[c].astype(object).where(old[c].notna(), None).tolist()
+        b = new[c].tolist()
+        if a != b:
+            i = next(i for i, (x, y) in enumerate(zip(a, b)) if x != y)
+            return False, f"kolom {c} baris {i}: {a[i]!r} != {b[i]!r}"
+    return True, ""
+
+def timed(fn, df):
+    t0 = time.perf_counter()
+    out = fn(df.copy(deep=False))
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="Microbenchmark normalize_and_select: vektor vs per-sel")
+    ap.add_argument("--rows", type=int, action="append", help="Jumlah baris (default 100000 dan 1000000)")
+    ap.add_argument("--no-check", action="store_true", help="Jangan bandingkan hasil kedua versi")
+    args = ap.parse_args()
+
+    imp.print = lambda *a, **k: None     # bungkam peringatan idsbr kosong di normalize_and_select
+    print(f"{'baris':>9} {'per-sel s':>10} {'vektor s':>10} {'speedup':>8}  hasil")
+    for n in args.rows or [100_000, 1_000_000]:
+        df = synthetic_frame(n)
+        old, t_old = timed(normalize_and_select_rowwise, df)
+        new, t_new = timed(imp.normalize_and_select, df)
+        ok, why = (True, "-") if args.no_check else same_output(old, new)
+        print(f"{n:>9} {t_old:>10.2f} {t_new:>10.2f} {t_old / max(t_new, 1e-9):>7.1f}x  "
+              f"{'sama' if ok else 'BEDA: ' + why}")
+
+if __name__ == "__main__":
+    main()
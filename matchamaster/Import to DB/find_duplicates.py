@@ -1,66 +1,52 @@
-import os
-import pandas as pd
-from dotenv import load_dotenv
+# find_duplicates.py
+# ------------------------------------------------------------
+# Cek IDSBR ganda secara offline (tanpa DB), sebelum import.
+# import_excel_to_postgres.py sudah menyelesaikan duplikat & menulis laporan yang sama
+# saat import; script ini hanya untuk memeriksa file dulu tanpa koneksi database.
+#
+#   python find_duplicates.py                          # EXCEL_PATH / SHEET_NAME dari .env
+#   python find_duplicates.py master.csv --dedup complete
+#   python find_duplicates.py "kab_*.xlsx" --sheet "*"   # duplikat lintas file/sheet
+#
+# Baca file sekali secara streaming (reader yang sama dengan importer).
+# ------------------------------------------------------------
 
-load_dotenv()
+import argparse
 
-EXCEL_PATH = os.getenv("EXCEL_PATH", "master.xlsx")
-SHEET_NAME = os.getenv("SHEET_NAME", None)  # None = sheet aktif
-
-def clean_str(x):
-    if x is None:
-        return None
-    # pandas baca NaN sebagai float nan
-    if isinstance(x, float) and pd.isna(x):
-        return None
-    s = str(x).strip()
-    return s if s != "" else None
+import import_excel_to_postgres as imp
 
 def main():
-    print(f"📊 Membaca Excel {EXCEL_PATH}...")
-    df = pd.read_excel(EXCEL_PATH, sheet_name=SHEET_NAME, dtype=str)
-    
-    # Normalisasi nama kolom
-    df.columns = [c.strip().lower() for c in df.columns]
-    
-    # Pastikan kolom yang diperlukan ada
-    required_cols = ['idsbr', 'nama_usaha']
-    for col in required_cols:
-        if col not in df.columns:
-            # Coba cari kolom dengan nama serupa
-            for c in df.columns:
-                if col in c.lower():
-                    df[col] = df[c]
-                    break
-            if col not in df.columns:
-                print(f"❌ Kolom {col} tidak ditemukan!")
-                return
-    
-    # Bersihkan data
-    df['idsbr'] = df['idsbr'].map(clean_str)
-    df['nama_usaha'] = df['nama_usaha'].map(clean_str)
-    
-    # Hapus baris dengan idsbr kosong
-    df = df[~df['idsbr'].isna()]
-    
-    # Identifikasi duplikat berdasarkan idsbr
-    duplicates = df[df.duplicated('idsbr', keep=False)].sort_values('idsbr')
-    
-    if len(duplicates) == 0:
-        print("✅ Tidak ada duplikat idsbr dalam data.")
+    ap = argparse.ArgumentParser(description="Laporan IDSBR duplikat di file data master")
+    ap.add_argument("paths", nargs="*", default=[imp.EXCEL_PATH], metavar="path",
+                    help="File .xlsx/.csv atau pola glob (default EXCEL_PATH)")
+    ap.add_argument("--sheet", default=imp.SHEET_NAME, help="Nama sheet atau pola (default SHEET_NAME / sheet aktif)")
+    ap.add_argument("--dedup", choices=imp.DEDUP_POLICIES, default=imp.DEDUP_POLICY,
+                    help="Kebijakan baris yang dipakai (kolom 'dipakai' di laporan)")
+    ap.add_argument("--out", default=imp.DEDUP_REPORT or "duplicate_idsbr.csv", help="File laporan CSV")
+    args = ap.parse_args()
+
+    sources = imp.expand_sources(args.paths, args.sheet)
+    if not sources:
+        ap.error("tidak ada file/sheet untuk diperiksa")
+    print(f"📊 Membaca {', '.join(imp.source_label(*s) for s in sources)}...")
+    items = ((imp.source_label(path, sheet), line, row)
+             for path, sheet in sources
+             for line, row in imp.read_rows(path, sheet))
+    kept, dups = imp.dedup_rows(items, args.dedup)
+
+    if not dups:
+        print(f"✅ Tidak ada duplikat idsbr dalam data ({len(kept)} IDSBR unik).")
         return
-    
-    # Simpan ke CSV
-    output_file = "duplicate_idsbr.csv"
-    duplicates[['idsbr', 'nama_usaha']].to_csv(output_file, index=False)
-    
-    print(f"✅ Ditemukan {len(duplicates)} baris dengan idsbr duplikat.")
-    print(f"💾 Data duplikat disimpan ke {output_file}")
-    
-    # Tampilkan beberapa contoh duplikat
+
+    imp.write_dup_report(args.out, dups)
+    print(f"✅ Ditemukan {len(dups)} idsbr duplikat ({sum(len(g) for g in dups)} baris).")
+    print(f"💾 Data duplikat disimpan ke {args.out}")
+
     print("\nContoh data duplikat:")
-    sample_size = min(10, len(duplicates))
-    print(duplicates[['idsbr', 'nama_usaha']].head(sample_size))
+    for ranked in dups[:10]:
+        lines = ", ".join(f"{src} baris {line}{'*' if i == 0 else ''}" for i, (src, line, _) in enumerate(ranked))
+        print(f"  {ranked[0][2][imp.IDSBR_POS]}: {lines}")
+    print(f"  (* = dipakai saat import dengan --dedup {args.dedup})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,5 +1,45 @@
+# import_excel_to_postgres.py
+# ------------------------------------------------------------
+# Import data master (Excel/CSV) ke direktori_ids.
+#
+# Default (streaming): baris dibaca satu per satu (openpyxl read-only / csv),
+# di-COPY per COPY_ROWS baris ke tabel UNLOGGED direktori_ids_stage, lalu
+# digabung ke direktori_ids dengan 1 INSERT ... ON CONFLICT set-based.
+# Memori tetap datar berapa pun jumlah barisnya.
+#
+# Delta: row_hash (md5 isi TARGET_COLUMNS) disimpan per baris; baris yang isinya
+# sama dilewati tanpa menyentuh last_updated. Baris 'done' yang isinya berubah
+# dikembalikan ke 'new' (error = data_changed_after_done) agar diproses ulang.
+#
+# IDSBR ganda diselesaikan sekali untuk seluruh file (DEDUP_POLICY / --dedup:
+# first | last | complete) dan dicatat ke DEDUP_REPORT (default duplicate_idsbr.csv).
+#
+#   python import_excel_to_postgres.py                   # EXCEL_PATH / SHEET_NAME dari .env
+#   python import_excel_to_postgres.py master.csv
+#   python import_excel_to_postgres.py master.xlsx --sheet "Sheet1"
+#   python import_excel_to_postgres.py "kab_*.xlsx" --procs 4      # banyak file, parsing paralel
+#   python import_excel_to_postgres.py master.xlsx --sheet "*"     # semua sheet
+#   python import_excel_to_postgres.py master.csv --dry-run   # hanya laporan delta, rollback
+#   python import_excel_to_postgres.py master.csv --dedup complete --dedup-report dup.csv
+#   python import_excel_to_postgres.py --legacy          # jalur lama: pandas + execute_values
+#
+# Banyak file/sheet: tiap sumber diparse & di-COPY oleh proses terpisah
+# (ProcessPoolExecutor, IMPORT_PROCS) dengan import_id yang sama, lalu 1 merge.
+#
+# Tabel staging & kolom row_hash dibuat oleh migrate.py (versi 12-14).
+# ------------------------------------------------------------
+
+import io
 import os
+import csv
+import glob
 import math
+import time
+import uuid
+import fnmatch
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
@@ -17,6 +57,14 @@ PGSSLMODE = os.getenv("PGSSLMODE", "require")
 EXCEL_PATH = os.getenv("EXCEL_PATH", "master.xlsx")
 SHEET_NAME = os.getenv("SHEET_NAME", None)  # None = sheet aktif
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+COPY_ROWS = max(1000, int(os.getenv("COPY_ROWS", "50000")))   # baris per statement COPY
+STAGE_TABLE = "direktori_ids_stage"
+# IDSBR ganda di seluruh file: first = kemunculan pertama, last = terakhir,
+# complete = kolom terisi terbanyak (seri -> kemunculan pertama)
+DEDUP_POLICIES = ("first", "last", "complete")
+DEDUP_POLICY = os.getenv("DEDUP_POLICY", "first")
+DEDUP_REPORT = os.getenv("DEDUP_REPORT", "duplicate_idsbr.csv")   # kosong = tanpa laporan
+IMPORT_PROCS = int(os.getenv("IMPORT_PROCS", "0"))   # proses parser paralel (0 = jumlah core)
 
 conn_kwargs = {
     "host": PGHOST,
@@ -64,6 +112,8 @@ COLUMN_MAP = {
 }
 
 TARGET_COLUMNS = list(COLUMN_MAP.values())
+HEADER_ALIASES = {k.lower(): v for k, v in COLUMN_MAP.items()}
+IDSBR_POS = TARGET_COLUMNS.index("idsbr")
 
 def to_float_or_none(x):
     if x is None or (isinstance(x, float) and math.isnan(x)):
@@ -85,61 +135,81 @@ def clean_str(x):
     s = str(x).strip()
     return s if s != "" else None
 
+# ---------- Pembersihan per kolom (jalur --legacy) ----------
+# Hasil sama dengan clean_str / to_float_or_none / int(float(s)) per sel. Teks: satu loop rapat
+# atas ndarray (accessor .str pandas tanpa pyarrow juga loop Python, plus lambda & mask NA);
+# angka: pd.to_numeric (parser C). Keluaran array object dengan None untuk kosong.
+def clean_text_col(s):
+    """clean_str per kolom -> array object (str / None)."""
+    return np.array([v.strip() or None if type(v) is str else clean_str(v)
+                     for v in s.to_numpy(dtype=object)], dtype=object)
+
+def to_float_col(s):
+    """to_float_or_none per kolom -> float64, NaN untuk kosong/tidak valid."""
+    text = clean_text_col(s)
+    x = pd.to_numeric(text, errors="coerce").astype("float64")
+    # Sisa yang ditolak to_numeric dicek ulang dengan float() ('1_000', digit non-ASCII, 'Infinity')
+    odd = np.flatnonzero(np.isnan(x) & pd.notna(text))
+    if len(odd):
+        x[odd] = [v if v is not None else math.nan for v in map(to_float_or_none, text[odd])]
+    return x
+
+# Batas nilai angka yang bisa disimpan (sama dengan _cast jalur streaming): di luar ini PG
+# menolak nilainya ("out of range") dan seluruh batch/merge batal. Terlalu besar -> None,
+# mendekati nol (termasuk denormal) -> 0.
+FLOAT_TINY, FLOAT_MAX = 1e-307, 1e308   # double precision
+INT_LIMIT = 2 ** 31                     # tahap: integer
+
+def float_col(s):
+    x = to_float_col(s)
+    x[np.abs(x) < FLOAT_TINY] = 0.0
+    out = x.astype(object)
+    out[~(np.abs(x) < FLOAT_MAX)] = None   # NaN / inf / terlalu besar
+    return out
+
+def int_col(s):
+    """int(float(s)) per kolom (dipotong ke arah nol) -> array object (int / None)."""
+    x = to_float_col(s)
+    out = np.full(len(x), None, dtype=object)
+    ok = np.abs(x) < INT_LIMIT             # NaN / inf / di luar integer -> None
+    out[ok] = np.trunc(x[ok]).astype(np.int64).astype(object)
+    return out
+
 def read_excel(path, sheet_name=None):
-    df = pd.read_excel(path, sheet_name=sheet_name, dtype=str)
+    # sheet_name=None di pandas berarti semua sheet (dict) -> pakai sheet pertama
+    df = pd.read_excel(path, sheet_name=sheet_name if sheet_name is not None else 0, dtype=str)
     # Normalisasi header agar pas ke COLUMN_MAP (lowercase, underscore)
     df.columns = [c.strip() for c in df.columns]
     return df
 
 def normalize_and_select(df):
-    # Ganti nama kolom Excel -> nama kolom tabel
-    rename_map = {}
-    for excel_col, pg_col in COLUMN_MAP.items():
-        # toleransi: jika Excel pakai kapitalisasi beda
-        for c in df.columns:
-            if c.lower() == excel_col.lower():
-                rename_map[c] = pg_col
-                break
-
+    """
+    Header Excel -> kolom tabel (tanpa beda kapitalisasi), bersihkan per kolom secara vektor.
+    Hasil: DataFrame object berurutan TARGET_COLUMNS, nilai kosong = None (aman untuk psycopg2:
+    tahap int, latitude/longitude float, sisanya str; jalur lama menyisakan NaN).
+    """
+    # Ganti nama kolom Excel -> nama kolom tabel; kolom pertama yang cocok dipakai
+    by_lower = {}
+    for c in df.columns:
+        by_lower.setdefault(str(c).lower(), c)
+    rename_map = {by_lower[k.lower()]: v for k, v in COLUMN_MAP.items() if k.lower() in by_lower}
     df = df.rename(columns=rename_map)
 
-    # Pastikan semua kolom target ada
-    for col in TARGET_COLUMNS:
-        if col not in df.columns:
-            df[col] = None
-
-    # Pilih kolom sesuai urutan target
-    df = df[TARGET_COLUMNS].copy()
-
-    # Bersihkan string
-    str_cols = [c for c in TARGET_COLUMNS if c not in ("latitude", "longitude", "tahap")]
-    for c in str_cols:
-        df[c] = df[c].map(clean_str)
+    missing = [c for c in TARGET_COLUMNS if c not in df.columns]
+    if missing:
+        df = df.assign(**{c: None for c in missing})
 
-    # khusus numeric/float
-    df["latitude"] = df["latitude"].map(to_float_or_none)
-    df["longitude"] = df["longitude"].map(to_float_or_none)
-
-    # tahap ke int jika ada
-    def to_int_or_none(x):
-        if x is None:
-            return None
-        s = str(x).strip()
-        if s == "":
-            return None
-        try:
-            return int(float(s))
-        except:
-            return None
-    df["tahap"] = df["tahap"].map(to_int_or_none)
+    cleaners = {"tahap": int_col, "latitude": float_col, "longitude": float_col}
+    out = pd.DataFrame({c: cleaners.get(c, clean_text_col)(df[c]) for c in TARGET_COLUMNS},
+                       index=df.index, dtype=object)
 
     # idsbr wajib ada
-    missing_idsbr = df["idsbr"].isna().sum()
+    missing_idsbr = int(out["idsbr"].isna().sum())
     if missing_idsbr > 0:
         print(f"⚠️ Peringatan: {missing_idsbr} baris tanpa idsbr akan dilewati.")
-        df = df[~df["idsbr"].isna()]
+        out = out[out["idsbr"].notna()]
 
-    return df
+    return out
 
 def upsert_rows(conn, rows):
     """
@@ -159,52 +229,481 @@ def upsert_rows(conn, rows):
             VALUES %s
             ON CONFLICT (idsbr) DO UPDATE SET
             {set_clause},
+            validation_status = NULL,   -- data berubah: validasi ulang (validate.py)
+            validation_original = NULL, -- nilai asli baru = nilai import ini
+            row_hash = NULL,            -- import streaming berikutnya jadi baseline baru
             last_updated = CURRENT_TIMESTAMP
         """
         execute_values(cur, sql, rows, template=placeholders)
     conn.commit()
 
-def main():
+# ---------- Deduplikasi IDSBR (laporan sama untuk semua jalur) ----------
+DUP_REPORT_HEADER = ["idsbr", "src", "src_row", "nama_usaha", "kolom_terisi", "dipakai"]
+NAMA_POS = TARGET_COLUMNS.index("nama_usaha")
+NUMERIC_LIMIT = {TARGET_COLUMNS.index("tahap"): INT_LIMIT,
+                 TARGET_COLUMNS.index("latitude"): FLOAT_MAX,
+                 TARGET_COLUMNS.index("longitude"): FLOAT_MAX}
+
+def _num_ok(v, limit):
+    x = to_float_or_none(v)
+    return x is not None and abs(x) < limit   # NaN / inf -> False
+
+def filled_count(row):
+    """Jumlah kolom terisi; kolom angka hanya dihitung bila angkanya valid (sama dengan cast SQL)."""
+    return sum(v is not None and (i not in NUMERIC_LIMIT or _num_ok(v, NUMERIC_LIMIT[i]))
+               for i, v in enumerate(row))
+
+def rank_duplicates(group, policy):
+    """Urutkan kandidat 1 IDSBR sesuai kebijakan; elemen pertama yang dipakai."""
+    if policy == "last":
+        return group[::-1]
+    if policy == "complete":
+        return sorted(group, key=lambda it: -filled_count(it[2]))   # sort stabil: seri -> yang pertama
+    return group
+
+def dedup_rows(items, policy):
+    """
+    Satu pass hash per IDSBR atas seluruh file. items: (src, nomor_baris, tuple TARGET_COLUMNS).
+    Return (baris terpilih urut kemunculan pertama, [kandidat terurut per IDSBR ganda, urut
+    IDSBR seperti ORDER BY idsbr di dup_report_sql]). Baris tanpa idsbr dibuang.
+    """
+    by_id = {}
+    for it in items:
+        idsbr = it[2][IDSBR_POS]
+        if idsbr is not None:
+            by_id.setdefault(idsbr, []).append(it)
+    kept, dups = [], []
+    for group in by_id.values():
+        if len(group) == 1:
+            kept.append(group[0])
+            continue
+        ranked = rank_duplicates(group, policy)
+        kept.append(ranked[0])
+        dups.append(ranked)
+    dups.sort(key=lambda ranked: ranked[0][2][IDSBR_POS])
+    return kept, dups
+
+def write_dup_report(path, dups):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(DUP_REPORT_HEADER)
+        for ranked in dups:
+            for i, (src, line, row) in enumerate(ranked):
+                w.writerow([row[IDSBR_POS], src, line, row[NAMA_POS], filled_count(row),
+                            "ya" if i == 0 else "tidak"])
+
+# ---------- Jalur streaming: COPY -> staging -> merge ----------
+def cell_text(v):
+    """Nilai sel -> teks ter-strip (None jika kosong), sama dengan pd.read_excel(dtype=str)."""
+    if type(v) is str:        # jalur cepat: semua sel CSV, sebagian besar sel teks Excel
+        return v.strip() or None
+    if v is None:
+        return None
+    if isinstance(v, float):
+        if math.isnan(v):
+            return None
+        if v.is_integer():
+            v = int(v)
+    s = str(v).strip()
+    return s if s != "" else None
+
+def _select_columns(rows):
+    """Baris mentah (header dulu) -> (nomor_baris, tuple urutan TARGET_COLUMNS)."""
+    header = next(rows, None)
+    if header is None:
+        return
+    pos = {}
+    for i, h in enumerate(header):
+        col = HEADER_ALIASES.get(str(h).strip().lower()) if h is not None else None
+        if col and col not in pos:
+            pos[col] = i
+    missing = [c for c in TARGET_COLUMNS if c not in pos]
+    if missing:
+        print(f"⚠️ Kolom tidak ada di file, diisi NULL: {', '.join(missing)}")
+    idx = [pos.get(c) for c in TARGET_COLUMNS]
+    for line, r in enumerate(rows, start=2):
+        n = len(r)
+        out = tuple(cell_text(r[i]) if i is not None and i < n else None for i in idx)
+        if any(v is not None for v in out):   # baris kosong (sisa format Excel) dilewati
+            yield line, out
+
+def read_rows(path, sheet_name=None):
+    """Stream baris dari .csv atau .xlsx (openpyxl read-only) tanpa memuat seluruh file."""
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from _select_columns(csv.reader(f))
+        return
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name else wb.active
+        yield from _select_columns(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+def copy_to_stage(conn, import_id, src, rows, seq=0):
+    """COPY baris ke STAGE_TABLE per COPY_ROWS baris (buffer CSV di memori hanya 1 potongan)."""
+    cols = ["import_id", "src_seq", "src", "src_row", *TARGET_COLUMNS]
+    sql = f"COPY {STAGE_TABLE} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    with conn.cursor() as cur:
+        def flush():
+            buf.seek(0)
+            cur.copy_expert(sql, buf)
+            buf.seek(0)
+            buf.truncate()
+        for line, row in rows:
+            writer.writerow((import_id, seq, src, line, *row))   # None -> field kosong tanpa kutip = NULL
+            total += 1
+            if total % COPY_ROWS == 0:
+                flush()
+                print(f"   … {src}: {total} baris")
+        if buf.tell():
+            flush()
+    return total
+
+# Format yang diterima float() Python (to_float_or_none / to_int_or_none jalur lama).
+# Eksponen dibatasi 4 digit agar ::numeric tidak pernah overflow; eksponen negatif yang lebih
+# panjang = 0 (seperti float()), positif = NULL (float() -> inf).
+NUM_RE = r"^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?0*\d{1,4})?$"
+NUM_TINY_RE = r"^[-+]?(\d+\.?\d*|\.\d+)[eE]-0*[1-9]\d{4,}$"
+
+def _cast(col):
+    """
+    Cast teks staging -> tipe kolom. Nilai di luar jangkauan jadi NULL (bukan error yang
+    membatalkan seluruh merge); batas sama dengan float_col / int_col jalur --legacy.
+    Cabang CASE dievaluasi berurutan, jadi ::numeric hanya untuk teks yang lolos regex.
+    """
+    n = f"s.{col}::numeric"
+    if col in ("latitude", "longitude"):
+        return (f"CASE WHEN s.{col} ~ '{NUM_TINY_RE}' THEN 0::double precision "
+                f"WHEN s.{col} !~ '{NUM_RE}' THEN NULL "
+                f"WHEN abs({n}) < {FLOAT_TINY} THEN 0::double precision "
+                f"WHEN abs({n}) < {FLOAT_MAX} THEN {n}::double precision END")
+    if col == "tahap":
+        return (f"CASE WHEN s.tahap ~ '{NUM_TINY_RE}' THEN 0 "
+                f"WHEN s.tahap !~ '{NUM_RE}' THEN NULL "
+                f"WHEN abs({n}) >= {FLOAT_MAX} THEN NULL "
+                f"WHEN abs({n}) < 1 THEN 0 "
+                f"WHEN abs({n}::double precision) < {INT_LIMIT} THEN trunc({n}::double precision)::int END")
+    return f"s.{col}"
+
+# Baris 'done' yang isinya berubah sejak import sebelumnya -> antrikan ulang.
+# row_hash NULL (belum pernah di-hash / terakhir lewat --legacy) = baseline, tidak diantrikan ulang.
+REQUEUE_COND = "direktori_ids.automation_status = 'done' AND direktori_ids.row_hash IS NOT NULL"
+REQUEUE_NOTE = "data_changed_after_done"
+
+# ORDER BY DISTINCT ON / row_number per kebijakan dedup (sama dengan rank_duplicates)
+DEDUP_ORDER = {
+    "first": "src_seq, src_row",
+    "last": "src_seq DESC, src_row DESC",
+    "complete": f"num_nonnulls({', '.join(_cast(c) for c in TARGET_COLUMNS)}) DESC, src_seq, src_row",
+}
+
+def merge_sql(policy=DEDUP_POLICY):
+    """
+    Merge delta: row_hash = md5 atas nilai TARGET_COLUMNS yang sudah di-cast, jadi baris
+    yang isinya sama dilewati (last_updated & validation_status tidak disentuh).
+    Hasil: (baris unik, baru, diperbarui, done diantrikan ulang, contoh idsbr diantrikan ulang).
+    """
+    insert_cols = ", ".join(TARGET_COLUMNS)
+    set_clause = ",\n            ".join(f"{c} = EXCLUDED.{c}" for c in TARGET_COLUMNS if c != "idsbr")
+    return f"""
+        WITH s AS (
+          SELECT DISTINCT ON (idsbr) *
+          FROM {STAGE_TABLE} s
+          WHERE import_id = %(import_id)s AND idsbr IS NOT NULL
+          ORDER BY idsbr, {DEDUP_ORDER[policy]}   -- src_seq = urutan file/sheet di argumen
+        ), h AS (
+          SELECT t.*, md5(t::text) AS row_hash
+          FROM (SELECT {", ".join(f"{_cast(c)} AS {c}" for c in TARGET_COLUMNS)} FROM s) t
+        ), changed AS (                         -- baris tak berubah tidak sampai ke ON CONFLICT
+          SELECT h.*, (d.automation_status = 'done' AND d.row_hash IS NOT NULL) AS requeue
+          FROM h LEFT JOIN direktori_ids d USING (idsbr)
+          WHERE d.row_hash IS DISTINCT FROM h.row_hash
+        ), up AS (
+          INSERT INTO direktori_ids ({insert_cols}, row_hash)
+          SELECT {insert_cols}, row_hash
+          FROM changed
+          ON CONFLICT (idsbr) DO UPDATE SET
+            {set_clause},
+            row_hash = EXCLUDED.row_hash,
+            automation_status = CASE WHEN {REQUEUE_COND} THEN 'new' ELSE direktori_ids.automation_status END,
+            attempt_count = CASE WHEN {REQUEUE_COND} THEN 0 ELSE direktori_ids.attempt_count END,
+            error = CASE WHEN {REQUEUE_COND} THEN '{REQUEUE_NOTE}' ELSE direktori_ids.error END,
+            validation_status = NULL,   -- data berubah: validasi ulang (validate.py)
+            validation_original = NULL, -- nilai asli baru = nilai import ini
+            last_updated = CURRENT_TIMESTAMP
+          WHERE direktori_ids.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+          RETURNING (xmax = 0) AS inserted
+        )
+        SELECT (SELECT COUNT(*) FROM h),
+               COUNT(*) FILTER (WHERE inserted),
+               COUNT(*) FILTER (WHERE NOT inserted),
+               (SELECT COUNT(*) FROM changed WHERE requeue),
+               (SELECT array_agg(idsbr) FROM (SELECT idsbr FROM changed WHERE requeue ORDER BY idsbr LIMIT 10) x)
+        FROM up
+    """
+
+STAGE_STATS_SQL = f"""
+SELECT COUNT(*) FILTER (WHERE idsbr IS NULL),
+       COUNT(idsbr) - COUNT(DISTINCT idsbr)
+FROM {STAGE_TABLE}
+WHERE import_id = %(import_id)s
+"""
+
+def dup_report_sql(policy=DEDUP_POLICY):
+    return f"""
+COPY (
+  SELECT idsbr, src, src_row, nama_usaha, kolom_terisi,
+         CASE WHEN rn = 1 THEN 'ya' ELSE 'tidak' END AS dipakai
+  FROM (
+    SELECT idsbr, src, src_row, nama_usaha,
+           num_nonnulls({', '.join(_cast(c) for c in TARGET_COLUMNS)}) AS kolom_terisi,
+           COUNT(*) OVER (PARTITION BY idsbr) AS n,
+           row_number() OVER (PARTITION BY idsbr ORDER BY {DEDUP_ORDER[policy]}) AS rn
+    FROM {STAGE_TABLE} s
+    WHERE import_id = %(import_id)s AND idsbr IS NOT NULL
+  ) d
+  WHERE n > 1
+  ORDER BY idsbr, rn
+) TO STDOUT WITH (FORMAT csv, HEADER)
+"""
+
+def merge_stage(conn, import_id, policy=DEDUP_POLICY, report_path=DEDUP_REPORT):
+    """Gabung staging -> direktori_ids (1 statement), lalu bersihkan staging import ini."""
+    with conn.cursor() as cur:
+        cur.execute(STAGE_STATS_SQL, {"import_id": import_id})
+        no_idsbr, dup = cur.fetchone()
+        if no_idsbr:
+            print(f"⚠️ Peringatan: {no_idsbr} baris tanpa idsbr akan dilewati.")
+        if dup:
+            print(f"⚠️ {dup} baris duplikat idsbr dilewati (kebijakan {policy}).")
+            if report_path:
+                sql = cur.mogrify(dup_report_sql(policy), {"import_id": import_id})
+                with open(report_path, "w", newline="", encoding="utf-8") as f:
+                    cur.copy_expert(sql.decode(), f)
+                print(f"💾 Laporan duplikat: {report_path}")
+        cur.execute(merge_sql(policy), {"import_id": import_id})
+        result = cur.fetchone()
+        cur.execute(f"DELETE FROM {STAGE_TABLE} WHERE import_id = %(import_id)s", {"import_id": import_id})
+    return result
+
+# ---------- Sumber: glob file x sheet, parsing paralel ----------
+def _has_magic(pattern):
+    return any(ch in pattern for ch in "*?[")
+
+def sheet_names(path):
+    import openpyxl
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        return wb.sheetnames
+    finally:
+        wb.close()
+
+def expand_sources(patterns, sheet=None):
+    """
+    Pola file (glob, juga untuk shell Windows yang tidak meng-expand) x nama/pola sheet
+    -> [(path, sheet|None)] sesuai urutan argumen, lalu nama file, lalu urutan sheet di workbook.
+    """
+    sources = []
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern)) if _has_magic(pattern) else [pattern]
+        if not paths:
+            print(f"⚠️ Tidak ada file yang cocok: {pattern}")
+        for path in paths:
+            if path.lower().endswith(".csv"):
+                sources.append((path, None))
+            elif sheet and _has_magic(sheet):
+                names = [n for n in sheet_names(path) if fnmatch.fnmatchcase(n, sheet)]
+                if not names:
+                    print(f"⚠️ {os.path.basename(path)}: tidak ada sheet yang cocok dengan {sheet!r}")
+                sources += [(path, n) for n in names]
+            else:
+                sources.append((path, sheet))
+    return sources
+
+def source_label(path, sheet_name):
+    return f"{os.path.basename(path)}:{sheet_name or '-'}"
+
+def stage_source(import_id, seq, path, sheet_name, conn=None):
+    """
+    Parse 1 file/sheet dan COPY ke staging. Tanpa conn (proses worker): koneksi sendiri
+    dan commit, supaya baris terlihat oleh koneksi yang melakukan merge.
+    Return (src, jumlah baris, detik).
+    """
+    src = source_label(path, sheet_name)
+    own = conn is None
+    if own:
+        conn = psycopg2.connect(**conn_kwargs)
+    try:
+        t0 = time.perf_counter()
+        n = copy_to_stage(conn, import_id, src, read_rows(path, sheet_name), seq)
+        if own:
+            conn.commit()
+        return src, n, time.perf_counter() - t0
+    finally:
+        if own:
+            conn.close()
+
+def stage_sources(conn, import_id, sources, procs=IMPORT_PROCS):
+    """1 sumber: COPY di koneksi utama (1 transaksi). Banyak sumber: ProcessPoolExecutor."""
+    if len(sources) == 1:
+        path, sheet_name = sources[0]
+        return [stage_source(import_id, 0, path, sheet_name, conn)]
+    procs = min(procs or os.cpu_count() or 1, len(sources))
+    print(f"⚙️  {len(sources)} sumber diparse paralel oleh {procs} proses")
+    # File terbesar dijadwalkan duluan: total waktu mendekati waktu file terbesar
+    order = sorted(range(len(sources)), key=lambda i: -os.path.getsize(sources[i][0]))
+    done = []
+    with ProcessPoolExecutor(max_workers=procs) as ex:
+        futs = {ex.submit(stage_source, import_id, i, *sources[i]): source_label(*sources[i]) for i in order}
+        try:
+            for f in as_completed(futs):
+                try:
+                    src, n, secs = f.result()
+                except Exception as e:
+                    print(f"⛔ {futs[f]} gagal diparse: {type(e).__name__}: {e}")
+                    raise
+                print(f"   ✔ {src}: {n} baris dalam {secs:.1f} s")
+                done.append((src, n, secs))
+        except BaseException:
+            for f in futs:
+                f.cancel()
+            raise
+    return done
+
+def drop_stage(conn, import_id):
+    """Hapus sisa baris staging import ini (sudah di-commit proses worker)."""
+    try:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DELETE FROM {STAGE_TABLE} WHERE import_id = %(import_id)s", {"import_id": import_id})
+        conn.commit()
+    except psycopg2.Error:
+        conn.rollback()
+
+def import_streaming(sources, dry_run=False, policy=DEDUP_POLICY, report_path=DEDUP_REPORT,
+                     procs=IMPORT_PROCS):
+    import_id = uuid.uuid4().hex
+    print("🔌 Koneksi ke PostgreSQL (NeonDB)...")
+    conn = psycopg2.connect(**conn_kwargs)
+    try:
+        t0 = time.perf_counter()
+        label = source_label(*sources[0]) if len(sources) == 1 else f"{len(sources)} file/sheet"
+        print(f"📥 Streaming {label} → {STAGE_TABLE} (COPY)...")
+        n = sum(rows for _, rows, _ in stage_sources(conn, import_id, sources, procs))
+        t1 = time.perf_counter()
+        print(f"   {n} baris di-COPY dalam {t1 - t0:.1f} s")
+        if n == 0:
+            conn.rollback()
+            print("⛔ Tidak ada data yang bisa diimpor.")
+            return
+        print("🔀 Merge ke direktori_ids...")
+        unique, inserted, updated, requeued, sample = merge_stage(conn, import_id, policy, report_path)
+        t2 = time.perf_counter()
+        print(f"   {inserted} baris baru, {updated} diperbarui, {unique - inserted - updated} tidak berubah "
+              f"dalam {t2 - t1:.1f} s (total {t2 - t0:.1f} s, {n / max(t2 - t0, 1e-9):.0f} baris/s)")
+        if requeued:
+            more = f" (+{requeued - len(sample)} lainnya)" if requeued > len(sample) else ""
+            print(f"🔁 {requeued} baris 'done' berubah isinya → 'new' ({REQUEUE_NOTE}): "
+                  f"{', '.join(sample)}{more}")
+        if dry_run:
+            conn.rollback()
+            print("🧪 --dry-run: perubahan di-rollback, direktori_ids tidak diubah.")
+            return
+        conn.commit()
+        if inserted + updated:
+            notify_new_rows(conn, inserted + updated)
+        print("✅ Selesai import/upsert ke direktori_ids.")
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        print(f"⛔ Tabel {STAGE_TABLE} belum ada. Jalankan dulu: python migrate.py")
+    except psycopg2.errors.UndefinedColumn:
+        conn.rollback()
+        print(f"⛔ Skema {STAGE_TABLE} versi lama. Jalankan dulu: python migrate.py")
+    finally:
+        if len(sources) > 1:
+            drop_stage(conn, import_id)   # dry-run / gagal: baris worker sudah ter-commit
+        conn.close()
+
+def notify_new_rows(conn, n):
+    """Bangunkan worker yang jalan dengan --daemon (LISTEN direktori_new)."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_notify('direktori_new', %s)", (str(n),))
+    conn.commit()
+
+def import_legacy(path, sheet_name=None, policy=DEDUP_POLICY, report_path=DEDUP_REPORT):
     print("📥 Membaca Excel...")
-    df = read_excel(EXCEL_PATH, sheet_name=SHEET_NAME)
+    df = read_excel(path, sheet_name=sheet_name)
     print(f"   Total baris di Excel: {len(df)}")
 
     print("🧼 Normalisasi kolom & data...")
     df = normalize_and_select(df)
-    print(f"   Siap diimpor: {len(df)} baris")
 
-    if len(df) == 0:
+    # Dedup global (bukan per batch): duplikat di batch berikutnya tidak menimpa data sebelumnya
+    src = source_label(path, sheet_name)
+    items = zip([src] * len(df), df.index + 2, df.itertuples(index=False, name=None))
+    kept, dups = dedup_rows(items, policy)
+    if dups:
+        print(f"⚠️ {sum(len(g) - 1 for g in dups)} baris duplikat idsbr dilewati (kebijakan {policy}).")
+        if report_path:
+            write_dup_report(report_path, dups)
+            print(f"💾 Laporan duplikat: {report_path}")
+    rows = [row for _, _, row in kept]
+    print(f"   Siap diimpor: {len(rows)} baris")
+
+    if not rows:
         print("⛔ Tidak ada data yang bisa diimpor.")
         return
 
     print("🔌 Koneksi ke PostgreSQL (NeonDB)...")
     conn = psycopg2.connect(**conn_kwargs)
     try:
-        total = len(df)
+        total = len(rows)
         batches = (total + CHUNK_SIZE - 1) // CHUNK_SIZE
         for i in range(batches):
             start = i * CHUNK_SIZE
             end = min((i + 1) * CHUNK_SIZE, total)
-            chunk = df.iloc[start:end]
-
-            # Konversi tuple sesuai urutan
-            # Hapus duplikasi idsbr dalam satu batch untuk menghindari CardinalityViolation
-            seen_idsbr = set()
-            rows = []
-            for _, r in chunk.iterrows():
-                idsbr = r['idsbr']
-                if idsbr not in seen_idsbr:
-                    seen_idsbr.add(idsbr)
-                    rows.append(tuple(r[c] for c in TARGET_COLUMNS))
-                else:
-                    print(f"⚠️ Melewati duplikat idsbr: {idsbr} dalam batch yang sama")
-
             print(f"⬆️  Import batch {i+1}/{batches} (rows {start+1}..{end})...")
-            upsert_rows(conn, rows)
+            upsert_rows(conn, rows[start:end])
 
+        notify_new_rows(conn, total)
         print("✅ Selesai import/upssert ke direktori_ids.")
     finally:
         conn.close()
 
+def main():
+    ap = argparse.ArgumentParser(description="Import data master Excel/CSV ke direktori_ids")
+    ap.add_argument("paths", nargs="*", default=[EXCEL_PATH], metavar="path",
+                    help="File .xlsx/.csv atau pola glob, boleh lebih dari satu (default EXCEL_PATH)")
+    ap.add_argument("--sheet", default=SHEET_NAME,
+                    help="Nama sheet atau pola ('*', 'Kab*'); default SHEET_NAME / sheet aktif")
+    ap.add_argument("--procs", type=int, default=IMPORT_PROCS,
+                    help="Proses parser paralel untuk banyak file/sheet (default IMPORT_PROCS / jumlah core)")
+    ap.add_argument("--legacy", action="store_true", help="Jalur lama: pandas read_excel + execute_values")
+    ap.add_argument("--dry-run", action="store_true",
+                    help="Hitung baris baru/berubah/tidak berubah lalu rollback (jalur streaming)")
+    ap.add_argument("--dedup", choices=DEDUP_POLICIES, default=DEDUP_POLICY,
+                    help="Baris yang dipakai untuk IDSBR ganda (default DEDUP_POLICY / first)")
+    ap.add_argument("--dedup-report", default=DEDUP_REPORT, metavar="CSV",
+                    help="File laporan duplikat (default DEDUP_REPORT; '' = tanpa laporan)")
+    args = ap.parse_args()
+    if args.dedup not in DEDUP_POLICIES:
+        ap.error(f"DEDUP_POLICY harus salah satu dari {', '.join(DEDUP_POLICIES)}")
+
+    sources = expand_sources(args.paths, args.sheet)
+    if not sources:
+        ap.error("tidak ada file/sheet untuk diimpor")
+    if args.legacy:
+        if len(sources) > 1:
+            ap.error("--legacy hanya untuk 1 file/sheet")
+        import_legacy(*sources[0], args.dedup, args.dedup_report)
+    else:
+        import_streaming(sources, dry_run=args.dry_run, policy=args.dedup,
+                         report_path=args.dedup_report, procs=args.procs)
+
 if __name__ == "__main__":
     main()
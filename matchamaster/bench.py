@@ -0,0 +1,200 @@
+# bench.py
+# ------------------------------------------------------------
+# Benchmark end-to-end run_worker/process_row worker.py terhadap mock_matchapro.py.
+# Tidak butuh DB maupun situs produksi: row sintetis diantrikan di memori,
+# status hasil ditampung StatusWriter tanpa flush, span step dibaca dari TIMINGS.
+#
+#   python bench.py                                   # 50 row, 2 worker
+#   python bench.py --rows 300 --workers 4 --latency-ms 80 --jitter-ms 60
+#   python bench.py --lock-rate 0.05 --approval-rate 0.05 --error-rate 0.02
+#   python bench.py --edit-urls                       # row membawa edit_url (jalur open_direct)
+#   python bench.py --json bench.json                 # simpan hasil untuk dibandingkan antar commit/CI
+#
+# Konfigurasi worker lain (FORM_ENGINE, ROUTE_POLICY, PAGE_RECYCLE_ROWS, BROWSERS_PER_HOST, ...)
+# tetap dibaca dari ENV, jadi optimasi bisa dibandingkan A/B:
+#   FORM_ENGINE=legacy python bench.py --json legacy.json
+#
+# Butuh: playwright + chromium. psutil opsional (memori).
+# ------------------------------------------------------------
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from collections import deque
+
+import mock_matchapro as mock
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+class BenchQueue:
+    """Pengganti ClaimBuffer untuk run_worker: antrian row di memori, tanpa DB."""
+    def __init__(self, rows):
+        self._rows = deque(rows)
+        self._ev = asyncio.Event()
+
+    def new_rows_event(self):
+        return self._ev
+
+    async def get(self):
+        return self._rows.popleft() if self._rows else None
+
+def percentile(sorted_vals, q):
+    if not sorted_vals:
+        return float("nan")
+    k = (len(sorted_vals) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+def summarize(ms_values):
+    vals = sorted(ms_values)
+    return {"n": len(vals), "p50": percentile(vals, 0.5), "p90": percentile(vals, 0.9),
+            "p99": percentile(vals, 0.99), "max": vals[-1] if vals else float("nan")}
+
+async def sample_memory(browsers, peak, interval_s=0.5):
+    """Catat RSS puncak proses Python ini dan seluruh proses browser."""
+    if psutil is None:
+        return
+    me = psutil.Process()
+    while True:
+        usage = browsers.usage()
+        if usage:
+            peak["browser_rss_mb"] = max(peak.get("browser_rss_mb", 0), usage[0])
+            peak["browser_processes"] = max(peak.get("browser_processes", 0), usage[2])
+        peak["python_rss_mb"] = max(peak.get("python_rss_mb", 0), me.memory_info().rss / 1024 / 1024)
+        await asyncio.sleep(interval_s)
+
+async def run_batch(w, rows, workers, browsers):
+    status = w.StatusWriter(None, edit_urls=w.EditUrlStore())
+    queue = BenchQueue(rows)
+    await asyncio.gather(*[w.run_worker(i + 1, None, queue, status, browsers) for i in range(workers)])
+
+def reset_measurements(w):
+    w.TIMINGS._buf.clear()
+    w.METRICS._counters.clear()
+    w.METRICS._hists.clear()
+
+async def bench(args, base_url, httpd):
+    import worker as w   # setelah ENV benchmark diset
+
+    rows = [mock.synthetic_row(i) for i in range(args.warmup + args.rows)]
+    if args.edit_urls:
+        for r in rows:
+            r["edit_url"] = f"{base_url}/edit/{r['idsbr']}"
+    warm, measured = rows[:args.warmup], rows[args.warmup:]
+
+    browsers = w.BrowserPool()
+    await browsers.start()
+    peak = {}
+    sampler = asyncio.create_task(sample_memory(browsers, peak))
+    try:
+        if warm:
+            print(f"🔥 warmup {len(warm)} row (isi asset/cascade cache, tidak dihitung)")
+            await run_batch(w, warm, args.workers, browsers)
+        reset_measurements(w)
+        httpd.state.stats.clear()
+        print(f"⏱️  {len(measured)} row, {args.workers} worker, {w.BROWSERS_PER_HOST} browser")
+        t0 = time.perf_counter()
+        await run_batch(w, measured, args.workers, browsers)
+        elapsed = time.perf_counter() - t0
+    finally:
+        sampler.cancel()
+        await browsers.close()
+
+    spans = {}
+    for _, _, step, _, ms, calls, _ in w.TIMINGS._buf:
+        spans.setdefault(step, ([], []))
+        spans[step][0].append(ms)
+        if calls is not None:
+            spans[step][1].append(calls)
+    outcomes = {dict(labels)["outcome"]: v for (name, labels), v in w.METRICS._counters.items()
+                if name == "matchapro_rows_total"}
+    return {
+        "rows": len(measured),
+        "workers": args.workers,
+        "elapsed_s": elapsed,
+        "rows_per_min": len(measured) / elapsed * 60 if elapsed else 0,
+        "outcomes": outcomes,
+        "row_ms": summarize(spans.get("row", ([], []))[0]),
+        "steps": {step: {**summarize(ms), "calls_avg": sum(c) / len(c) if c else None}
+                  for step, (ms, c) in spans.items() if step != "row"},
+        "memory_peak": peak,
+        "server": dict(httpd.state.stats),
+        "env": {k: os.getenv(k) for k in ("FORM_ENGINE", "ROUTE_POLICY", "PAGE_RECYCLE_ROWS",
+                                          "BROWSERS_PER_HOST", "HEADLESS")},
+        "mock": vars(httpd.state.cfg),
+    }
+
+def print_report(res):
+    print(f"\n📊 {res['rows']} row / {res['workers']} worker dalam {res['elapsed_s']:.1f} s "
+          f"→ {res['rows_per_min']:.1f} row/menit")
+    print(f"   outcome: {res['outcomes']}")
+    r = res["row_ms"]
+    print(f"   latensi row: p50={r['p50']:.0f} ms p90={r['p90']:.0f} ms p99={r['p99']:.0f} ms max={r['max']:.0f} ms")
+    print(f"\n{'step':<12} {'n':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'calls':>7}")
+    for st, s in sorted(res["steps"].items(), key=lambda kv: -kv[1]["p50"]):
+        calls = f"{s['calls_avg']:.1f}" if s["calls_avg"] is not None else "-"
+        print(f"{st:<12} {s['n']:>6} {s['p50']:>9.0f} {s['p90']:>9.0f} {s['p99']:>9.0f} {calls:>7}")
+    mem = res["memory_peak"]
+    if mem:
+        print(f"\n🧠 RSS puncak: browser={mem.get('browser_rss_mb', 0):.0f}MB "
+              f"({mem.get('browser_processes', 0)} proses) python={mem.get('python_rss_mb', 0):.0f}MB")
+    else:
+        print("\n🧠 psutil tidak terpasang, memori tidak diukur")
+    print(f"🧪 server: {res['server']}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark worker.py terhadap mock MatchaPro lokal")
+    ap.add_argument("--rows", type=int, default=50, help="Jumlah row yang diukur")
+    ap.add_argument("--workers", type=int, default=2, help="Jumlah coroutine run_worker")
+    ap.add_argument("--warmup", type=int, default=None, help="Row pemanasan sebelum diukur (default = workers)")
+    ap.add_argument("--edit-urls", action="store_true", help="Row membawa edit_url (lewati search + filter)")
+    ap.add_argument("--headful", action="store_true", help="Tampilkan browser")
+    ap.add_argument("--verbose", action="store_true", help="Log worker level INFO")
+    ap.add_argument("--json", metavar="PATH", help="Simpan hasil sebagai JSON")
+    mock.add_mock_args(ap)
+    args = ap.parse_args()
+    if args.warmup is None:
+        args.warmup = args.workers
+
+    httpd, base_url = mock.serve(mock.config_from_args(args))
+    tmp = tempfile.mkdtemp(prefix="matchapro_bench_")
+    state_path = os.path.join(tmp, "storage_state.json")
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({"cookies": [], "origins": []}, f)
+    # ENV worker.py dibaca saat import: arahkan ke mock & direktori sementara
+    os.environ.update({
+        "BASE_URL": base_url,
+        "STORAGE_STATE": state_path,
+        "NUM_WORKERS": str(args.workers),
+        "HEADLESS": "false" if args.headful else "true",
+        "LOG_LEVEL": "INFO" if args.verbose else "WARNING",
+        "ASSET_CACHE_DIR": os.path.join(tmp, "asset_cache"),
+        "CASCADE_CACHE_DIR": os.path.join(tmp, "cascade_cache"),
+        "FUZZY_VOCAB_FILE": os.path.join(tmp, "fuzzy_vocab.json"),
+        "STEP_TIMINGS": "db",     # buffer di memori; tanpa StatusWriter loop tidak pernah di-flush
+        "STEP_CDP_CALLS": "true", # kolom calls di laporan benchmark
+        "METRICS_PORT": "0",
+    })
+    print(f"🧪 mock di {base_url} | data sementara di {tmp}")
+
+    try:
+        res = asyncio.run(bench(args, base_url, httpd))
+    finally:
+        httpd.shutdown()
+    print_report(res)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2, default=str)
+        print(f"💾 hasil ditulis ke {args.json}")
+    return 0 if res["rows"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
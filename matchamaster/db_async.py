@@ -1,9 +1,13 @@
 # db_async.py
+# Helper per-baris lama. Klaim batch, release & heartbeat lease (dengan guard assigned_to)
+# ada di worker.py (claim_batch, release_unclaimed, extend_leases).
 import os, asyncpg
 from dotenv import load_dotenv
 
 load_dotenv()
 
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", "600"))
+
 async def get_pool():
     return await asyncpg.create_pool(
         host=os.getenv("PGHOST"),
@@ -21,6 +25,7 @@ WITH cte AS (
   SELECT id
   FROM direktori_ids
   WHERE automation_status = 'new'
+    AND validation_status IN ('ok', 'fixed')   -- lolos validate.py
   ORDER BY attempt_count ASC, id ASC
   LIMIT 1
   FOR UPDATE SKIP LOCKED
@@ -29,6 +34,7 @@ UPDATE direktori_ids d
 SET automation_status = 'in_progress',
     assigned_to = $1,
     first_taken_at = COALESCE(first_taken_at, NOW()),
+    lease_expires_at = NOW() + make_interval(secs => $2),
     last_updated = NOW()
 FROM cte
 WHERE d.id = cte.id
@@ -38,7 +44,7 @@ RETURNING d.*;
 async def claim_one(pool, assigned_to:str):
     async with pool.acquire() as conn:
         async with conn.transaction():
-            row = await conn.fetchrow(CLAIM_SQL, assigned_to)
+            row = await conn.fetchrow(CLAIM_SQL, assigned_to, LEASE_SECONDS)
             return row
 
 async def mark_done(pool, id_:int):
@@ -67,3 +73,4 @@ async def release_to_new(pool, id_:int, note:str):
               last_updated = NOW(), attempt_count = attempt_count + 1
           WHERE id = $1
         """, id_, note)
+
@@ -0,0 +1,377 @@
+# migrate.py
+# ------------------------------------------------------------
+# Migrasi skema direktori_ids berversi. Versi yang sudah jalan dicatat di
+# tabel schema_migrations, jadi aman dijalankan berulang dari PC mana saja.
+#
+#   python migrate.py              # jalankan migrasi yang belum ada + timing claim sebelum/sesudah
+#   python migrate.py --status     # daftar versi terpasang / pending
+#   python migrate.py --explain    # hanya EXPLAIN ANALYZE query claim
+#
+# ENV (.env): PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGPORT, PGSSLMODE
+# ------------------------------------------------------------
+
+import os
+import re
+import json
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# (versi, nama, sql, transaksional)
+# CREATE INDEX CONCURRENTLY tidak boleh di dalam transaksi -> transaksional=False
+MIGRATIONS = [
+    (1, "base_direktori_ids", """
+        CREATE TABLE IF NOT EXISTS direktori_ids (
+          id SERIAL PRIMARY KEY,
+          tahap INT,
+          proses TEXT,
+          idsbr TEXT UNIQUE NOT NULL,
+          nama_usaha TEXT,
+          nama_komersial_usaha TEXT,
+          alamat TEXT,
+          nama_sls TEXT,
+          kodepos TEXT,
+          nomor_telepon TEXT,
+          nomor_whatsapp TEXT,
+          email TEXT,
+          website TEXT,
+          latitude DOUBLE PRECISION,
+          longitude DOUBLE PRECISION,
+          status TEXT,
+          kdprov TEXT,
+          kdkab TEXT,
+          kdkec TEXT,
+          kddesa TEXT,
+          jenis_kepemilikan_usaha TEXT,
+          bentuk_badan_usaha TEXT,
+          deskripsi_badan_usaha_lainnya TEXT,
+          tahun_berdiri TEXT,
+          jaringan_usaha TEXT,
+          sektor_institusi TEXT,
+          deskripsi_kegiatan_usaha TEXT,
+          kategori TEXT,
+          kbli TEXT,
+          produk_usaha TEXT,
+          sumber_profiling TEXT,
+          catatan_profiling TEXT,
+
+          automation_status TEXT DEFAULT 'new',
+          assigned_to TEXT,
+          last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+          error TEXT
+        );
+        ALTER TABLE direktori_ids
+          ADD COLUMN IF NOT EXISTS attempt_count INT DEFAULT 0,
+          ADD COLUMN IF NOT EXISTS first_taken_at TIMESTAMP NULL;
+    """, True),
+    (2, "lease_expires_at", """
+        ALTER TABLE direktori_ids
+          ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP NULL;
+    """, True),
+    # Jalur claim: WHERE automation_status='new' ORDER BY attempt_count, id LIMIT n
+    # -> index scan berurutan, tanpa sort atas seluruh baris 'new'
+    (3, "idx_direktori_claim", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_direktori_claim
+          ON direktori_ids (attempt_count, id)
+          WHERE automation_status = 'new';
+    """, False),
+    # Monitoring: rekap per status & progress harian
+    (4, "idx_direktori_status_updated", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_direktori_status_updated
+          ON direktori_ids (automation_status, last_updated);
+    """, False),
+    # Monitoring "worker aktif" + reaper lease kedaluwarsa
+    (5, "idx_direktori_in_progress", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_direktori_in_progress
+          ON direktori_ids (lease_expires_at, assigned_to)
+          WHERE automation_status = 'in_progress';
+    """, False),
+    # Cache idsbr -> URL form edit: run ulang/requeue langsung goto form tanpa search + filter
+    (6, "direktori_edit_urls", """
+        CREATE TABLE IF NOT EXISTS direktori_edit_urls (
+          idsbr TEXT PRIMARY KEY,
+          edit_url TEXT NOT NULL,
+          resolved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """, True),
+    # Harvester listing DataTables: state baris (open/locked/approval/submitted), URL edit boleh kosong
+    (7, "direktori_edit_urls_listing_state", """
+        ALTER TABLE direktori_edit_urls
+          ALTER COLUMN edit_url DROP NOT NULL,
+          ADD COLUMN IF NOT EXISTS listing_state TEXT,
+          ADD COLUMN IF NOT EXISTS harvested_at TIMESTAMP NULL;
+    """, True),
+    # Cache kode wilayah ('31.73.10.1') -> value option select wilayah di form
+    (8, "direktori_wilayah_options", """
+        CREATE TABLE IF NOT EXISTS direktori_wilayah_options (
+          kode TEXT PRIMARY KEY,
+          option_value TEXT NOT NULL,
+          label TEXT,
+          learned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """, True),
+    # Hasil validate.py: worker hanya klaim baris 'ok' / 'fixed'
+    (9, "validation_status", """
+        ALTER TABLE direktori_ids
+          ADD COLUMN IF NOT EXISTS validation_status TEXT NULL,
+          ADD COLUMN IF NOT EXISTS validation_errors TEXT NULL,
+          ADD COLUMN IF NOT EXISTS validated_at TIMESTAMP NULL;
+    """, True),
+    (10, "idx_direktori_claim_valid", """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_direktori_claim_valid
+          ON direktori_ids (attempt_count, id)
+          WHERE automation_status = 'new' AND validation_status IN ('ok', 'fixed');
+    """, False),
+    # Span per step process_row (ditulis batch oleh worker.py, dibaca timings.py)
+    (11, "direktori_step_timings", """
+        CREATE TABLE IF NOT EXISTS direktori_step_timings (
+          id BIGSERIAL PRIMARY KEY,
+          worker TEXT,
+          idsbr TEXT,
+          step TEXT NOT NULL,
+          started_at TIMESTAMP NOT NULL,
+          ms REAL NOT NULL,
+          cdp_calls INT,
+          outcome TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_step_timings_started ON direktori_step_timings (started_at);
+    """, True),
+    # Staging importer (COPY mentah, semua TEXT, tanpa WAL); di-merge lalu dihapus per import_id
+    (12, "direktori_ids_stage", """
+        CREATE UNLOGGED TABLE IF NOT EXISTS direktori_ids_stage (
+          import_id TEXT NOT NULL,
+          src TEXT,
+          src_row INT,
+          tahap TEXT,
+          proses TEXT,
+          idsbr TEXT,
+          nama_usaha TEXT,
+          nama_komersial_usaha TEXT,
+          alamat TEXT,
+          nama_sls TEXT,
+          kodepos TEXT,
+          nomor_telepon TEXT,
+          nomor_whatsapp TEXT,
+          email TEXT,
+          website TEXT,
+          latitude TEXT,
+          longitude TEXT,
+          status TEXT,
+          kdprov TEXT,
+          kdkab TEXT,
+          kdkec TEXT,
+          kddesa TEXT,
+          jenis_kepemilikan_usaha TEXT,
+          bentuk_badan_usaha TEXT,
+          deskripsi_badan_usaha_lainnya TEXT,
+          tahun_berdiri TEXT,
+          jaringan_usaha TEXT,
+          sektor_institusi TEXT,
+          deskripsi_kegiatan_usaha TEXT,
+          kategori TEXT,
+          kbli TEXT,
+          produk_usaha TEXT,
+          sumber_profiling TEXT,
+          catatan_profiling TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_direktori_ids_stage_import ON direktori_ids_stage (import_id, idsbr);
+    """, True),
+    # Import delta: md5 isi TARGET_COLUMNS; NULL = belum ada baseline (import berikutnya mengisi)
+    (13, "row_hash", """
+        ALTER TABLE direktori_ids
+          ADD COLUMN IF NOT EXISTS row_hash TEXT NULL;
+    """, True),
+    # Import banyak file/sheet paralel: urutan sumber di argumen untuk kebijakan dedup first/last
+    (14, "direktori_ids_stage_src_seq", """
+        ALTER TABLE direktori_ids_stage
+          ADD COLUMN IF NOT EXISTS src_seq INT NOT NULL DEFAULT 0;
+    """, True),
+    # Nilai asli kolom yang dinormalisasi/dikosongkan validate.py (diisi ulang NULL saat import berubah)
+    (15, "validation_original", """
+        ALTER TABLE direktori_ids
+          ADD COLUMN IF NOT EXISTS validation_original JSONB NULL;
+    """, True),
+]
+
+# Bagian SELECT dari CLAIM_SQL worker.py (tanpa UPDATE, di-rollback setelah EXPLAIN).
+# {validated} kosong bila kolom validation_status belum ada (migrasi 9 belum jalan).
+CLAIM_EXPLAIN_SQL = """
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+SELECT id
+FROM direktori_ids
+WHERE automation_status = 'new'{validated}
+ORDER BY attempt_count ASC, id ASC
+LIMIT %(n)s
+FOR UPDATE SKIP LOCKED
+"""
+CLAIM_VALIDATED_FILTER = "\n  AND validation_status IN ('ok', 'fixed')"
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        port=int(os.getenv("PGPORT", "5432")),
+        sslmode=os.getenv("PGSSLMODE", "require")
+    )
+
+def ensure_migrations_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version INT PRIMARY KEY,
+              name TEXT NOT NULL,
+              applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    conn.commit()
+
+def applied_versions(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT version FROM schema_migrations")
+        return {r[0] for r in cur.fetchall()}
+
+# Build CONCURRENTLY yang gagal/terputus meninggalkan index INVALID (tidak dipakai planner);
+# IF NOT EXISTS melewatinya dan versi tercatat terpasang -> cek pg_index.indisvalid.
+CONCURRENT_INDEX_RE = re.compile(r"CREATE\s+INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.I)
+INVALID_INDEX_SQL = """
+SELECT c.relname
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE c.relname = ANY(%s) AND pg_table_is_visible(c.oid) AND NOT i.indisvalid
+"""
+
+def drop_invalid_indexes(cur, names):
+    """Drop index INVALID di antara names; return nama yang di-drop."""
+    if not names:
+        return []
+    cur.execute(INVALID_INDEX_SQL, (names,))
+    invalid = [r[0] for r in cur.fetchall()]
+    for name in invalid:
+        print(f"⚠️  index {name} INVALID (build CONCURRENTLY gagal) -> drop & build ulang")
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+    return invalid
+
+def invalid_index_versions(conn, done):
+    """Versi terpasang yang index CONCURRENTLY-nya INVALID (tercatat sebelum cek ini ada)."""
+    broken = set()
+    with conn.cursor() as cur:
+        for version, _, sql, transactional in MIGRATIONS:
+            indexes = CONCURRENT_INDEX_RE.findall(sql)
+            if version in done and not transactional and indexes:
+                cur.execute(INVALID_INDEX_SQL, (indexes,))
+                if cur.fetchone():
+                    broken.add(version)
+    conn.commit()
+    return broken
+
+def apply_migration(conn, version, name, sql, transactional):
+    print(f"⬆️  {version:04d} {name}")
+    if transactional:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+        return
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            indexes = CONCURRENT_INDEX_RE.findall(sql)
+            drop_invalid_indexes(cur, indexes)      # sisa run sebelumnya
+            cur.execute(sql)
+            if drop_invalid_indexes(cur, indexes):  # build barusan INVALID: coba sekali lagi
+                cur.execute(sql)
+                invalid = drop_invalid_indexes(cur, indexes)
+                if invalid:
+                    raise RuntimeError(f"index {', '.join(invalid)} tetap INVALID, versi {version} tidak dicatat")
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s) "
+                        "ON CONFLICT (version) DO NOTHING", (version, name))   # perbaikan versi terpasang
+    finally:
+        conn.autocommit = False
+
+def has_column(conn, table, column):
+    with conn.cursor() as cur:
+        cur.execute("SELECT 1 FROM information_schema.columns "
+                    "WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s",
+                    (table, column))
+        return cur.fetchone() is not None
+
+def explain_claim(conn, n=8):
+    """Return (execution_ms, ringkasan plan) untuk query claim. Baris yang ter-lock di-rollback."""
+    try:
+        validated = CLAIM_VALIDATED_FILTER if has_column(conn, "direktori_ids", "validation_status") else ""
+        with conn.cursor() as cur:
+            cur.execute(CLAIM_EXPLAIN_SQL.format(validated=validated), {"n": n})
+            plan = cur.fetchone()[0]
+    finally:
+        conn.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    top = plan[0]
+    nodes, node = [], top["Plan"]
+    while node:
+        label = node["Node Type"]
+        if node.get("Index Name"):
+            label += f" ({node['Index Name']})"
+        nodes.append(label)
+        node = (node.get("Plans") or [None])[0]
+    return top["Execution Time"], " → ".join(nodes)
+
+def print_explain(conn, label):
+    try:
+        ms, plan = explain_claim(conn)
+        print(f"⏱️  claim {label}: {ms:.2f} ms | {plan}")
+        return ms
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"⚠️  EXPLAIN claim {label} gagal: {e}")
+        return None
+
+def main():
+    ap = argparse.ArgumentParser(description="Migrasi skema direktori_ids")
+    ap.add_argument("--status", action="store_true", help="Tampilkan versi terpasang & pending")
+    ap.add_argument("--explain", action="store_true", help="Hanya EXPLAIN ANALYZE query claim")
+    args = ap.parse_args()
+
+    conn = connect()
+    try:
+        ensure_migrations_table(conn)
+        done = applied_versions(conn)
+        broken = invalid_index_versions(conn, done)   # dijalankan ulang: drop index INVALID & build ulang
+        pending = [m for m in MIGRATIONS if m[0] not in done or m[0] in broken]
+
+        if args.status:
+            for version, name, _, _ in MIGRATIONS:
+                mark = "⚠️ " if version in broken else "✅" if version in done else "⏳"
+                print(f"{mark} {version:04d} {name}{' (index INVALID)' if version in broken else ''}")
+            return
+        if args.explain:
+            print_explain(conn, "sekarang")
+            return
+        if not pending:
+            print("✅ Skema sudah versi terbaru.")
+            print_explain(conn, "sekarang")
+            return
+
+        # DB lama yang belum pernah dimigrasi (schema_migrations kosong) justru paling perlu dibandingkan
+        before = print_explain(conn, "sebelum") if has_column(conn, "direktori_ids", "id") else None
+        for m in pending:
+            apply_migration(conn, *m)
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE direktori_ids")
+        conn.commit()
+        after = print_explain(conn, "sesudah")
+        if before and after:
+            print(f"📉 {before:.2f} ms → {after:.2f} ms ({before / max(after, 0.001):.1f}x)")
+        print(f"✅ {len(pending)} migrasi diterapkan.")
+        if any(m[0] == 9 for m in pending):
+            print("⚠️  Worker hanya mengklaim baris tervalidasi: jalankan `python validate.py` sekarang, "
+                  "sebelum itu baris 'new' yang ada tidak akan diproses.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,510 @@
+# mock_matchapro.py
+# ------------------------------------------------------------
+# Tiruan lokal situs MatchaPro (direktori-usaha) untuk benchmark & uji worker.py
+# tanpa menyentuh produksi. Hanya stdlib (http.server), HTML statis + JS kecil:
+#   - landing: input idsbr, #filter-data, tabel server-side (XHR draw=...)
+#   - tombol edit -> SweetAlert konfirmasi -> form edit (window.open)
+#   - form: field teks, radio kondisi/jaringan, select badan usaha,
+#           cascade wilayah provinsi -> kab -> kec -> desa lewat AJAX + blockUI,
+#           repeater KBLI, cek peta, submit + modal konsistensi + SweetAlert
+#   - halaman lock ("Not Authorized"), alert approval, tombol cancel submit
+# Latensi & error bisa diinjeksi. Value option provinsi DKI (116) dan Jakarta
+# Pusat (2319) sama dengan WILAYAH_SEED worker.py.
+#
+#   python mock_matchapro.py --port 8765
+#   python mock_matchapro.py --port 8765 --latency-ms 120 --jitter-ms 80 --error-rate 0.02 --lock-rate 0.05
+#   BASE_URL=http://127.0.0.1:8765/direktori-usaha python worker.py --debug-idsbr 100000001
+#
+# Benchmark end-to-end: python bench.py
+# ------------------------------------------------------------
+
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PREFIX = "/direktori-usaha"
+IDSBR_BASE = 100000000
+
+# ---------- Data sintetis ----------
+PROVINSI = [("31", "116", "DKI JAKARTA"), ("32", "117", "JAWA BARAT"), ("36", "118", "BANTEN")]
+KAB_DKI = [("01", "2315", "KEPULAUAN SERIBU"), ("71", "2316", "JAKARTA SELATAN"),
+           ("72", "2317", "JAKARTA TIMUR"), ("73", "2319", "JAKARTA PUSAT"),
+           ("74", "2320", "JAKARTA BARAT"), ("75", "2321", "JAKARTA UTARA")]
+N_KEC, N_DESA = 8, 10
+
+KATEGORI = {"C": "Industri Pengolahan", "F": "Konstruksi", "G": "Perdagangan Besar dan Eceran",
+            "I": "Penyediaan Akomodasi dan Makan Minum", "J": "Informasi dan Komunikasi",
+            "M": "Aktivitas Profesional", "S": "Aktivitas Jasa Lainnya"}
+KATEGORI_GOLONGAN = {"C": (10, 11, 13, 25), "F": (41, 42, 43), "G": (45, 46, 47), "I": (55, 56),
+                     "J": (58, 62, 63), "M": (69, 70, 73), "S": (94, 95, 96)}
+BADAN_USAHA = ["-- Pilih --", "PT/PT Persero/PT Tbk", "CV", "Firma", "Koperasi/KUD",
+               "Yayasan", "Usaha Perorangan", "Lainnya"]
+JARINGAN = [("1", "Tunggal"), ("2", "Kantor Pusat"), ("3", "Kantor Cabang"),
+            ("4", "Perwakilan"), ("5", "Unit Pembantu")]
+KONDISI = [("kondisi_aktif", "Aktif"), ("kondisi_tutup_sementara", "Tutup Sementara"),
+           ("kondisi_belum_operasi", "Belum Beroperasi/Berproduksi"), ("kondisi_tutup", "Tutup"),
+           ("kondisi_alih_usaha", "Alih Usaha"), ("kondisi_tidak_ditemukan", "Tidak Ditemukan"),
+           ("kondisi_aktif_pindah", "Aktif Pindah"), ("kondisi_aktif_nonrespon", "Aktif Nonrespon"),
+           ("kondisi_duplikat", "Duplikat"), ("kondisi_salah_kode_wilayah", "Salah Kode Wilayah")]
+
+def kabupaten(prov_value: str) -> list[tuple[str, str, str]]:
+    if prov_value == "116":
+        return KAB_DKI
+    base = int(prov_value) * 100
+    return [(f"{i:02d}", str(base + i), f"KABUPATEN {prov_value}-{i:02d}") for i in range(1, 6)]
+
+def kecamatan(kab_value: str) -> list[tuple[str, str, str]]:
+    return [(f"{i * 10:03d}", f"{kab_value}{i:02d}", f"KECAMATAN {kab_value}-{i * 10:03d}")
+            for i in range(1, N_KEC + 1)]
+
+def kelurahan(kec_value: str) -> list[tuple[str, str, str]]:
+    return [(f"{i:03d}", f"{kec_value}{i:03d}", f"KELURAHAN {kec_value}-{i:03d}")
+            for i in range(1, N_DESA + 1)]
+
+def kbli_codes(kategori: str) -> list[str]:
+    return [f"{g:02d}{s:03d}" for g in KATEGORI_GOLONGAN.get(kategori, ()) for s in (111, 120, 300, 636, 990)]
+
+WILAYAH_CHILDREN = {"kabupaten": kabupaten, "kecamatan": kecamatan, "kelurahan": kelurahan}
+
+def synthetic_row(i: int) -> dict:
+    """Row bentuk direktori_ids (+ id) yang cocok dengan pilihan form mock."""
+    rnd = random.Random(i)
+    kab = rnd.choice(KAB_DKI)[0]
+    kat = rnd.choice(sorted(KATEGORI))
+    return {
+        "id": i + 1,
+        "idsbr": str(IDSBR_BASE + i),
+        "nama_usaha": f"USAHA SINTETIS {i}",
+        "sumber_profiling": "Kunjungan lapangan",
+        "catatan_profiling": f"bench {i}",
+        "nama_sls": f"RT {rnd.randint(1, 15):03d} RW {rnd.randint(1, 10):03d}",
+        "alamat": f"Jl. Contoh No. {rnd.randint(1, 300)}",
+        "email": rnd.choice([f"usaha{i}@contoh.co.id", "", "bukan-email"]),
+        "nomor_telepon": rnd.choice(["021-555-0%03d" % (i % 1000), ""]),
+        "nomor_whatsapp": rnd.choice(["0812%08d" % i, ""]),
+        "website": rnd.choice(["", f"https://usaha{i}.contoh.id"]),
+        "latitude": round(-6.2 + rnd.uniform(-0.1, 0.1), 6),
+        "longitude": round(106.8 + rnd.uniform(-0.1, 0.1), 6),
+        "tahun_berdiri": str(rnd.randint(1980, 2023)),
+        "status": rnd.choice(["Aktif", "Aktif", "Tutup Sementara", "Tidak Ditemukan"]),
+        "bentuk_badan_usaha": rnd.choice(["PT", "CV", "Perorangan", "Koperasi", "lainnya"]),
+        "jaringan_usaha": rnd.choice(["Tunggal", "Kantor Cabang", "Kantor Pusat"]),
+        "kdprov": "31",
+        "kdkab": kab,
+        "kdkec": f"{rnd.randint(1, N_KEC) * 10:03d}",
+        "kddesa": f"{rnd.randint(1, N_DESA):03d}",
+        "kategori": kat,
+        "kbli": rnd.choice(kbli_codes(kat)),
+        "deskripsi_kegiatan_usaha": "Perdagangan eceran barang kebutuhan sehari-hari",
+    }
+
+# ---------- HTML / JS ----------
+STYLE = """
+body{font-family:sans-serif;margin:16px} .hidden{display:none}
+.dataTables_processing{display:none;position:fixed;top:40%;left:40%;background:#eee;padding:8px}
+.blockUI{position:fixed;inset:0;background:rgba(0,0,0,.15);z-index:1000}
+.swal2-container{position:fixed;inset:0;background:rgba(0,0,0,.3);z-index:2000;display:flex;align-items:center;justify-content:center}
+.swal2-popup{background:#fff;padding:24px;min-width:300px}
+#consistency-modal{position:fixed;top:20%;left:30%;background:#fff;border:1px solid #999;padding:16px;z-index:1500}
+"""
+
+MOCK_JS = r"""
+(() => {
+  const cfg = document.body.dataset;
+  const swal = (text, cls, onOk) => {
+    const c = document.createElement("div");
+    c.className = "swal2-container";
+    c.innerHTML = `<div class="swal2-popup"><div class="swal2-html-container"></div><button type="button" class="${cls}">OK</button></div>`;
+    c.querySelector(".swal2-html-container").textContent = text;
+    c.querySelector("button").addEventListener("click", () => { c.remove(); onOk && onOk(); });
+    document.body.appendChild(c);
+  };
+  const blockUI = () => { const b = document.createElement("div"); b.className = "blockUI"; document.body.appendChild(b); return b; };
+  const fillOptions = (sel, items) => {
+    sel.innerHTML = '<option value="">-- Pilih --</option>' +
+      items.map(o => `<option value="${o.value}">${o.text}</option>`).join("");
+  };
+
+  // ----- landing -----
+  const filter = document.getElementById("filter-data");
+  if (filter) {
+    let draw = 0;
+    filter.addEventListener("click", async () => {
+      const proc = document.querySelector(".dataTables_processing");
+      proc.style.display = "block";
+      const q = encodeURIComponent(document.querySelector('input[name="idsbr"]').value.trim());
+      const tbody = document.querySelector("#table-direktori tbody");
+      try {
+        const r = await fetch(`${cfg.prefix}/data?draw=${++draw}&start=0&length=10&idsbr=${q}`,
+                              {headers: {"X-Requested-With": "XMLHttpRequest"}});
+        const js = await r.json();
+        tbody.innerHTML = js.data.map(row => "<tr>" + row.map(c => `<td>${c}</td>`).join("") + "</tr>").join("");
+      } catch (e) {
+        tbody.innerHTML = "";
+      }
+      proc.style.display = "none";
+    });
+    document.addEventListener("click", ev => {
+      const a = ev.target.closest("a.btn-edit-perusahaan");
+      if (!a) return;
+      ev.preventDefault();
+      swal("Anda akan membuka form edit usaha ini. Lanjutkan?", "swal2-confirm swal2-styled",
+           () => window.open(a.getAttribute("href"), "_blank"));
+    });
+  }
+
+  // ----- form -----
+  const form = document.getElementById("form-update");
+  if (!form) return;
+  if (cfg.latlngSwal === "1") swal("Format latitude tidak valid", "swal2-confirm swal2-styled");
+
+  const cascade = [["provinsi", "kabupaten_kota", "kabupaten"], ["kabupaten_kota", "kecamatan", "kecamatan"],
+                   ["kecamatan", "kelurahan_desa", "kelurahan"]];
+  const clearFrom = idx => cascade.slice(idx).forEach(([, child]) => fillOptions(document.getElementById(child), []));
+  cascade.forEach(([parent, child, level], i) => {
+    document.getElementById(parent).addEventListener("change", async ev => {
+      clearFrom(i);
+      if (!ev.target.value) return;
+      const b = blockUI();
+      try {
+        const r = await fetch(`${cfg.api}/wilayah/${level}?parent=${ev.target.value}`,
+                              {headers: {"X-Requested-With": "XMLHttpRequest"}});
+        if (r.ok) fillOptions(document.getElementById(child), await r.json());
+      } finally { b.remove(); }
+    });
+  });
+
+  const KATEGORI = JSON.parse(cfg.kategori);
+  document.getElementById("add-kegiatan-usaha").addEventListener("click", () => {
+    const item = document.createElement("div");
+    item.setAttribute("data-repeater-item", "");
+    item.innerHTML = `<input class="l_kegiatan_usaha"><select class="l_kategori_usaha"><option value="">-- Pilih --</option>` +
+      Object.entries(KATEGORI).map(([k, v]) => `<option value="${k}">${k} - ${v}</option>`).join("") +
+      `</select><select class="l_kbli"><option value="">-- Pilih --</option></select><input class="l_produk_utama">`;
+    item.querySelector(".l_kategori_usaha").addEventListener("change", async ev => {
+      const r = await fetch(`${cfg.api}/kbli?kategori=${ev.target.value}`);
+      if (r.ok) fillOptions(item.querySelector(".l_kbli"), (await r.json()).map(k => ({value: k, text: k})));
+    });
+    document.getElementById("container-kegiatan-usaha-repeater").appendChild(item);
+  });
+
+  document.getElementById("cek-peta").addEventListener("click", async () => {
+    const b = blockUI();
+    try { await fetch(`${cfg.api}/cek-peta?lat=${document.getElementById("latitude").value}&lng=${document.getElementById("longitude").value}`); }
+    finally { b.remove(); }
+  });
+
+  const modal = document.getElementById("consistency-modal");
+  document.getElementById("submit-final").addEventListener("click", () => modal.classList.remove("hidden"));
+  const confirmSubmit = () => {
+    modal.classList.add("hidden");
+    swal("Apakah data yang diisi sudah benar?", "swal2-confirm btn btn-primary", async () => {
+      let ok = false;
+      try {
+        const r = await fetch(`${cfg.prefix}/submit/${form.dataset.idsbr}`,
+                              {method: "POST", body: new FormData(form)});
+        ok = r.ok;
+      } catch (e) {}
+      swal(ok ? "Data berhasil disimpan" : "Terjadi kesalahan pada server", "swal2-confirm swal2-styled");
+    });
+  };
+  document.getElementById("confirm-consistency").addEventListener("click", confirmSubmit);
+  document.getElementById("ignore-consistency").addEventListener("click", confirmSubmit);
+})();
+"""
+
+LANDING_HTML = """<!doctype html><html><head><meta charset="utf-8"><title>Direktori Usaha - MatchaPro</title>
+<link rel="stylesheet" href="/assets/app.css"><script src="/assets/vendor.js"></script></head>
+<body data-prefix="{prefix}">
+<img src="/assets/logo.png" alt="logo">
+<h4>Direktori Usaha</h4>
+<input name="idsbr" placeholder="IDSBR"> <button type="button" id="filter-data">Filter</button>
+<div class="dataTables_processing">Processing...</div>
+<table id="table-direktori"><thead><tr><th>IDSBR</th><th>Nama</th><th>Alamat</th><th>Status</th><th>Aksi</th></tr></thead>
+<tbody></tbody></table>
+<script src="/assets/mock.js"></script>
+</body></html>"""
+
+LOCK_HTML = """<!doctype html><html><head><meta charset="utf-8"><title>Not Authorized - MatchaPro</title></head>
+<body><h2>Profiling Info</h2>
+<p>Anda tidak bisa melakukan edit karena usaha ini sedang diedit oleh user lain.</p></body></html>"""
+
+APPROVAL_HTML = """<div class="alert alert-warning"><h4 class="alert-heading">Info Approval</h4>
+<div class="alert-body">Usaha ini sedang melalui proses approval.</div></div>"""
+
+def _options(items, selected=None, placeholder=True):
+    out = ['<option value="">-- Pilih --</option>'] if placeholder else []
+    for value, text in items:
+        out.append(f'<option value="{value}"{" selected" if value == selected else ""}>{text}</option>')
+    return "".join(out)
+
+def _radios(name, items, checked=None):
+    return "".join(f'<input type="radio" name="{name}" id="{rid}" value="{val}"{" checked" if rid == checked else ""}>'
+                   f'<label for="{rid}">{label}</label> ' for rid, val, label in items)
+
+def form_html(idsbr: str, approval=False, submitted=False, latlng_swal=False) -> str:
+    rnd = random.Random(idsbr)
+    field = lambda fid, value="": f'<label>{fid}</label> <input id="{fid}" value="{value}"><br>'
+    kondisi = [(rid, str(i + 1), label) for i, (rid, label) in enumerate(KONDISI)]
+    jaringan = [(f"jaringan_{v}", v, label) for v, label in JARINGAN]
+    prov_opts = [(v, f"[{c}] {n}") for c, v, n in PROVINSI]
+    kab_opts = [(v, f"[{c}] {n}") for c, v, n in kabupaten("116")]
+    badan = [(str(i), t) for i, t in enumerate(BADAN_USAHA)]
+    return f"""<!doctype html><html><head><meta charset="utf-8"><title>Form Update - MatchaPro</title>
+<link rel="stylesheet" href="/assets/app.css"><script src="/assets/vendor.js"></script></head>
+<body data-prefix="{PREFIX}" data-api="/api" data-latlng-swal="{int(latlng_swal)}"
+      data-kategori='{json.dumps(KATEGORI)}'>
+<h4>Form Update Usaha/Perusahaan</h4>
+{APPROVAL_HTML if approval else ""}
+<form id="form-update" data-idsbr="{idsbr}" onsubmit="return false">
+{field("sumber_profiling")}{field("catatan_profiling")}{field("sls")}
+{field("alamat_usaha", rnd.choice(["", "Jl. Lama No. 1"]))}
+{field("email", rnd.choice(["", "lama@contoh.id", "salah@"]))} <input type="checkbox" id="check-email"><br>
+{field("telepon")}{field("whatsapp")}{field("website")}
+{field("latitude", rnd.choice(["", "-6.2"]))}{field("longitude", rnd.choice(["", "106.8"]))}
+<div>{_radios("kondisi_usaha", kondisi)}</div>
+<select id="badan_usaha">{_options(badan, selected=rnd.choice(["0", "0", "2", "7"]), placeholder=False)}</select>
+{field("tahun_berdiri")}
+<div>{_radios("jaringan_usaha", jaringan)}</div>
+<select id="provinsi">{_options(prov_opts, selected="116")}</select>
+<select id="kabupaten_kota">{_options(kab_opts)}</select>
+<select id="kecamatan">{_options([])}</select>
+<select id="kelurahan_desa">{_options([])}</select>
+<div id="container-kegiatan-usaha-repeater"></div>
+<button type="button" id="add-kegiatan-usaha">Add New</button>
+<button type="button" id="cek-peta">Cek Peta</button>
+<button type="button" id="submit-final">Submit</button>
+{'<button type="button" id="cancel-submit-final">Cancel Submit</button>' if submitted else ""}
+</form>
+<div id="consistency-modal" class="hidden">Data tidak konsisten dengan profil sebelumnya.
+<button type="button" id="confirm-consistency">Konfirmasi</button>
+<button type="button" id="ignore-consistency">Abaikan</button></div>
+<script src="/assets/mock.js"></script>
+</body></html>"""
+
+PNG_1PX = bytes.fromhex("89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+                        "1f15c4890000000d49444154789c6360000002000154a24f5d0000000049454e44ae426082")
+
+# ---------- Server ----------
+class MockConfig:
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, lock_rate=0.0, approval_rate=0.0,
+                 submitted_rate=0.0, latlng_rate=0.0, asset_kb=300, listing_size=1000):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.lock_rate = lock_rate
+        self.approval_rate = approval_rate
+        self.submitted_rate = submitted_rate
+        self.latlng_rate = latlng_rate
+        self.asset_kb = asset_kb
+        self.listing_size = listing_size
+
+class MockState:
+    """State server (submit yang berhasil) + hitungan request untuk laporan benchmark."""
+    def __init__(self, cfg: MockConfig):
+        self.cfg = cfg
+        self.submitted = set()
+        self.stats = {}
+        self._lock = threading.Lock()
+        self.vendor_js = ("/* vendor mock */\n" + ("var _pad='" + "x" * 1000 + "';\n") * max(1, cfg.asset_kb)).encode()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def chance(self, idsbr: str, kind: str) -> float:
+        """Angka 0..1 stabil per (idsbr, jenis): state lock/approval tidak berubah antar request."""
+        h = hashlib.md5(f"{kind}:{idsbr}".encode()).digest()
+        return int.from_bytes(h[:4], "big") / 2 ** 32
+
+    def row_state(self, idsbr: str) -> str:
+        c = self.cfg
+        if idsbr in self.submitted or self.chance(idsbr, "submitted") < c.submitted_rate:
+            return "submitted"
+        if self.chance(idsbr, "approval") < c.approval_rate:
+            return "approval"
+        if self.chance(idsbr, "lock") < c.lock_rate:
+            return "locked"
+        return "open"
+
+LISTING_STATE_TEXT = {"open": "Open", "locked": "Sedang diedit user lain",
+                      "approval": "Approval", "submitted": "Submitted"}
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "MockMatchaPro/1.0"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    def _send(self, code, body, ctype="text/html; charset=utf-8", headers=None):
+        if isinstance(body, str):
+            body = body.encode()
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, obj):
+        self._send(200, json.dumps(obj), "application/json")
+
+    def _delay(self):
+        c = self.state.cfg
+        ms = c.latency_ms + (random.uniform(0, c.jitter_ms) if c.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000)
+
+    def _inject_error(self) -> bool:
+        if self.state.cfg.error_rate and random.random() < self.state.cfg.error_rate:
+            self.state.count("error_injected")
+            self._send(500, "<h1>500 Internal Server Error</h1>")
+            return True
+        return False
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_HEAD(self):
+        self._route("GET")
+
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        if n:
+            self.rfile.read(n)
+        self._route("POST")
+
+    def _route(self, method):
+        url = urlsplit(self.path)
+        path, q = url.path, {k: v[0] for k, v in parse_qs(url.query).items()}
+        st = self.state
+        st.count("requests")
+
+        if path.startswith("/assets/"):
+            return self._asset(path)
+        self._delay()
+        if path in (PREFIX, PREFIX + "/"):
+            return self._send(200, LANDING_HTML.format(prefix=PREFIX))
+        if path == PREFIX + "/data":
+            return self._inject_error() or self._listing(q)
+        m = re.fullmatch(PREFIX + r"/edit/(\w+)", path)
+        if m:
+            return self._inject_error() or self._edit(m.group(1))
+        m = re.fullmatch(PREFIX + r"/submit/(\w+)", path)
+        if m and method == "POST":
+            if self._inject_error():
+                return
+            st.submitted.add(m.group(1))
+            st.count("submitted")
+            return self._json({"status": "ok"})
+        m = re.fullmatch(r"/api/wilayah/(kabupaten|kecamatan|kelurahan)", path)
+        if m:
+            if self._inject_error():
+                return
+            st.count(f"cascade_{m.group(1)}")
+            items = WILAYAH_CHILDREN[m.group(1)](q.get("parent", ""))
+            return self._json([{"value": v, "text": f"[{c}] {n}"} for c, v, n in items])
+        if path == "/api/kbli":
+            return self._json(kbli_codes(q.get("kategori", "")))
+        if path == "/api/cek-peta":
+            return self._json({"status": "ok"})
+        self._send(404, "not found", "text/plain")
+
+    def _asset(self, path):
+        cache = {"Cache-Control": "max-age=3600", "ETag": '"mock-1"'}
+        if self.headers.get("If-None-Match") == cache["ETag"]:
+            self.send_response(304)
+            self.send_header("ETag", cache["ETag"])
+            self.end_headers()
+            return
+        if path == "/assets/mock.js":
+            return self._send(200, MOCK_JS, "application/javascript", cache)
+        if path == "/assets/vendor.js":
+            return self._send(200, self.state.vendor_js, "application/javascript", cache)
+        if path == "/assets/app.css":
+            return self._send(200, STYLE, "text/css", cache)
+        if path == "/assets/logo.png":
+            return self._send(200, PNG_1PX, "image/png", cache)
+        self._send(404, "not found", "text/plain")
+
+    def _listing(self, q):
+        st = self.state
+        st.count("listing")
+        start, length = int(q.get("start", 0)), int(q.get("length", 10))
+        wanted = (q.get("idsbr") or "").strip()
+        if wanted:
+            ids = [wanted] if wanted.isdigit() else []
+        else:
+            ids = [str(IDSBR_BASE + i) for i in range(start, min(start + length, st.cfg.listing_size))]
+        data = []
+        for idsbr in ids:
+            s = st.row_state(idsbr)
+            data.append([idsbr, f"USAHA SINTETIS {int(idsbr) - IDSBR_BASE}", "Jl. Contoh", LISTING_STATE_TEXT[s],
+                         f'<a class="btn btn-sm btn-edit-perusahaan" aria-label="Edit" '
+                         f'href="{PREFIX}/edit/{idsbr}">Edit</a>'])
+        total = 1 if wanted else st.cfg.listing_size
+        self._json({"draw": int(q.get("draw", 0)), "recordsTotal": total, "recordsFiltered": total, "data": data})
+
+    def _edit(self, idsbr):
+        st = self.state
+        s = st.row_state(idsbr)
+        st.count(f"edit_{s}")
+        if s == "locked":
+            return self._send(200, LOCK_HTML)
+        self._send(200, form_html(idsbr, approval=s == "approval", submitted=s == "submitted",
+                                  latlng_swal=st.chance(idsbr, "latlng") < st.cfg.latlng_rate))
+
+def serve(cfg: MockConfig, host="127.0.0.1", port=0):
+    """Jalankan server di thread daemon. Return (httpd, base_url); httpd.state berisi statistik."""
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    httpd.daemon_threads = True
+    httpd.state = MockState(cfg)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd, f"http://{host}:{httpd.server_address[1]}{PREFIX}"
+
+def add_mock_args(ap):
+    ap.add_argument("--latency-ms", type=int, default=0, help="Latensi tetap tiap request dinamis")
+    ap.add_argument("--jitter-ms", type=int, default=0, help="Tambahan latensi acak 0..N ms")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="Peluang HTTP 500 (listing/edit/cascade/submit)")
+    ap.add_argument("--lock-rate", type=float, default=0.0, help="Porsi IDSBR yang terkunci user lain")
+    ap.add_argument("--approval-rate", type=float, default=0.0, help="Porsi IDSBR yang sedang approval")
+    ap.add_argument("--submitted-rate", type=float, default=0.0, help="Porsi IDSBR yang sudah pernah submit")
+    ap.add_argument("--latlng-rate", type=float, default=0.0, help="Porsi form yang memunculkan swal lat/lng saat dibuka")
+    ap.add_argument("--asset-kb", type=int, default=300, help="Ukuran vendor.js (KB)")
+    ap.add_argument("--listing-size", type=int, default=1000, help="Jumlah baris listing tanpa filter")
+
+def config_from_args(args) -> MockConfig:
+    return MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                      lock_rate=args.lock_rate, approval_rate=args.approval_rate,
+                      submitted_rate=args.submitted_rate, latlng_rate=args.latlng_rate,
+                      asset_kb=args.asset_kb, listing_size=args.listing_size)
+
+def main():
+    ap = argparse.ArgumentParser(description="Mock lokal MatchaPro untuk benchmark worker.py")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    add_mock_args(ap)
+    args = ap.parse_args()
+    httpd, base_url = serve(config_from_args(args), args.host, args.port)
+    print(f"🧪 mock MatchaPro di {base_url} (Ctrl+C untuk berhenti)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"Dihentikan. Statistik: {httpd.state.stats}")
+        httpd.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# reaper.py
+# ------------------------------------------------------------
+# Kembalikan baris 'in_progress' yang lease-nya sudah habis ke 'new'.
+# Lease diset saat klaim dan diperpanjang heartbeat worker.py; kalau proses
+# worker crash, lease berhenti diperpanjang dan baris akan diambil di sini.
+#
+#   python reaper.py                 # sekali jalan
+#   python reaper.py --dry-run       # hanya tampilkan baris yang kedaluwarsa
+#   python reaper.py --loop 60       # ulangi tiap 60 detik
+#
+# ENV (.env): PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGPORT, PGSSLMODE
+#   LEASE_SECONDS=600   # baris lama tanpa lease dianggap habis setelah last_updated + LEASE_SECONDS
+# ------------------------------------------------------------
+
+import os
+import time
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", "600"))
+
+EXPIRED_WHERE = """
+    automation_status = 'in_progress'
+    AND (lease_expires_at < NOW()
+         OR (lease_expires_at IS NULL AND last_updated < NOW() - make_interval(secs => %(grace)s)))
+"""
+
+REAP_SQL = f"""
+UPDATE direktori_ids
+SET automation_status = 'new',
+    assigned_to = NULL,
+    lease_expires_at = NULL,
+    error = left('lease_expired:' || COALESCE(assigned_to, '-'), 1000),
+    attempt_count = COALESCE(attempt_count, 0) + 1,
+    last_updated = NOW()
+WHERE {EXPIRED_WHERE}
+RETURNING id, idsbr
+"""
+
+PREVIEW_SQL = f"""
+SELECT assigned_to, COUNT(*) AS jumlah, MIN(lease_expires_at) AS lease_tertua
+FROM direktori_ids
+WHERE {EXPIRED_WHERE}
+GROUP BY assigned_to
+ORDER BY jumlah DESC
+"""
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        port=int(os.getenv("PGPORT", "5432")),
+        sslmode=os.getenv("PGSSLMODE", "require")
+    )
+
+def reap_once(conn, dry_run=False):
+    with conn.cursor() as cur:
+        if dry_run:
+            cur.execute(PREVIEW_SQL, {"grace": LEASE_SECONDS})
+            rows = cur.fetchall()
+            for who, n, oldest in rows:
+                print(f"   {who or '-'}: {n} baris (lease tertua {oldest})")
+            total = sum(r[1] for r in rows)
+            print(f"🔎 {total} baris lease kedaluwarsa (dry-run, tidak diubah)")
+            conn.rollback()   # jangan biarkan transaksi terbuka (NOW() beku) di antara --loop
+            return total
+        cur.execute(REAP_SQL, {"grace": LEASE_SECONDS})
+        rows = cur.fetchall()
+        if rows:
+            # Bangunkan worker mode daemon (terkirim saat commit)
+            cur.execute("SELECT pg_notify('direktori_new', %s)", (str(len(rows)),))
+    conn.commit()
+    print(f"🧹 {len(rows)} baris dikembalikan ke 'new'")
+    return len(rows)
+
+def main():
+    ap = argparse.ArgumentParser(description="Reaper lease 'in_progress' yang kedaluwarsa")
+    ap.add_argument("--dry-run", action="store_true", help="Tampilkan saja, jangan ubah data")
+    ap.add_argument("--loop", type=int, default=0, help="Ulangi tiap N detik (0 = sekali jalan)")
+    args = ap.parse_args()
+
+    conn = connect()
+    try:
+        while True:
+            reap_once(conn, dry_run=args.dry_run)
+            if args.loop <= 0:
+                break
+            time.sleep(args.loop)
+    except KeyboardInterrupt:
+        print("Dihentikan oleh user.")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# rules.py
+# ------------------------------------------------------------
+# Aturan data yang dipakai bersama worker.py (isi form) dan validate.py (validasi offline).
+# Sengaja tanpa dependency: validate.py tidak ikut memuat playwright/asyncpg/logger worker.
+# ------------------------------------------------------------
+
+import re
+
+EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
+
+# Teks status (lowercase, key terkandung di status) -> id radio kondisi usaha di form
+STATUS_MAP = {
+    "aktif": "kondisi_aktif",
+    "tutup sementara": "kondisi_tutup_sementara",
+    "belum beroperasi": "kondisi_belum_operasi",
+    "belum beroperasi/berproduksi": "kondisi_belum_operasi",
+    "tutup": "kondisi_tutup",
+    "alih usaha": "kondisi_alih_usaha",
+    "tidak ditemukan": "kondisi_tidak_ditemukan",
+    "aktif pindah": "kondisi_aktif_pindah",
+    "aktif nonrespon": "kondisi_aktif_nonrespon",
+    "duplikat": "kondisi_duplikat",
+    "salah kode wilayah": "kondisi_salah_kode_wilayah",
+}
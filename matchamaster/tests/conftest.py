@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# script matchamaster dijalankan dari foldernya sendiri (import rules, validate, ...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,95 @@
+import json
+
+import pandas as pd
+import pytest
+
+from validate import validate
+
+BASE = {"id": 1, "idsbr": "1", "nama_usaha": "Toko", "email": "toko@example.com",
+        "nomor_telepon": "0215551234", "nomor_whatsapp": "081234567890",
+        "latitude": -6.2, "longitude": 106.8, "tahun_berdiri": "2005",
+        "kbli": "47111", "kategori": "G", "status": "Aktif"}
+
+def run(**changes):
+    df = pd.DataFrame([{**BASE, **changes}])
+    return validate(df).iloc[0]
+
+def errors(res):
+    return set((res["validation_errors"] or "").split("; ")) - {""}
+
+def original(res):
+    return json.loads(res["validation_original"]) if res["validation_original"] else {}
+
+def test_good_row_untouched():
+    res = run()
+    assert res["validation_status"] == "ok"
+    assert pd.isna(res["validation_errors"])
+    assert res["validation_original"] is None
+    assert res["latitude"] == -6.2 and res["nomor_telepon"] == "0215551234"
+
+def test_swapped_coordinates_fixed():
+    res = run(latitude=106.8, longitude=-6.2)
+    assert res["validation_status"] == "fixed"
+    assert "latlng_tertukar" in errors(res)
+    assert (res["latitude"], res["longitude"]) == (-6.2, 106.8)
+    assert original(res) == {"latitude": 106.8, "longitude": -6.2}
+
+def test_coordinates_outside_indonesia_cleared():
+    res = run(latitude=48.85, longitude=2.35)
+    assert "latlng_tidak_valid" in errors(res)
+    assert pd.isna(res["latitude"]) and pd.isna(res["longitude"])
+    assert original(res) == {"latitude": 48.85, "longitude": 2.35}
+
+@pytest.mark.parametrize("raw, expected, rule", [
+    ("(021) 555-1234", "0215551234", "nomor_telepon_dinormalisasi"),
+    ("12345", None, "nomor_telepon_tidak_valid"),               # < 6 digit
+    ("1234567890123456", None, "nomor_telepon_tidak_valid"),    # > 15 digit
+])
+def test_phone_length(raw, expected, rule):
+    res = run(nomor_telepon=raw)
+    assert res["validation_status"] == "fixed"
+    assert rule in errors(res)
+    assert (None if pd.isna(res["nomor_telepon"]) else res["nomor_telepon"]) == expected
+    assert original(res) == {"nomor_telepon": raw}
+
+def test_invalid_email_cleared_but_kept():
+    res = run(email="bukan email")
+    assert "email_tidak_valid" in errors(res)
+    assert pd.isna(res["email"])
+    assert original(res) == {"email": "bukan email"}
+
+def test_kategori_from_kbli_prefix():
+    res = run(kbli="10110", kategori="g")
+    assert res["validation_status"] == "fixed"
+    assert "kategori_dari_kbli" in errors(res)
+    assert res["kategori"] == "C"
+    assert original(res) == {"kategori": "g"}
+
+@pytest.mark.parametrize("kbli", ["00000", "4711", "A4711"])
+def test_unknown_kbli_invalid(kbli):
+    res = run(kbli=kbli)
+    assert res["validation_status"] == "invalid"
+    assert "kbli_tidak_dikenal" in errors(res)
+
+@pytest.mark.parametrize("raw, expected, rule", [
+    ("th. 1998", "1998", "tahun_berdiri_dinormalisasi"),
+    ("1899", None, "tahun_berdiri_tidak_valid"),
+    ("2999", None, "tahun_berdiri_tidak_valid"),
+])
+def test_tahun_range(raw, expected, rule):
+    res = run(tahun_berdiri=raw)
+    assert res["validation_status"] == "fixed"
+    assert rule in errors(res)
+    assert (None if pd.isna(res["tahun_berdiri"]) else res["tahun_berdiri"]) == expected
+    assert original(res) == {"tahun_berdiri": raw}
+
+def test_unmapped_status_invalid():
+    res = run(status="entah")
+    assert res["validation_status"] == "invalid"
+    assert errors(res) == {"status_tidak_terpetakan"}
+
+def test_empty_optional_fields_ok():
+    res = run(email=None, nomor_telepon=None, nomor_whatsapp=None, latitude=None, longitude=None,
+              tahun_berdiri=None, kbli=None, kategori=None, status=None)
+    assert res["validation_status"] == "ok"
+    assert res["validation_original"] is None
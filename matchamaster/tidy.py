@@ -32,7 +32,12 @@ query = """
     WHERE idsbr = ANY(%s)
 """
 cur.execute(query, (ids_list,))
-print(f"Updated rows: {cur.rowcount}")
+updated = cur.rowcount
+print(f"Updated rows: {updated}")
+
+# Bangunkan worker mode daemon (terkirim saat commit)
+if updated:
+    cur.execute("SELECT pg_notify('direktori_new', %s)", (str(updated),))
 
 # === Commit and close ===
 conn.commit()
@@ -0,0 +1,104 @@
+# timings.py
+# ------------------------------------------------------------
+# Laporan p50/p90/p99 durasi per step process_row dari span yang ditulis worker.py
+# (tabel direktori_step_timings, atau CSV bila worker jalan dengan STEP_TIMINGS=csv).
+#
+#   python timings.py                    # per step, 24 jam terakhir
+#   python timings.py --by worker        # per worker x step
+#   python timings.py --by hour --hours 72
+#   python timings.py --csv step_timings.csv
+#
+# ENV (.env): PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGPORT, PGSSLMODE
+# ------------------------------------------------------------
+
+import os
+import argparse
+import psycopg2
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --by -> (ekspresi SQL, kolom CSV) kunci grup; step selalu jadi kunci terakhir
+GROUPS = {
+    "step": ([], []),
+    "worker": (["worker"], ["worker"]),
+    "hour": (["to_char(date_trunc('hour', started_at), 'YYYY-MM-DD HH24:00')"], ["hour"]),
+}
+
+REPORT_SQL = """
+SELECT {keys}step,
+       COUNT(*) AS n,
+       percentile_cont(0.5)  WITHIN GROUP (ORDER BY ms) AS p50,
+       percentile_cont(0.9)  WITHIN GROUP (ORDER BY ms) AS p90,
+       percentile_cont(0.99) WITHIN GROUP (ORDER BY ms) AS p99,
+       AVG(cdp_calls) AS calls,
+       COUNT(*) FILTER (WHERE outcome <> 'ok') AS not_ok
+FROM direktori_step_timings
+WHERE started_at >= NOW() - make_interval(hours => %(hours)s)
+GROUP BY {keys}step
+ORDER BY {keys}p50 DESC
+"""
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        port=int(os.getenv("PGPORT", "5432")),
+        sslmode=os.getenv("PGSSLMODE", "require")
+    )
+
+def from_db(by, hours):
+    sql_keys = GROUPS[by][0]
+    sql = REPORT_SQL.format(keys="".join(f"{k}, " for k in sql_keys))
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql, {"hours": hours})
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+    nkeys = len(sql_keys)
+    return [(" ".join(str(k) for k in r[:nkeys]).strip(),) + tuple(r[nkeys:]) for r in rows]
+
+def from_csv(path, by, hours):
+    import pandas as pd
+    df = pd.read_csv(path, parse_dates=["started_at"])
+    df = df[df["started_at"] >= pd.Timestamp.now() - pd.Timedelta(hours=hours)]
+    df["hour"] = df["started_at"].dt.strftime("%Y-%m-%d %H:00")
+    keys = GROUPS[by][1] + ["step"]
+    g = df.groupby(keys)
+    out = pd.DataFrame({
+        "n": g.size(),
+        "p50": g["ms"].quantile(0.5), "p90": g["ms"].quantile(0.9), "p99": g["ms"].quantile(0.99),
+        "calls": g["cdp_calls"].mean(),
+        "not_ok": g["outcome"].apply(lambda s: int((s != "ok").sum())),
+    }).reset_index()
+    out = out.sort_values(keys[:-1] + ["p50"], ascending=[True] * (len(keys) - 1) + [False])
+    return [(" ".join(str(r[k]) for k in keys[:-1]), r["step"], r["n"], r["p50"], r["p90"], r["p99"],
+             r["calls"], r["not_ok"]) for _, r in out.iterrows()]
+
+def print_report(rows, by):
+    if not rows:
+        print("Belum ada data timing.")
+        return
+    head = f"{by:<22}" if by != "step" else ""
+    print(f"{head}{'step':<12} {'n':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'calls':>7} {'!ok':>5}")
+    for key, st, n, p50, p90, p99, calls, not_ok in rows:
+        prefix = f"{key:<22}" if by != "step" else ""
+        calls_s = f"{calls:.1f}" if calls is not None and calls == calls else "-"
+        print(f"{prefix}{st:<12} {n:>7} {p50:>9.0f} {p90:>9.0f} {p99:>9.0f} {calls_s:>7} {not_ok:>5}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Persentil durasi step worker.py")
+    ap.add_argument("--by", choices=list(GROUPS), default="step", help="Kelompokkan per step / worker / jam")
+    ap.add_argument("--hours", type=int, default=24, help="Rentang data N jam terakhir (default 24)")
+    ap.add_argument("--csv", help="Baca dari CSV (STEP_TIMINGS=csv) alih-alih tabel DB")
+    args = ap.parse_args()
+
+    rows = from_csv(args.csv, args.by, args.hours) if args.csv else from_db(args.by, args.hours)
+    print_report(rows, args.by)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# validate.py
+# ------------------------------------------------------------
+# Validasi offline direktori_ids sebelum worker membuka browser.
+# Semua aturan dijalankan vektor (pandas) atas seluruh baris yang belum done:
+#   - latitude/longitude : angka (koma desimal diperbaiki), dalam batas Indonesia,
+#                          tertukar -> ditukar
+#   - email              : EMAIL_RE (rules.py, sama dengan worker); tidak valid -> dikosongkan
+#   - telepon/whatsapp   : digit saja, 6..15 digit; selain itu dikosongkan
+#   - tahun_berdiri      : 4 digit 1900..tahun ini; selain itu dikosongkan
+#   - kbli               : 5 digit dengan golongan pokok KBLI 2020 yang dikenal;
+#                          kategori diisi/diperbaiki dari 2 digit pertama
+#   - status             : bila diisi, harus terpetakan ke radio kondisi (STATUS_MAP rules.py)
+#
+# Hasil: kolom validation_status ('ok' | 'fixed' | 'invalid'), validation_errors,
+# nilai yang dinormalisasi ditulis balik. Nilai asli kolom yang diubah/dikosongkan disimpan di
+# validation_original (JSONB, nilai asli pertama tidak pernah ditimpa validasi ulang). Worker hanya klaim 'ok'/'fixed' (NOTIFY direktori_new
+# dikirim setelah commit). Baris 'fixed'/'invalid' ditulis ke validation_report.csv.
+# Wajib dijalankan setelah migrate.py versi 9 / setiap import: baris yang belum divalidasi
+# (validation_status NULL) tidak pernah diklaim worker.
+#
+#   python validate.py              # validasi baris yang belum pernah divalidasi
+#   python validate.py --all        # validasi ulang semua baris yang belum done
+#   python validate.py --dry-run    # hitung & tulis report saja, DB tidak diubah
+#
+# ENV (.env): PGHOST, PGDATABASE, PGUSER, PGPASSWORD, PGPORT, PGSSLMODE
+# ------------------------------------------------------------
+
+import os
+import json
+import time
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+import psycopg2
+from psycopg2.extras import execute_values
+from dotenv import load_dotenv
+
+from rules import STATUS_MAP, EMAIL_RE
+
+load_dotenv()
+
+REPORT_PATH = "validation_report.csv"
+
+# Batas kasar wilayah Indonesia
+LAT_RANGE = (-11.5, 6.5)
+LNG_RANGE = (94.5, 141.5)
+
+# Golongan pokok (2 digit) KBLI 2020 -> kategori
+KBLI_KATEGORI = {}
+for _kat, _lo, _hi in [
+    ("A", 1, 3), ("B", 5, 9), ("C", 10, 33), ("D", 35, 35), ("E", 36, 39),
+    ("F", 41, 43), ("G", 45, 47), ("H", 49, 53), ("I", 55, 56), ("J", 58, 63),
+    ("K", 64, 66), ("L", 68, 68), ("M", 69, 75), ("N", 77, 82), ("O", 84, 84),
+    ("P", 85, 85), ("Q", 86, 88), ("R", 90, 93), ("S", 94, 96), ("T", 97, 98),
+    ("U", 99, 99),
+]:
+    for _g in range(_lo, _hi + 1):
+        KBLI_KATEGORI[f"{_g:02d}"] = _kat
+
+FIELDS = ["email", "nomor_telepon", "nomor_whatsapp", "latitude", "longitude",
+          "tahun_berdiri", "kategori"]
+
+SELECT_SQL = """
+SELECT id, idsbr, nama_usaha, email, nomor_telepon, nomor_whatsapp, latitude, longitude,
+       tahun_berdiri, kbli, kategori, status
+FROM direktori_ids
+WHERE automation_status <> 'done' {extra}
+"""
+
+UPDATE_SQL = """
+UPDATE direktori_ids d
+SET email = v.email,
+    nomor_telepon = v.nomor_telepon,
+    nomor_whatsapp = v.nomor_whatsapp,
+    latitude = v.latitude::double precision,
+    longitude = v.longitude::double precision,
+    tahun_berdiri = v.tahun_berdiri,
+    kategori = v.kategori,
+    validation_status = v.validation_status,
+    validation_errors = v.validation_errors,
+    -- key yang sudah ada (nilai asli dari import) menang atas hasil validasi ulang
+    validation_original = NULLIF(COALESCE(v.validation_original::jsonb, '{}')
+                                 || COALESCE(d.validation_original, '{}'), '{}'::jsonb),
+    validated_at = NOW()
+FROM (VALUES %s) AS v(id, email, nomor_telepon, nomor_whatsapp, latitude, longitude,
+                     tahun_berdiri, kategori, validation_status, validation_errors, validation_original)
+WHERE d.id = v.id
+"""
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("PGHOST"),
+        database=os.getenv("PGDATABASE"),
+        user=os.getenv("PGUSER"),
+        password=os.getenv("PGPASSWORD"),
+        port=int(os.getenv("PGPORT", "5432")),
+        sslmode=os.getenv("PGSSLMODE", "require")
+    )
+
+def notify_new_rows(conn, n):
+    """Baris baru bisa diklaim: bangunkan worker --daemon (LISTEN direktori_new) tanpa menunggu DAEMON_POLL_S."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_notify('direktori_new', %s)", (str(n),))
+    conn.commit()
+
+def _text(s: pd.Series) -> pd.Series:
+    """Series string ter-strip; kosong -> NA."""
+    s = s.astype("string").str.strip()
+    return s.mask(s == "")
+
+def _num(s: pd.Series) -> pd.Series:
+    """Angka float64 biasa (NaN, bukan <NA>) agar between()/perbandingan selalu True/False."""
+    return pd.Series(pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan), index=s.index)
+
+def _originals(df: pd.DataFrame, out: pd.DataFrame) -> pd.Series:
+    """JSON {kolom: nilai asli} untuk FIELDS yang diubah/dikosongkan; None bila tidak ada."""
+    parts = pd.Series("", index=df.index, dtype=object)
+    for col in FIELDS:
+        raw = df[col]
+        if col in ("latitude", "longitude"):
+            same = _num(raw) == out[col]
+        else:
+            same = (raw.astype("string") == out[col].astype("string")).fillna(False).astype(bool)
+        changed = raw.notna() & ~same
+        parts[changed] += raw[changed].map(lambda v, col=col: f"{json.dumps(col)}: {json.dumps(_py(v))}, ")
+    return ("{" + parts.str.rstrip(", ") + "}").where(parts != "", None)
+
+def validate(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Return DataFrame baru (index sama) berisi FIELDS yang sudah dinormalisasi +
+    validation_status, validation_errors & validation_original. Tidak ada loop per baris.
+    """
+    out = pd.DataFrame(index=df.index)
+    fixes, fatal = {}, {}   # nama aturan -> mask baris
+
+    # latitude / longitude
+    lat_raw, lng_raw = _text(df["latitude"]), _text(df["longitude"])
+    lat = _num(lat_raw.str.replace(",", ".", regex=False))
+    lng = _num(lng_raw.str.replace(",", ".", regex=False))
+    lat_ok = lat.between(*LAT_RANGE)
+    lng_ok = lng.between(*LNG_RANGE)
+    swapped = ~lat_ok & ~lng_ok & lng.between(*LAT_RANGE) & lat.between(*LNG_RANGE)
+    lat, lng = lat.where(~swapped, lng), lng.where(~swapped, lat)
+    fixes["latlng_tertukar"] = swapped
+    bad_coord = (lat_raw.notna() | lng_raw.notna()) & ~(lat.between(*LAT_RANGE) & lng.between(*LNG_RANGE))
+    fixes["latlng_tidak_valid"] = bad_coord
+    out["latitude"] = lat.where(~bad_coord)
+    out["longitude"] = lng.where(~bad_coord)
+
+    # email
+    email = _text(df["email"])
+    email_ok = email.str.fullmatch(EMAIL_RE.pattern.strip("^$")).fillna(False).astype(bool)
+    fixes["email_tidak_valid"] = email.notna() & ~email_ok
+    out["email"] = email.where(email_ok)
+
+    # telepon / whatsapp
+    for col in ("nomor_telepon", "nomor_whatsapp"):
+        raw = _text(df[col])
+        digits = raw.str.replace(r"\D", "", regex=True)
+        ok = digits.str.len().between(6, 15).fillna(False).astype(bool)
+        fixes[f"{col}_tidak_valid"] = raw.notna() & ~ok
+        out[col] = digits.where(ok)
+        fixes[f"{col}_dinormalisasi"] = ok & (digits != raw)
+
+    # tahun berdiri
+    tahun_raw = _text(df["tahun_berdiri"])
+    tahun_num = _num(tahun_raw.str.extract(r"(\d{4})", expand=False))
+    tahun_ok = tahun_num.between(1900, datetime.date.today().year)
+    out["tahun_berdiri"] = tahun_num.where(tahun_ok).astype("Int64").astype("string")
+    fixes["tahun_berdiri_tidak_valid"] = tahun_raw.notna() & ~tahun_ok
+    fixes["tahun_berdiri_dinormalisasi"] = tahun_ok & (out["tahun_berdiri"] != tahun_raw)
+
+    # KBLI + kategori
+    kbli = _text(df["kbli"])
+    kategori = _text(df["kategori"]).str.upper()
+    kat_from_kbli = kbli.str[:2].map(KBLI_KATEGORI)
+    kbli_ok = kbli.str.fullmatch(r"\d{5}").fillna(False).astype(bool) & kat_from_kbli.notna()
+    fatal["kbli_tidak_dikenal"] = kbli.notna() & ~kbli_ok
+    out["kategori"] = kategori.where(~kbli_ok, kat_from_kbli)
+    fixes["kategori_dari_kbli"] = kbli_ok & (kategori.fillna("") != kat_from_kbli.fillna(""))
+
+    # status -> radio kondisi (aturan sama dengan set_keberadaan_usaha: key terkandung di status)
+    status = _text(df["status"]).str.lower()
+    mapped = pd.Series(False, index=df.index)
+    for key in STATUS_MAP:
+        mapped |= status.str.contains(key, regex=False).fillna(False).astype(bool)
+    fatal["status_tidak_terpetakan"] = status.notna() & ~mapped
+
+    # perbandingan dengan NA menghasilkan NA -> anggap tidak kena aturan
+    fatal = {k: m.fillna(False).astype(bool) for k, m in fatal.items()}
+    fixes = {k: m.fillna(False).astype(bool) for k, m in fixes.items()}
+    errors = pd.Series("", index=df.index, dtype="string")
+    for name, mask in {**fatal, **fixes}.items():
+        errors = errors.mask(mask, errors + name + "; ")
+    is_fatal = np.logical_or.reduce([m.to_numpy() for m in fatal.values()])
+    is_fixed = np.logical_or.reduce([m.to_numpy() for m in fixes.values()])
+    out["validation_status"] = np.where(is_fatal, "invalid", np.where(is_fixed, "fixed", "ok"))
+    out["validation_errors"] = errors.str.rstrip("; ").mask(errors == "")
+    out["validation_original"] = _originals(df, out)
+    return out
+
+def _py(v):
+    return None if v is None or v is pd.NA or (isinstance(v, float) and np.isnan(v)) else v
+
+def main():
+    ap = argparse.ArgumentParser(description="Validasi offline direktori_ids sebelum worker jalan")
+    ap.add_argument("--all", action="store_true", help="Validasi ulang semua baris yang belum done")
+    ap.add_argument("--dry-run", action="store_true", help="Jangan ubah DB, tulis report saja")
+    args = ap.parse_args()
+
+    conn = connect()
+    try:
+        extra = "" if args.all else "AND validation_status IS NULL"
+        df = pd.read_sql(SELECT_SQL.format(extra=extra), conn)
+        if df.empty:
+            print("✅ Tidak ada baris yang perlu divalidasi.")
+            return
+        t0 = time.perf_counter()
+        res = validate(df)
+        ms = (time.perf_counter() - t0) * 1000
+        counts = res["validation_status"].value_counts().to_dict()
+        print(f"🔎 {len(df)} baris divalidasi dalam {ms:.0f} ms "
+              f"({ms / len(df) * 1000:.1f} ms/1000 baris): {counts}")
+
+        bad = res["validation_status"] != "ok"
+        if bad.any():
+            report = pd.concat([df.loc[bad, ["idsbr", "nama_usaha"]],
+                                res.loc[bad, ["validation_status", "validation_errors", "validation_original"]]],
+                               axis=1)
+            report.sort_values(["validation_status", "idsbr"]).to_csv(REPORT_PATH, index=False)
+            print(f"💾 {int(bad.sum())} baris fixed/invalid ditulis ke {REPORT_PATH}")
+            top = res.loc[bad, "validation_errors"].str.split("; ").explode().value_counts().head(10)
+            for name, n in top.items():
+                print(f"   {name}: {n}")
+
+        if args.dry_run:
+            print("(dry-run, DB tidak diubah)")
+            return
+        rows = [tuple(_py(v) for v in r) for r in
+                pd.concat([df[["id"]], res[FIELDS + ["validation_status", "validation_errors",
+                                                     "validation_original"]]], axis=1)
+                .astype(object).itertuples(index=False, name=None)]
+        with conn.cursor() as cur:
+            execute_values(cur, UPDATE_SQL, rows, page_size=1000)
+        conn.commit()
+        print(f"✅ {len(rows)} baris diperbarui. Worker hanya mengklaim baris 'ok'/'fixed'.")
+        claimable = int(res["validation_status"].isin(["ok", "fixed"]).sum())
+        if claimable:
+            notify_new_rows(conn, claimable)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
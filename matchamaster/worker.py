@@ -15,6 +15,39 @@
 #   BASE_URL=https://matchapro.web.bps.go.id/direktori-usaha
 #   STORAGE_STATE=storage_state.json
 #   NUM_WORKERS=3
+#   CLAIM_BATCH_SIZE=8        # jumlah baris yang diklaim sekaligus per proses
+#   STATUS_FLUSH_ROWS=16      # flush update status tiap N hasil
+#   STATUS_FLUSH_MS=2000      # ... atau tiap T milidetik
+#   LEASE_SECONDS=600         # masa berlaku lease baris 'in_progress' (diperpanjang heartbeat)
+#   REAP_INTERVAL_S=60        # interval reaper lease kedaluwarsa (0 = nonaktif)
+#   DAEMON=false              # true: antrian kosong -> tunggu NOTIFY, jangan exit (sama dengan --daemon)
+#   BROWSERS_PER_HOST=1       # jumlah proses Chromium per PC (worker berbagi lewat BrowserContext)
+#   BROWSER_STATS_S=60        # interval log RAM/CPU browser (butuh psutil)
+#   PAGE_RECYCLE_ROWS=25      # pakai ulang 1 tab untuk N row (1 = tab baru tiap row)
+#   ROUTE_POLICY=block        # block | measure (hitung saja) | off
+#   BLOCK_RESOURCE_TYPES=image,media   # font tidak diblok: dilayani dari asset cache (ASSET_CACHE_TYPES)
+#   BLOCK_URL_PATTERNS=...    # regex dipisah koma (default: analytics & tile peta)
+#   ALLOW_URL_PATTERNS=       # regex dipisah koma, menang atas daftar block
+#   ASSET_CACHE_DIR=.asset_cache   # cache JS/CSS di disk, dipakai semua worker di PC ini (kosong = nonaktif)
+#   ASSET_CACHE_REVALIDATE_S=21600 # revalidasi (ETag/Last-Modified) setelah N detik
+#   CASCADE_CACHE_DIR=.cascade_cache   # cache respons AJAX daftar kab/kec/kel (kosong = nonaktif)
+#   CASCADE_CACHE_VERSION=1        # naikkan untuk membuang seluruh cache cascade
+#   CASCADE_REFRESH_S=86400        # ambil ulang daftar dari server setelah N detik
+#   CASCADE_URL_PATTERNS=...       # regex dipisah koma untuk path endpoint cascade (GET)
+#   CASCADE_POST_ENDPOINTS=        # regex path lengkap endpoint cascade POST yang boleh di-cache (default: tidak ada)
+#   FUZZY_VOCAB_FILE=.fuzzy_vocab.json  # daftar pilihan badan usaha/jaringan usaha dari form (relatif ke folder worker.py)
+#   FUZZY_MIN_SCORE=60        # skor rapidfuzz minimum; di bawahnya field tidak diisi & dilaporkan
+#   FORM_ENGINE=batch         # batch: snapshot + isi field yang berubah dalam 2 evaluate | legacy: setter per field
+#   STEP_TIMINGS=db           # db (tabel direktori_step_timings) | csv (STEP_TIMINGS_CSV) | off
+#   STEP_TIMINGS_CSV=step_timings.csv
+#   STEP_CDP_CALLS=false      # true: hitung call Playwright per span (membungkus internal Playwright; profiling saja)
+#   METRICS_PORT=0            # >0: endpoint Prometheus di http://METRICS_HOST:PORT/metrics (0 = nonaktif)
+#   METRICS_HOST=127.0.0.1
+#   HARVEST_PAGE_LEN=500      # baris per request DataTables saat --harvest
+#   HARVEST_STATUS_COLUMN=    # kolom status listing: indeks (baris list) atau key (baris dict); kosong = hanya tombol
+#   WILAYAH_CASCADE_URL=      # template endpoint cascade untuk --crawl-wilayah, mis. /api/wilayah/{level}?parent={parent}
+#   WILAYAH_CASCADE_LEVELS=kabupaten,kecamatan,kelurahan   # nilai {level} untuk kab, kec, desa
+#   DAEMON_POLL_S=300         # cadangan: tetap coba klaim tiap N detik walau tidak ada NOTIFY
 #   WORKER_NAME=pc-jakpus-01
 #   HEADLESS=false
 #   TIMEOUT_MS=120000
@@ -23,8 +56,16 @@
 
 import os
 import re
+import json
+import time
+import hashlib
 import argparse
 import asyncio
+import datetime
+import contextlib
+import contextvars
+from collections import deque
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
 from dotenv import load_dotenv
 from loguru import logger
 from tenacity import (
@@ -33,7 +74,14 @@ from tenacity import (
 )
 import asyncpg
 from playwright.async_api import async_playwright, TimeoutError as PWTimeout
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
+
+from rules import STATUS_MAP, EMAIL_RE
+
+try:
+    import psutil  # opsional: statistik RAM/CPU browser pool
+except ImportError:
+    psutil = None
 
 load_dotenv()
 
@@ -48,6 +96,52 @@ PGSSLMODE = os.getenv("PGSSLMODE", "require")
 BASE_URL = os.getenv("BASE_URL", "https://example.com")
 STORAGE_STATE = os.getenv("STORAGE_STATE", "storage_state.json")
 NUM_WORKERS = int(os.getenv("NUM_WORKERS", "2"))
+CLAIM_BATCH_SIZE = max(1, int(os.getenv("CLAIM_BATCH_SIZE", str(NUM_WORKERS))))
+STATUS_FLUSH_ROWS = max(1, int(os.getenv("STATUS_FLUSH_ROWS", "16")))
+STATUS_FLUSH_MS = int(os.getenv("STATUS_FLUSH_MS", "2000"))
+LEASE_SECONDS = max(30, int(os.getenv("LEASE_SECONDS", "600")))
+HARVEST_PAGE_LEN = max(10, int(os.getenv("HARVEST_PAGE_LEN", "500")))
+HARVEST_STATUS_COLUMN = os.getenv("HARVEST_STATUS_COLUMN", "").strip()
+WILAYAH_CASCADE_URL = os.getenv("WILAYAH_CASCADE_URL", "").strip()
+WILAYAH_CASCADE_LEVELS = ([lv.strip() for lv in os.getenv(
+    "WILAYAH_CASCADE_LEVELS", "kabupaten,kecamatan,kelurahan").split(",")] + ["", "", ""])[:3]
+STEP_TIMINGS = os.getenv("STEP_TIMINGS", "db").strip().lower()
+STEP_TIMINGS_CSV = os.getenv("STEP_TIMINGS_CSV", "step_timings.csv").strip()
+STEP_CDP_CALLS = os.getenv("STEP_CDP_CALLS", "false").lower() == "true"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1").strip()
+REAP_INTERVAL_S = int(os.getenv("REAP_INTERVAL_S", "60"))
+DAEMON = os.getenv("DAEMON", "false").lower() == "true"
+DAEMON_POLL_S = int(os.getenv("DAEMON_POLL_S", "300"))
+BROWSERS_PER_HOST = max(1, int(os.getenv("BROWSERS_PER_HOST", "1")))
+BROWSER_STATS_S = int(os.getenv("BROWSER_STATS_S", "60"))
+PAGE_RECYCLE_ROWS = max(1, int(os.getenv("PAGE_RECYCLE_ROWS", "25")))
+FORM_ENGINE = os.getenv("FORM_ENGINE", "batch").strip().lower()
+# path relatif dihitung dari folder worker.py (bukan CWD), agar semua cara menjalankan memakai file yang sama
+FUZZY_VOCAB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.getenv("FUZZY_VOCAB_FILE", ".fuzzy_vocab.json").strip())
+FUZZY_MIN_SCORE = int(os.getenv("FUZZY_MIN_SCORE", "60"))
+
+ROUTE_POLICY = os.getenv("ROUTE_POLICY", "block").strip().lower()
+BLOCK_RESOURCE_TYPES = {t.strip() for t in os.getenv("BLOCK_RESOURCE_TYPES", "image,media").split(",") if t.strip()}
+BLOCK_URL_PATTERNS = [p.strip() for p in os.getenv("BLOCK_URL_PATTERNS", ",".join([
+    r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net",
+    r"connect\.facebook\.net", r"hotjar\.com",
+    r"tile\.openstreetmap\.org", r"mt\d*\.google(apis)?\.com/vt", r"arcgisonline\.com/.+/tile/",
+])).split(",") if p.strip()]
+ASSET_CACHE_DIR = os.getenv("ASSET_CACHE_DIR", ".asset_cache").strip()
+ASSET_CACHE_REVALIDATE_S = int(os.getenv("ASSET_CACHE_REVALIDATE_S", "21600"))
+ASSET_CACHE_TYPES = {"script", "stylesheet", "font"}   # tipe yang diblok NetPolicy tidak pernah sampai ke cache
+ALLOW_URL_PATTERNS = [p.strip() for p in os.getenv("ALLOW_URL_PATTERNS", "").split(",") if p.strip()]
+CASCADE_CACHE_DIR = os.getenv("CASCADE_CACHE_DIR", ".cascade_cache").strip()
+CASCADE_CACHE_VERSION = os.getenv("CASCADE_CACHE_VERSION", "1").strip()
+CASCADE_REFRESH_S = int(os.getenv("CASCADE_REFRESH_S", "86400"))
+CASCADE_URL_PATTERNS = [p.strip() for p in os.getenv(
+    "CASCADE_URL_PATTERNS", r"kabupaten,kota,kecamatan,kelurahan,desa,wilayah").split(",") if p.strip()]
+CASCADE_POST_ENDPOINTS = [p.strip() for p in os.getenv("CASCADE_POST_ENDPOINTS", "").split(",") if p.strip()]
+
+# Channel NOTIFY saat ada baris 'new' (importer, validate.py, tidy.py, reaper, release)
+NOTIFY_CHANNEL = "direktori_new"
 WORKER_NAME = os.getenv("WORKER_NAME", "worker-1")
 HEADLESS = os.getenv("HEADLESS", "false").lower() == "true"
 TIMEOUT_MS = int(os.getenv("TIMEOUT_MS", "120000"))
@@ -113,6 +207,7 @@ SEL = {
 
     # Overlay loading
     "block_ui": ".blockUI",
+    "dt_processing": ".dataTables_processing",
 
     # Halaman/form indikator
     "form_header": 'h4:has-text("Form Update Usaha/Perusahaan")',
@@ -136,16 +231,18 @@ class ApprovalInProgress(Exception): ...
 
 # ---------- Koneksi DB ----------
 async def get_pool():
-    return await asyncpg.create_pool(
+    pool = await asyncpg.create_pool(
         host=PGHOST, database=PGDATABASE, user=PGUSER, password=PGPASSWORD,
         port=PGPORT, ssl=True, min_size=1, max_size=max(2, NUM_WORKERS + 1)
     )
+    return TimedPool(pool) if METRICS.enabled else pool
 
 CLAIM_SQL = """
 WITH cte AS (
   SELECT id
   FROM direktori_ids
   WHERE automation_status = 'new'
+    AND validation_status IN ('ok', 'fixed')   -- lolos validate.py
   ORDER BY attempt_count ASC, id ASC
   LIMIT 1
   FOR UPDATE SKIP LOCKED
@@ -154,6 +251,7 @@ UPDATE direktori_ids d
 SET automation_status = 'in_progress',
     assigned_to = $1,
     first_taken_at = COALESCE(first_taken_at, NOW() ),
+    lease_expires_at = NOW() + make_interval(secs => $2),
     last_updated = NOW()
 FROM cte
 WHERE d.id = cte.id
@@ -163,7 +261,212 @@ RETURNING d.*;
 async def claim_one(pool, who):
     async with pool.acquire() as c:
         async with c.transaction():
-            return await c.fetchrow(CLAIM_SQL, who)
+            return await c.fetchrow(CLAIM_SQL, who, LEASE_SECONDS)
+
+# Sama seperti CLAIM_SQL, tapi ambil sampai $2 baris dalam 1 round trip,
+# sekalian URL edit yang sudah pernah ditemukan (direktori_edit_urls)
+CLAIM_BATCH_SQL = """
+WITH cte AS (
+  SELECT id, idsbr
+  FROM direktori_ids
+  WHERE automation_status = 'new'
+    AND validation_status IN ('ok', 'fixed')   -- lolos validate.py
+  ORDER BY attempt_count ASC, id ASC
+  LIMIT $2
+  FOR UPDATE SKIP LOCKED
+)
+UPDATE direktori_ids d
+SET automation_status = 'in_progress',
+    assigned_to = $1,
+    first_taken_at = COALESCE(first_taken_at, NOW() ),
+    lease_expires_at = NOW() + make_interval(secs => $3),
+    last_updated = NOW()
+FROM cte
+LEFT JOIN direktori_edit_urls u ON u.idsbr = cte.idsbr
+WHERE d.id = cte.id
+RETURNING d.*, u.edit_url;
+"""
+
+async def claim_batch(pool, who, n):
+    async with pool.acquire() as c:
+        async with c.transaction():
+            rows = await c.fetch(CLAIM_BATCH_SQL, who, n, LEASE_SECONDS)
+    # UPDATE ... RETURNING tidak menjamin urutan, samakan dengan urutan klaim
+    return sorted(rows, key=lambda r: (r["attempt_count"] or 0, r["id"]))
+
+# Atribusi per coroutine: batch diklaim atas nama proses (WORKER_NAME), lalu saat baris
+# dibagikan ke run_worker tag WORKER_NAME:idx ditulis batch oleh StatusWriter.
+ASSIGN_BATCH_SQL = """
+UPDATE direktori_ids d
+SET assigned_to = v.who
+FROM unnest($1::int[], $2::text[]) AS v(id, who)
+WHERE d.id = v.id
+  AND d.automation_status = 'in_progress'
+  AND d.assigned_to = $3;
+"""
+
+async def notify_new_rows(conn, n):
+    """Bangunkan worker mode daemon di semua PC (payload = jumlah baris baru)."""
+    if n:
+        await conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, str(n))
+
+async def release_unclaimed(pool, ids, who):
+    """Kembalikan baris yang sudah diklaim tapi belum sempat diproses ke 'new' (attempt tidak bertambah)."""
+    if not ids:
+        return 0
+    async with pool.acquire() as c:
+        res = await c.execute("""UPDATE direktori_ids
+            SET automation_status='new', assigned_to=NULL, lease_expires_at=NULL, last_updated=NOW()
+            WHERE id = ANY($1::int[]) AND automation_status='in_progress' AND assigned_to=$2""",
+            list(ids), who)
+        n = int(res.split()[-1]) if res else 0
+        await notify_new_rows(c, n)
+    return n
+
+async def extend_leases(pool, ids, who, seconds=LEASE_SECONDS):
+    """
+    Heartbeat: perpanjang lease semua baris yang masih dipegang proses ini (1 UPDATE).
+    Hanya baris ber-assigned_to `who` (belum dibagikan) atau `who:idx`; baris yang sudah
+    di-reap lalu diklaim worker lain tidak ikut diperpanjang.
+    """
+    if not ids:
+        return
+    async with pool.acquire() as c:
+        await c.execute("""UPDATE direktori_ids
+            SET lease_expires_at = NOW() + make_interval(secs => $2)
+            WHERE id = ANY($1::int[]) AND automation_status='in_progress'
+              AND (assigned_to = $3 OR left(assigned_to, length($3) + 1) = $3 || ':')""",
+            list(ids), seconds, who)
+
+# Lease habis -> worker pemegangnya dianggap mati. Baris lama tanpa lease
+# (sebelum kolom lease_expires_at ada) dianggap habis berdasarkan last_updated.
+REAP_SQL = """
+UPDATE direktori_ids
+SET automation_status = 'new',
+    assigned_to = NULL,
+    lease_expires_at = NULL,
+    error = left('lease_expired:' || COALESCE(assigned_to, '-'), 1000),
+    attempt_count = COALESCE(attempt_count, 0) + 1,
+    last_updated = NOW()
+WHERE automation_status = 'in_progress'
+  AND (lease_expires_at < NOW()
+       OR (lease_expires_at IS NULL AND last_updated < NOW() - make_interval(secs => $1)))
+RETURNING id, idsbr;
+"""
+
+async def reap_expired_leases(pool, grace_seconds=LEASE_SECONDS):
+    async with pool.acquire() as c:
+        rows = await c.fetch(REAP_SQL, grace_seconds)
+        await notify_new_rows(c, len(rows))
+    if rows:
+        logger.warning(f"🧹 {len(rows)} lease kedaluwarsa dikembalikan ke 'new': "
+                       f"{', '.join(r['idsbr'] for r in rows[:20])}{' …' if len(rows) > 20 else ''}")
+    return len(rows)
+
+async def reaper_loop(pool, interval_s=REAP_INTERVAL_S):
+    while True:
+        try: await reap_expired_leases(pool)
+        except Exception as e: logger.warning(f"Reaper gagal: {e}")
+        await asyncio.sleep(interval_s)
+
+class ClaimBuffer:
+    """
+    Antrian prefetch per proses: klaim CLAIM_BATCH_SIZE baris sekaligus,
+    lalu dibagikan ke semua coroutine run_worker.
+    Sisa antrian dikembalikan ke 'new' lewat release() saat proses berhenti.
+
+    `held` berisi semua id yang masih 'in_progress' atas nama proses ini
+    (di antrian, sedang diproses, atau menunggu flush StatusWriter);
+    heartbeat_loop() memperpanjang lease-nya secara batch.
+
+    Baris yang dibagikan dicatat dengan tag coroutine penerimanya (_WORKER_TAG,
+    WORKER_NAME:idx); flush() menuliskannya ke assigned_to bersama flush StatusWriter.
+    """
+    def __init__(self, pool, who, batch_size=CLAIM_BATCH_SIZE):
+        self.pool = pool
+        self.who = who
+        self.batch_size = batch_size
+        self.held = set()
+        self._tags = {}             # id -> WORKER_NAME:idx yang belum ditulis ke assigned_to
+        self._rows = deque()
+        self._lock = asyncio.Lock()
+        self._new_rows = asyncio.Event()
+        self._listen_conn = None
+
+    async def get(self):
+        async with self._lock:
+            if not self._rows:
+                t0 = time.perf_counter()
+                rows = await claim_batch(self.pool, self.who, self.batch_size)
+                METRICS.observe("matchapro_claim_seconds", time.perf_counter() - t0)
+                METRICS.inc("matchapro_claimed_rows_total", len(rows))
+                self.held.update(r["id"] for r in rows)
+                self._rows.extend(rows)
+            row = self._rows.popleft() if self._rows else None
+        if row:
+            self._tags[row["id"]] = _WORKER_TAG.get()
+        return row
+
+    @property
+    def pending(self) -> int:
+        return len(self._tags)
+
+    async def flush(self, conn):
+        """assigned_to = WORKER_NAME:idx untuk baris yang sudah dibagikan (1 UPDATE)."""
+        if not self._tags:
+            return
+        items, self._tags = self._tags, {}
+        try:
+            await conn.execute(ASSIGN_BATCH_SQL, list(items), list(items.values()), self.who)
+        except BaseException:
+            for id_, tag in items.items():
+                self._tags.setdefault(id_, tag)
+            raise
+
+    async def listen(self):
+        """Mode daemon: koneksi khusus LISTEN (bukan dari pool, karena harus tetap terbuka)."""
+        self._listen_conn = await asyncpg.connect(
+            host=PGHOST, database=PGDATABASE, user=PGUSER, password=PGPASSWORD,
+            port=PGPORT, ssl=True
+        )
+        await self._listen_conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+        logger.info(f"[{self.who}] 👂 LISTEN {NOTIFY_CHANNEL}")
+
+    def _on_notify(self, conn, pid, channel, payload):
+        logger.info(f"[{self.who}] 🔔 NOTIFY {channel}: {payload} baris baru")
+        # bangunkan semua yang sedang menunggu; penunggu berikutnya dapat Event baru
+        ev, self._new_rows = self._new_rows, asyncio.Event()
+        ev.set()
+
+    def new_rows_event(self):
+        """Ambil SEBELUM get(): NOTIFY yang datang di antara get() dan menunggu tidak terlewat."""
+        return self._new_rows
+
+    async def wait_new_rows(self, ev, timeout=DAEMON_POLL_S):
+        try: await asyncio.wait_for(ev.wait(), timeout=timeout)
+        except asyncio.TimeoutError: pass
+
+    def settled(self, ids):
+        """Dipanggil setelah status akhir baris tertulis ke DB."""
+        self.held.difference_update(ids)
+
+    async def heartbeat_loop(self, interval_s=LEASE_SECONDS / 3):
+        while True:
+            await asyncio.sleep(interval_s)
+            try: await extend_leases(self.pool, list(self.held), self.who)
+            except Exception as e: logger.warning(f"Heartbeat lease gagal ({len(self.held)} baris): {e}")
+
+    async def release(self):
+        ids = [r["id"] for r in self._rows]
+        self._rows.clear()
+        self.settled(ids)
+        if self._listen_conn:
+            try: await self._listen_conn.close()
+            except Exception: pass
+            self._listen_conn = None
+        n = await release_unclaimed(self.pool, ids, self.who)
+        if n:
+            logger.info(f"[{self.who}] ↩️  {n} baris prefetch dikembalikan ke 'new'")
 
 async def mark_done(pool, id_, note: str | None = None):
     async with pool.acquire() as c:
@@ -196,6 +499,523 @@ async def release_to_new(pool, id_, note):
                 attempt_count=attempt_count+1, last_updated=NOW()
             WHERE id=$1""", id_, note)
 
+# Tulis banyak hasil (done/failed/locked/new) dalam 1 UPDATE.
+# note NULL -> kolom error tidak diubah (sama seperti mark_done tanpa note).
+# Hanya baris yang lease-nya masih dipegang coroutine penulisnya: flush yang terlambat
+# setelah reaper mengembalikan baris (dan worker lain mengklaimnya) tidak menimpa hasil orang lain.
+STATUS_BATCH_SQL = """
+UPDATE direktori_ids d
+SET automation_status = v.status,
+    error = CASE WHEN v.note IS NULL THEN d.error ELSE left(v.note, 1000) END,
+    attempt_count = COALESCE(d.attempt_count, 0) + v.inc,
+    lease_expires_at = NULL,
+    last_updated = NOW()
+FROM unnest($1::int[], $2::text[], $3::text[], $4::int[], $5::text[]) AS v(id, status, note, inc, who)
+WHERE d.id = v.id
+  AND d.automation_status = 'in_progress'
+  AND d.assigned_to = v.who
+RETURNING d.id, v.status;
+"""
+
+class EditUrlStore:
+    """
+    Cache idsbr -> URL form edit (tabel direktori_edit_urls). URL baru/invalid
+    ditampung lalu ditulis bersama flush StatusWriter (tidak menambah round trip per row).
+    """
+    def __init__(self):
+        self._pending = {}          # idsbr -> url (None = kosongkan)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def remember(self, idsbr, url):
+        if url and url.startswith("http"):
+            self._pending[str(idsbr)] = url
+
+    def forget(self, idsbr):
+        self._pending[str(idsbr)] = None
+
+    async def flush(self, conn):
+        if not self._pending:
+            return
+        items, self._pending = self._pending, {}
+        try:
+            upsert = [(k, v) for k, v in items.items() if v]
+            drop = [k for k, v in items.items() if not v]
+            if upsert:
+                await conn.execute("""
+                    INSERT INTO direktori_edit_urls (idsbr, edit_url, resolved_at)
+                    SELECT * , NOW() FROM unnest($1::text[], $2::text[])
+                    ON CONFLICT (idsbr) DO UPDATE SET edit_url = EXCLUDED.edit_url, resolved_at = NOW()
+                """, [k for k, _ in upsert], [v for _, v in upsert])
+            if drop:
+                await conn.execute("UPDATE direktori_edit_urls SET edit_url = NULL, resolved_at = NOW() "
+                                   "WHERE idsbr = ANY($1::text[])", drop)
+        except BaseException:
+            for k, v in items.items():
+                self._pending.setdefault(k, v)
+            raise
+
+# Value option yang sudah diketahui (lihat komentar SEL): [31] DKI JAKARTA, [73] JAKARTA PUSAT
+WILAYAH_SEED = {"31": "116", "31.73": "2319"}
+
+class WilayahCache:
+    """
+    Cache kode wilayah -> value option select wilayah (tabel direktori_wilayah_options).
+    Kunci = kode ternormalisasi dipisah titik: '31' (prov), '31.73' (kab),
+    '31.73.10' (kec), '31.73.10.1' (desa). Dipelajari saat label cocok pertama kali,
+    atau diisi sekaligus lewat `worker.py --crawl-wilayah`.
+    """
+    def __init__(self):
+        self._values = dict(WILAYAH_SEED)
+        self._pending = {}          # kunci -> (value, label) (value None = hapus)
+
+    @staticmethod
+    def key(*codes) -> str | None:
+        parts = [_norm_code(c) for c in codes]
+        return ".".join(parts) if all(parts) else None
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def get(self, key):
+        return self._values.get(key) if key else None
+
+    def learn(self, key, value, label=""):
+        if key and value and self._values.get(key) != value:
+            self._values[key] = value
+            self._pending[key] = (value, label)
+
+    def forget(self, key):
+        if key and self._values.pop(key, None) is not None:
+            self._pending[key] = (None, "")
+
+    async def load(self, conn):
+        try:
+            rows = await conn.fetch("SELECT kode, option_value FROM direktori_wilayah_options")
+        except asyncpg.UndefinedTableError:
+            logger.warning("Tabel direktori_wilayah_options belum ada (jalankan migrate.py), cache hanya di memori.")
+            return
+        self._values.update({r["kode"]: r["option_value"] for r in rows})
+        logger.info(f"🗺️  cache wilayah: {len(self._values)} kode")
+
+    async def flush(self, conn):
+        if not self._pending:
+            return
+        items, self._pending = self._pending, {}
+        try:
+            upsert = [(k, v, lbl) for k, (v, lbl) in items.items() if v]
+            drop = [k for k, (v, _) in items.items() if not v]
+            if upsert:
+                await conn.execute("""
+                    INSERT INTO direktori_wilayah_options (kode, option_value, label, learned_at)
+                    SELECT *, NOW() FROM unnest($1::text[], $2::text[], $3::text[])
+                    ON CONFLICT (kode) DO UPDATE SET option_value = EXCLUDED.option_value,
+                                                     label = EXCLUDED.label, learned_at = NOW()
+                """, [u[0] for u in upsert], [u[1] for u in upsert], [u[2] for u in upsert])
+            if drop:
+                await conn.execute("DELETE FROM direktori_wilayah_options WHERE kode = ANY($1::text[])", drop)
+        except BaseException:
+            for k, v in items.items():
+                self._pending.setdefault(k, v)
+            raise
+
+WILAYAH_CACHE = WilayahCache()
+
+# ---------- Metrics ----------
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+QUEUE_DEPTH_SQL = """
+SELECT COUNT(*) FROM direktori_ids
+WHERE automation_status = 'new' AND validation_status IN ('ok', 'fixed')
+"""
+
+class Metrics:
+    """
+    Counter & histogram di memori, disajikan dalam format teks Prometheus di
+    http://METRICS_HOST:METRICS_PORT/metrics (METRICS_PORT=0 = endpoint mati).
+    Gauge (antrian, RSS browser, pool DB) dihitung saat di-scrape lewat collector.
+    """
+    HELP = {
+        "matchapro_rows_total": ("counter", "Baris selesai diproses per outcome"),
+        "matchapro_claimed_rows_total": ("counter", "Baris yang diklaim dari DB"),
+        "matchapro_lost_leases_total": ("counter", "Hasil yang dibuang karena lease baris sudah lepas"),
+        "matchapro_step_seconds": ("histogram", "Durasi step process_row"),
+        "matchapro_claim_seconds": ("histogram", "Durasi claim batch ke DB"),
+        "matchapro_pool_wait_seconds": ("histogram", "Waktu tunggu acquire koneksi pool asyncpg"),
+        "matchapro_queue_new": ("gauge", "Baris 'new' lolos validasi di DB (semua PC)"),
+        "matchapro_prefetch_rows": ("gauge", "Baris di antrian prefetch proses ini"),
+        "matchapro_held_rows": ("gauge", "Baris 'in_progress' yang dipegang proses ini"),
+        "matchapro_status_pending": ("gauge", "Update status yang belum di-flush"),
+        "matchapro_db_pool_connections": ("gauge", "Koneksi pool asyncpg per state"),
+        "matchapro_browser_rss_bytes": ("gauge", "RSS driver Playwright + Chromium"),
+        "matchapro_browser_processes": ("gauge", "Jumlah proses driver Playwright + Chromium"),
+        "matchapro_info": ("gauge", "Identitas proses worker"),
+    }
+
+    def __init__(self, port=METRICS_PORT, host=METRICS_HOST):
+        self.port = port
+        self.host = host
+        self._counters = {}     # (nama, labels) -> nilai
+        self._hists = {}        # (nama, labels) -> [buckets, hitungan kumulatif, sum, count]
+        self._collectors = []   # async () -> [(nama, labels dict, nilai)]
+        self._server = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.port > 0
+
+    def inc(self, name: str, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        h = self._hists.get(key)
+        if h is None:
+            h = self._hists[key] = [buckets, [0] * len(buckets), 0.0, 0]
+        for i, le in enumerate(h[0]):
+            if value <= le:
+                h[1][i] += 1
+        h[2] += value
+        h[3] += 1
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+
+    @staticmethod
+    def _fmt(labels) -> str:
+        if not labels:
+            return ""
+        esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels) + "}"
+
+    async def render(self) -> str:
+        series = {}   # nama -> baris sampel
+        for (name, labels), v in sorted(self._counters.items()):
+            series.setdefault(name, []).append(f"{name}{self._fmt(labels)} {v}")
+        for (name, labels), (buckets, counts, total, n) in sorted(self._hists.items()):
+            out = series.setdefault(name, [])
+            for le, c in zip(buckets, counts):
+                out.append(f"{name}_bucket{self._fmt(labels + (('le', le),))} {c}")
+            out.append(f"{name}_bucket{self._fmt(labels + (('le', '+Inf'),))} {n}")
+            out.append(f"{name}_sum{self._fmt(labels)} {total:.6f}")
+            out.append(f"{name}_count{self._fmt(labels)} {n}")
+        for fn in self._collectors:
+            try:
+                for name, labels, v in await fn():
+                    series.setdefault(name, []).append(f"{name}{self._fmt(tuple(labels.items()))} {v}")
+            except Exception as e:
+                logger.debug(f"collector metrics gagal: {e}")
+        lines = []
+        for name, samples in series.items():
+            kind, text = self.HELP.get(name, ("untyped", name))
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} {kind}", *samples]
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)).strip():
+                pass   # header tidak dipakai
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in ("/", "/metrics"):
+                status, body = "200 OK", (await self.render()).encode()
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        if not self.enabled:
+            return
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"📈 metrics di http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+METRICS = Metrics()
+
+class _TimedAcquire:
+    __slots__ = ("_ctx",)
+
+    def __init__(self, ctx):
+        self._ctx = ctx
+
+    async def __aenter__(self):
+        t0 = time.perf_counter()
+        conn = await self._ctx.__aenter__()
+        METRICS.observe("matchapro_pool_wait_seconds", time.perf_counter() - t0, WAIT_BUCKETS)
+        return conn
+
+    async def __aexit__(self, *exc):
+        return await self._ctx.__aexit__(*exc)
+
+class TimedPool:
+    """Proxy asyncpg.Pool: waktu tunggu acquire() dicatat, selebihnya diteruskan ke pool asli."""
+    def __init__(self, pool):
+        self._pool = pool
+
+    def acquire(self, *a, **kw):
+        return _TimedAcquire(self._pool.acquire(*a, **kw))
+
+    def __getattr__(self, name):
+        return getattr(self._pool, name)
+
+def worker_collector(pool, claims, status, browsers):
+    """Gauge saat scrape: antrian DB, prefetch, buffer status, pool DB, RSS browser."""
+    async def collect():
+        out = [("matchapro_info", {"worker": WORKER_NAME, "workers": NUM_WORKERS}, 1),
+               ("matchapro_prefetch_rows", {}, len(claims._rows)),
+               ("matchapro_held_rows", {}, len(claims.held)),
+               ("matchapro_status_pending", {}, len(status._buf))]
+        out += [("matchapro_db_pool_connections", {"state": "total"}, pool.get_size()),
+                ("matchapro_db_pool_connections", {"state": "idle"}, pool.get_idle_size())]
+        try:
+            async with pool.acquire() as c:
+                out.append(("matchapro_queue_new", {}, await c.fetchval(QUEUE_DEPTH_SQL, timeout=5)))
+        except Exception as e:
+            logger.debug(f"queue depth gagal: {e}")
+        usage = await asyncio.to_thread(browsers.usage)
+        if usage:
+            rss_mb, _, n = usage
+            out += [("matchapro_browser_rss_bytes", {}, int(rss_mb * 1024 * 1024)),
+                    ("matchapro_browser_processes", {}, n)]
+        return out
+    return collect
+
+# ---------- Timing per step ----------
+_SPAN = contextvars.ContextVar("step_span", default=None)
+_WORKER_TAG = contextvars.ContextVar("worker_tag", default=WORKER_NAME)
+
+class Span:
+    __slots__ = ("step", "calls", "parent")
+
+    def __init__(self, step, parent):
+        self.step, self.calls, self.parent = step, 0, parent
+
+def _count_call():
+    sp = _SPAN.get()
+    while sp is not None:
+        sp.calls += 1
+        sp = sp.parent
+
+def _install_call_counter():
+    """
+    STEP_CDP_CALLS=true: hitung round trip ke driver Playwright (-> CDP) per span dengan
+    membungkus Channel.inner_send (internal Playwright; versi baru: _inner_send).
+    Contextvar ikut task worker, jadi call dari route handler tidak ikut terhitung.
+    Return nama method yang dibungkus, None bila versi Playwright tidak didukung.
+    """
+    try:
+        from playwright._impl._connection import Channel
+    except ImportError:
+        Channel = None
+    name = next((n for n in ("inner_send", "_inner_send") if hasattr(Channel, n)), None)
+    if name is None:
+        logger.warning("STEP_CDP_CALLS: versi Playwright tidak didukung, cdp_calls tidak dicatat")
+        return None
+    if not getattr(Channel, "_step_counted", False):
+        orig = getattr(Channel, name)
+
+        async def counted_inner_send(self, *a, **kw):
+            _count_call()
+            return await orig(self, *a, **kw)
+
+        setattr(Channel, name, counted_inner_send)
+        Channel._step_counted = True
+    return name
+
+_PW_SEND = _install_call_counter() if STEP_CDP_CALLS else None
+
+class StepTimings:
+    """
+    Span per step process_row: wall time, jumlah call Playwright (STEP_CDP_CALLS), outcome.
+    Ditampung di memori lalu ditulis batch lewat flush StatusWriter (STEP_TIMINGS=db)
+    atau di-append ke CSV (STEP_TIMINGS=csv). Laporan: python timings.py
+    """
+    COLUMNS = ("worker", "idsbr", "step", "started_at", "ms", "cdp_calls", "outcome")
+    MAX_PENDING = 20000     # flush terus gagal: span tertua dibuang di atas batas ini
+
+    def __init__(self, backend=STEP_TIMINGS, csv_path=STEP_TIMINGS_CSV):
+        self.backend = backend
+        self.csv_path = csv_path
+        self._buf = []
+
+    @property
+    def pending(self) -> int:
+        return len(self._buf)
+
+    @contextlib.contextmanager
+    def span(self, step: str, idsbr=None):
+        logger.info(f"[{idsbr}] step: {step}")
+        sp = Span(step, _SPAN.get())
+        token = _SPAN.set(sp)
+        started = datetime.datetime.now()
+        t0 = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield sp
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            _SPAN.reset(token)
+            elapsed = time.perf_counter() - t0
+            METRICS.observe("matchapro_step_seconds", elapsed, step=step)
+            if self.backend != "off":
+                self._buf.append((_WORKER_TAG.get(), to_str(idsbr), step, started, elapsed * 1000,
+                                  sp.calls if _PW_SEND else None, outcome))
+
+    async def flush(self, conn=None):
+        if not self._buf:
+            return
+        items, self._buf = self._buf, []
+        try:
+            if self.backend == "csv":
+                await asyncio.to_thread(self._append_csv, items)
+            elif conn is not None:
+                await conn.copy_records_to_table("direktori_step_timings", records=items,
+                                                 columns=list(self.COLUMNS))
+        except asyncpg.UndefinedTableError:
+            # migrasi 0011 belum dijalankan: jangan tampung span selamanya
+            logger.error("Tabel direktori_step_timings belum ada (jalankan migrate.py); STEP_TIMINGS dimatikan")
+            self.backend = "off"
+        except BaseException:
+            self._buf[:0] = items
+            dropped = len(self._buf) - self.MAX_PENDING
+            if dropped > 0:
+                del self._buf[:dropped]
+                logger.warning(f"Timing step: {dropped} span tertua dibuang (flush gagal terus)")
+            raise
+
+    def _append_csv(self, items):
+        import csv
+        new = not os.path.exists(self.csv_path)
+        with open(self.csv_path, "a", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            if new:
+                w.writerow(self.COLUMNS)
+            w.writerows(items)
+
+TIMINGS = StepTimings()
+step = TIMINGS.span
+
+class StatusWriter:
+    """
+    Write-behind untuk update status: hasil tiap row ditampung di memori lalu
+    di-flush tiap STATUS_FLUSH_ROWS hasil atau STATUS_FLUSH_MS milidetik.
+    close() wajib dipanggil saat shutdown agar sisa buffer tetap tertulis.
+    """
+    def __init__(self, pool, flush_rows=STATUS_FLUSH_ROWS, flush_ms=STATUS_FLUSH_MS, claims=None,
+                 edit_urls: EditUrlStore | None = None, wilayah: "WilayahCache | None" = None,
+                 timings: StepTimings | None = None):
+        self.pool = pool
+        self.claims = claims
+        self.edit_urls = edit_urls
+        self.wilayah = wilayah
+        self.timings = timings
+        self.flush_rows = flush_rows
+        self.flush_ms = flush_ms
+        self._buf = {}              # id -> (status, note, inc, tag worker); hasil terakhir per id menang
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    def _put(self, id_, status, note, inc):
+        self._buf[id_] = (status, note, inc, _WORKER_TAG.get())
+        if len(self._buf) >= self.flush_rows:
+            self._wakeup.set()
+
+    def done(self, id_, note: str | None = None): self._put(id_, "done", note, 0)
+    def failed(self, id_, err): self._put(id_, "failed", err, 1)
+    def locked(self, id_, note="locked_by_other"): self._put(id_, "locked", note, 0)
+    def release(self, id_, note): self._put(id_, "new", note, 1)
+
+    async def flush(self):
+        async with self._lock:
+            await self._flush_status()
+            for label, store in (("URL edit", self.edit_urls), ("cache wilayah", self.wilayah),
+                                 ("timing step", self.timings)):
+                if store and store.pending:
+                    try:
+                        async with self.pool.acquire() as c:
+                            await store.flush(c)
+                    except Exception as e:
+                        logger.warning(f"Gagal simpan {label}, dicoba lagi: {e}")
+
+    async def _flush_status(self):
+        if not self._buf and not (self.claims and self.claims.pending):
+            return
+        items, self._buf = self._buf, {}
+        ids = list(items)
+        try:
+            async with self.pool.acquire() as c:
+                if self.claims:
+                    await self.claims.flush(c)      # atribusi WORKER_NAME:idx sebelum status akhir
+                if not ids:
+                    return
+                written = await c.fetch(
+                    STATUS_BATCH_SQL, ids,
+                    [items[i][0] for i in ids],
+                    [items[i][1] for i in ids],
+                    [items[i][2] for i in ids],
+                    [items[i][3] for i in ids],
+                )
+                await notify_new_rows(c, sum(1 for r in written if r["status"] == "new"))
+            if self.claims:
+                self.claims.settled(ids)
+            lost = sorted(set(ids) - {r["id"] for r in written})
+            if lost:
+                METRICS.inc("matchapro_lost_leases_total", len(lost))
+                logger.warning(f"⚠️ {len(lost)} hasil tidak ditulis: lease sudah lepas (reaper/worker lain) "
+                               f"id {', '.join(map(str, lost[:20]))}{' …' if len(lost) > 20 else ''}")
+            logger.debug(f"status flush: {len(ids)} baris")
+        except BaseException as e:
+            # kembalikan ke buffer (hasil yang lebih baru tetap menang), coba lagi di flush berikutnya
+            for i in ids:
+                self._buf.setdefault(i, items[i])
+            if not isinstance(e, Exception):
+                raise
+            logger.warning(f"Gagal flush status ({len(ids)} baris), dicoba lagi: {e}")
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_ms / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try: await self._task
+            except asyncio.CancelledError: pass
+            self._task = None
+        await self.flush()
+        if self._buf:
+            logger.error(f"{len(self._buf)} update status tidak tertulis: {sorted(self._buf)}")
+
 # ---------- Helpers ----------
 async def wait_blockui_gone(page, timeout=15000):
     try:
@@ -204,6 +1024,52 @@ async def wait_blockui_gone(page, timeout=15000):
     except PWTimeout:
         logger.warning("blockUI mungkin masih ada.")
 
+async def timed_wait(label: str, awaitable, timeout_ms: int | None = None) -> bool:
+    """
+    Tunggu sinyal (XHR, perubahan option, blockUI hilang) dan log berapa lama
+    sinyal itu sebenarnya datang — pengganti wait_for_timeout tetap.
+    """
+    t0 = time.perf_counter()
+    ok = True
+    try:
+        if timeout_ms:
+            await asyncio.wait_for(awaitable, timeout_ms / 1000)
+        else:
+            await awaitable
+    except (PWTimeout, asyncio.TimeoutError):
+        ok = False
+    logger.info(f"⏱️  wait {label}: {(time.perf_counter() - t0) * 1000:.0f} ms{'' if ok else ' (timeout)'}")
+    return ok
+
+def _is_datatable_xhr(resp) -> bool:
+    """Request server-side DataTables selalu membawa parameter draw (query string atau body POST)."""
+    req = resp.request
+    if req.resource_type not in ("xhr", "fetch"):
+        return False
+    if "draw=" in resp.url:
+        return True
+    try: return "draw=" in (req.post_data or "")
+    except: return False
+
+async def click_filter_and_wait(page, label="datatable", timeout=15000) -> bool:
+    """Klik #filter-data lalu tunggu respons XHR DataTables + render selesai."""
+    async def _signal():
+        async with page.expect_response(_is_datatable_xhr, timeout=timeout) as resp_info:
+            await page.click(SEL["btn_filter"])
+        await resp_info.value
+        await page.wait_for_function(
+            """(sel)=>{ const el=document.querySelector(sel);
+                        return !el || getComputedStyle(el).display==='none' }""",
+            arg=SEL["dt_processing"], timeout=timeout
+        )
+    ok = await timed_wait(label, _signal())
+    if not ok:
+        # endpoint tidak dikenali: fallback ke network idle
+        try: await page.wait_for_load_state("networkidle", timeout=5000)
+        except PWTimeout: pass
+    await wait_blockui_gone(page)
+    return ok
+
 async def click_if_visible(page, sel, timeout=1500):
     try:
         await page.locator(sel).click(timeout=timeout); return True
@@ -228,12 +1094,15 @@ async def dismiss_intro_popup(page):
             if await page.locator(".shepherd-content").count() == 0: break
             skip_btn = page.locator(".shepherd-content footer .shepherd-button",
                                     has_text=re.compile(r"^\s*skip\s*$", re.I))
-            if await skip_btn.count() > 0:
-                await skip_btn.first.click(); await page.wait_for_timeout(250); continue
             close_btn = page.locator(".shepherd-cancel-icon")
-            if await close_btn.count() > 0:
-                await close_btn.first.click(); await page.wait_for_timeout(250); continue
-            await page.keyboard.press("Escape"); await page.wait_for_timeout(200)
+            if await skip_btn.count() > 0:
+                await skip_btn.first.click()
+            elif await close_btn.count() > 0:
+                await close_btn.first.click()
+            else:
+                await page.keyboard.press("Escape")
+            await timed_wait("intro popup tertutup", page.locator(".shepherd-content").first.wait_for(
+                state="detached", timeout=1000))
     except: pass
 
 async def ensure_logged_in(page):
@@ -245,6 +1114,30 @@ async def ensure_logged_in(page):
     await page.wait_for_selector(SEL["btn_filter"], timeout=TIMEOUT_MS)
     logger.info("✅ landing siap")
 
+async def on_landing(page) -> bool:
+    """Tab sudah di landing (BASE_URL) dengan tombol filter siap → tidak perlu goto ulang."""
+    try:
+        if page.is_closed() or not page.url.startswith(BASE_URL):
+            return False
+        return await page.locator(SEL["btn_filter"]).count() > 0
+    except:
+        return False
+
+async def return_to_landing(page) -> bool:
+    """
+    Setelah row selesai, kembali ke landing tanpa load penuh bila bisa
+    (history back, sering dilayani bfcache). False -> tab sebaiknya diganti baru.
+    """
+    if await on_landing(page):
+        return True
+    try:
+        await page.go_back(wait_until="domcontentloaded", timeout=10000)
+        if await on_landing(page):
+            await dismiss_intro_popup(page)
+            return True
+    except: pass
+    return False
+
 # ---------- Deteksi ----------
 async def is_locked_by_other(page) -> bool:
     try:
@@ -267,6 +1160,23 @@ async def is_form_page(page) -> bool:
         return await h.is_visible()
     except: return False
 
+# Sinyal yang sama dengan is_form_page / is_locked_by_other, dicek di browser sekaligus
+FORM_OR_LOCK_JS = """() => {
+  if (/^\\s*not authorized - matchapro\\s*$/i.test(document.title || '')) return true;
+  const has = (sel, re) => Array.from(document.querySelectorAll(sel)).some(el => re.test(el.textContent || ''));
+  return has('h1,h2,h3,h4,h5,h6', /profiling\\s*info|form\\s+update\\s+usaha\\/perusahaan/i)
+      || has('p', /tidak bisa melakukan edit.*sedang diedit oleh user lain/i);
+}"""
+
+async def wait_form_or_lock(page, timeout: int = 5000) -> bool:
+    """Tunggu form edit atau halaman lock muncul (pengganti jeda tetap di loop detect)."""
+    try:
+        return await timed_wait("form/lock", page.wait_for_function(
+            FORM_OR_LOCK_JS, timeout=timeout))
+    except Exception:
+        # navigasi di tengah evaluate (context hancur): cek ulang di iterasi berikutnya
+        return False
+
 async def is_approval_in_progress(page) -> bool:
     try:
         await page.wait_for_load_state("domcontentloaded")
@@ -288,7 +1198,6 @@ async def is_approval_in_progress(page) -> bool:
         return False
 
 # ---------- Email/Phone helpers ----------
-EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
 def _is_valid_email(s: str | None) -> bool:
     return bool(s and EMAIL_RE.match(s.strip()))
 
@@ -296,20 +1205,6 @@ def _only_digits(s: str | None) -> str:
     if not s: return ""
     return re.sub(r"\D", "", str(s))
 
-STATUS_MAP = {
-    "aktif": "kondisi_aktif",
-    "tutup sementara": "kondisi_tutup_sementara",
-    "belum beroperasi": "kondisi_belum_operasi",
-    "belum beroperasi/berproduksi": "kondisi_belum_operasi",
-    "tutup": "kondisi_tutup",
-    "alih usaha": "kondisi_alih_usaha",
-    "tidak ditemukan": "kondisi_tidak_ditemukan",
-    "aktif pindah": "kondisi_aktif_pindah",
-    "aktif nonrespon": "kondisi_aktif_nonrespon",
-    "duplikat": "kondisi_duplikat",
-    "salah kode wilayah": "kondisi_salah_kode_wilayah",
-}
-
 async def set_keberadaan_usaha(page, keberadaan: str | None):
     """
     Pilih radio kondisi usaha sesuai data DB.
@@ -444,6 +1339,110 @@ async def set_website(page, website_value: str | None):
     if await page.locator(SEL["website"]).count() > 0 and website_value and website_value.strip():
         await page.fill(SEL["website"], website_value.strip())
 
+# ---- Fuzzy match badan usaha / jaringan usaha ----
+# kolom DB -> field form yang pilihannya dicocokkan
+FUZZY_FIELDS = {"bentuk_badan_usaha": "bentuk_badan_usaha", "jaringan_usaha": "jaringan"}
+
+class FuzzyIndex:
+    """
+    Nilai DB -> pilihan form untuk bentuk_badan_usaha & jaringan_usaha.
+    Daftar pilihan (vocab) diambil dari form sekali per sesi (lagi hanya bila jumlah
+    pilihan di form berubah, lihat needs_vocab) dan disimpan di FUZZY_VOCAB_FILE;
+    hasil process.extractOne dimemo per nilai DB, jadi tiap nilai unik hanya di-score
+    sekali. Skor < FUZZY_MIN_SCORE dianggap tidak terpetakan.
+    """
+    def __init__(self, path=FUZZY_VOCAB_FILE, min_score=FUZZY_MIN_SCORE):
+        self.path = path
+        self.min_score = min_score
+        self.vocab = {}             # field -> [teks pilihan]
+        self._memo = {}             # (field, nilai_norm) -> (index|None, teks, skor)
+        self._warned = set()
+        self._learned = set()       # field yang vocab-nya sudah dibaca dari form di proses ini
+        try:
+            with open(path, encoding="utf-8") as f: self.vocab = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def norm_choice(text) -> str:
+        """Teks pilihan dibandingkan tanpa beda spasi (engine batch & legacy membaca DOM berbeda)."""
+        return " ".join((text or "").split())
+
+    def needs_vocab(self, field: str, n_choices: int) -> bool:
+        """True bila pilihan form perlu dibaca: belum di proses ini atau jumlahnya berubah."""
+        return field not in self._learned or len(self.vocab.get(field) or ()) != n_choices
+
+    def set_vocab(self, field: str, choices: list[str]):
+        choices = [self.norm_choice(c) for c in choices]
+        self._learned.add(field)
+        if choices == self.vocab.get(field):
+            return
+        self.vocab[field] = choices
+        self._memo = {k: v for k, v in self._memo.items() if k[0] != field}
+        try:
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f: json.dump(self.vocab, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.warning(f"Gagal simpan vocab fuzzy: {e}")
+
+    def match(self, field: str, value) -> tuple[int | None, str, float]:
+        """(index pilihan | None, teks pilihan, skor). None = vocab belum ada / skor terlalu rendah."""
+        norm = to_str(value).strip().lower()
+        key = (field, norm)
+        if key in self._memo:
+            return self._memo[key]
+        choices = self.vocab.get(field)
+        if not norm or not choices:
+            return None, "", 0.0
+        text, score, idx = process.extractOne(norm, choices, scorer=fuzz.token_set_ratio,
+                                              processor=lambda c: c.lower())
+        res = (idx if score >= self.min_score else None, text, score)
+        self._memo[key] = res
+        if res[0] is None and key not in self._warned:
+            self._warned.add(key)
+            logger.warning(f"{field}: '{value}' tidak terpetakan (terdekat '{text}', skor {score:.0f})")
+        return res
+
+    def report(self, values: dict[str, list[tuple[str, int]]]) -> list[tuple]:
+        """values: field -> [(nilai DB, jumlah baris)]. Return baris (field, nilai, n, pilihan, skor) yang < min_score."""
+        low = []
+        for field, items in values.items():
+            for value, n in items:
+                idx, text, score = self.match(field, value)
+                if idx is None:
+                    low.append((field, value, n, text, score))
+        return low
+
+FUZZY = FuzzyIndex()
+
+async def fuzzy_precheck(pool, verbose=False):
+    """
+    Sebelum run: cocokkan semua nilai unik bentuk_badan_usaha/jaringan_usaha di baris
+    yang belum done, laporkan yang tidak terpetakan (bukan ditebak satu per satu di browser).
+    """
+    values = {}
+    async with pool.acquire() as c:
+        for col, field in FUZZY_FIELDS.items():
+            rows = await c.fetch(f"""
+                SELECT {col} AS v, COUNT(*) AS n FROM direktori_ids
+                WHERE automation_status <> 'done' AND NULLIF(TRIM({col}), '') IS NOT NULL
+                GROUP BY {col} ORDER BY n DESC""")
+            values[field] = [(r["v"], r["n"]) for r in rows]
+    missing = [f for f in values if not FUZZY.vocab.get(f)]
+    if missing:
+        logger.info(f"🔤 vocab {', '.join(missing)} belum ada di {FUZZY.path}; dipelajari dari form pertama")
+    if verbose:
+        for field, items in values.items():
+            for value, n in items:
+                idx, text, score = FUZZY.match(field, value)
+                print(f"{'✅' if idx is not None else '❌'} {field:<18} {n:>6}x  {value!r} -> {text!r} ({score:.0f})")
+    low = FUZZY.report({f: v for f, v in values.items() if f not in missing})
+    if low:
+        logger.warning(f"🔤 {len(low)} nilai tidak terpetakan (skor < {FUZZY.min_score}), "
+                       f"{sum(r[2] for r in low)} baris: field dibiarkan apa adanya di form")
+    return low
+
 # ---- Wilayah helpers (KD-based) ----
 def _norm_code(v) -> str | None:
     """Ambil digit saja + buang leading zero. '073' -> '73'; '010' -> '10'."""
@@ -453,18 +1452,6 @@ def _norm_code(v) -> str | None:
     s = s.lstrip("0")
     return s or None
 
-async def _wait_options_loaded(page, sel_css: str, min_count: int = 2, timeout: int = 6000):
-    """Tunggu select punya >= min_count option (umumnya setelah cascade)."""
-    try:
-        await page.wait_for_function(
-            """(sel,minCount)=>{ const el=document.querySelector(sel);
-                                  return !!el && el.querySelectorAll('option').length>=minCount }""",
-            arg=(sel_css, min_count),
-            timeout=timeout
-        )
-    except:
-        pass
-
 async def _select_by_label_code(page, sel_css: str, code_norm: str) -> bool:
     """
     Pilih option berdasar label yang mengandung [code_norm] (toleran leading zero).
@@ -477,15 +1464,16 @@ async def _select_by_label_code(page, sel_css: str, code_norm: str) -> bool:
     except:
         pass
     try:
-        opts = page.locator(f"{sel_css} option")
-        n = await opts.count()
-        for i in range(n):
-            txt = (await opts.nth(i).inner_text() or "").strip()
-            if label_re.search(txt):
-                val = await opts.nth(i).get_attribute("value")
-                if val:
-                    await page.select_option(sel_css, value=val)
-                    return True
+        # cari value option yang cocok dalam 1 evaluate (bukan inner_text per option)
+        val = await page.evaluate(
+            """([sel, src])=>{ const re=new RegExp(src, 'i');
+                               const o=Array.from(document.querySelector(sel)?.options || [])
+                                            .find(o=>re.test(o.text));
+                               return o ? o.value : null }""",
+            [sel_css, label_re.pattern])
+        if val:
+            await page.select_option(sel_css, value=val)
+            return True
     except:
         pass
     return False
@@ -504,142 +1492,183 @@ async def _get_selected_text(page, sel_css: str) -> str:
     except:
         return ""
 
+async def _options_signature(page, sel_css: str) -> str:
+    try:
+        return await page.evaluate(
+            "(sel)=>{ const el=document.querySelector(sel); return el ? Array.from(el.options).map(o=>o.value).join('|') : '' }",
+            sel_css)
+    except:
+        return ""
+
+async def _wait_cascade(page, child_css: str, before_sig: str, timeout: int = 7000) -> bool:
+    """Tunggu daftar option child berubah (hasil AJAX cascade) dari signature sebelum parent dipilih."""
+    return await timed_wait(f"cascade {child_css}", page.wait_for_function(
+        """([sel, before])=>{ const el=document.querySelector(sel);
+                              if (!el) return true;
+                              const sig=Array.from(el.options).map(o=>o.value).join('|');
+                              return sig!==before && el.options.length>1 }""",
+        arg=[child_css, before_sig], timeout=timeout))
+
+async def _selected_option(page, sel_css: str) -> dict:
+    try:
+        return await page.evaluate(
+            """(sel)=>{ const el=document.querySelector(sel);
+                        const o=el?.options?.[el.selectedIndex];
+                        return {value: el?.value || '', text: o?.text || ''} }""", sel_css)
+    except:
+        return {"value": "", "text": ""}
+
+async def _select_wilayah_level(page, name: str, sel_css: str, code_norm: str, key: str | None,
+                                child_css: str | None = None) -> bool:
+    """
+    Pilih 1 level wilayah. Value dari WILAYAH_CACHE dipakai langsung (cukup tunggu
+    option itu ada); miss -> cari label '[kode]' lalu pelajari value-nya.
+    Jika child_css diberikan, tunggu daftar child ikut berubah (cascade AJAX).
+    """
+    label_re = re.compile(rf"\[\s*0*{re.escape(code_norm)}\s*\]", re.I)
+    cached = WILAYAH_CACHE.get(key)
+    cur = await _selected_option(page, sel_css)
+    if (cached and cur["value"] == cached) or (cur["value"] and label_re.search(cur["text"])):
+        WILAYAH_CACHE.learn(key, cur["value"], cur["text"].strip())
+        return True
+
+    child_sig = await _options_signature(page, child_css) if child_css else ""
+    chosen = False
+    if cached:
+        ok = await timed_wait(f"option {name}={cached}", page.wait_for_selector(
+            f"{sel_css} option[value='{cached}']", state="attached", timeout=7000))
+        if ok:
+            try:
+                await page.select_option(sel_css, value=cached)
+                chosen = True
+            except: pass
+        if not chosen:
+            logger.warning(f"Cache wilayah {key}={cached} tidak ada di {name}, cari via label.")
+            WILAYAH_CACHE.forget(key)
+
+    if not chosen:
+        # miss: tunggu opsi termuat lalu pilih berdasarkan label [XX]
+        try:
+            await page.wait_for_function(
+                "(sel)=>document.querySelector(sel)?.querySelectorAll('option').length>1",
+                arg=sel_css, timeout=7000
+            )
+        except:
+            pass
+        chosen = await _select_by_label_code(page, sel_css, code_norm)
+        if chosen:
+            cur = await _selected_option(page, sel_css)
+            WILAYAH_CACHE.learn(key, cur["value"], cur["text"].strip())
+        else:
+            logger.warning(f"Gagal set {name} via label [ {code_norm} ].")
+
+    if chosen and child_css:
+        await _wait_cascade(page, child_css, child_sig)
+    return chosen
+
 async def set_wilayah_from_db(page, kdkab: str | int | None, kdkec: str | int | None, kddesa: str | int | None):
     """
     Mengisi:
-      - Provinsi: tetap DKI (value='116') jika belum terisi.
+      - Provinsi: tetap DKI [31] (value '116').
       - Kabupaten/Kota: pilih berdasarkan kdkab (label seperti '[73] JAKARTA PUSAT').
       - Kecamatan: pilih berdasarkan kdkec (label seperti '[010] TANAH ABANG').
       - Kelurahan/Desa: pilih berdasarkan kddesa (label seperti '[001] GELORA').
 
-    Semua pemilihan berbasis label (teks option) agar robust terhadap value dinamis.
+    Value option diambil dari WILAYAH_CACHE bila ada; label (teks option) hanya
+    dicari saat cache miss, hasilnya dipelajari untuk row berikutnya.
     """
     # Pastikan elemen ada
     if await page.locator(SEL["provinsi"]).count() == 0:
         return
 
-    # 0) Pastikan Provinsi DKI JAKARTA (116) bila kosong
-    try:
-        prov_text = (await _get_selected_text(page, SEL["provinsi"])).lower()
-    except:
-        prov_text = ""
-    if not prov_text or "jakarta" not in prov_text:
-        try:
-            await page.select_option(SEL["provinsi"], value="116")
-        except:
-            try:
-                await page.select_option(SEL["provinsi"], label=re.compile(r"\[31\].*DKI.*JAKARTA", re.I))
-            except:
-                logger.warning("Gagal set provinsi DKI, lanjut tetap coba kab/kec/desa.")
-    # Beri waktu load dependent dropdown
-    await page.wait_for_timeout(600)
+    kab_css = SEL["kabupaten"]
+    kec_css = SEL["kecamatan"] if "kecamatan" in SEL else "#kecamatan"
+    kel_css = SEL["kelurahan"] if "kelurahan" in SEL else "#kelurahan_desa"
+
+    # 0) Provinsi selalu DKI JAKARTA (kdprov di DB tidak dipakai)
+    prov = "31"
+    if not await _select_wilayah_level(page, "provinsi", SEL["provinsi"], prov,
+                                       WilayahCache.key(prov), child_css=kab_css):
+        logger.warning("Gagal set provinsi, lanjut tetap coba kab/kec/desa.")
 
     # Jika DB tidak menyediakan kdkab/kdkec/kddesa, fallback ke behavior lama (DKI / Jakpus default)
     if not kdkab:
         return await set_wilayah(page)
 
-    # Normalisasi kode label
-    kdkab_s  = str(kdkab).strip()                 # contoh '73'
-    kdkec_s  = _pad3(kdkec) if kdkec is not None else ""  # contoh '010'
-    kddesa_s = _pad3(kddesa) if kddesa is not None else ""# contoh '001'
-
-    kab_css = SEL["kabupaten"]
-    kec_css = SEL["kecamatan"] if "kecamatan" in SEL else "#kecamatan"
-    kel_css = SEL["kelurahan"] if "kelurahan" in SEL else "#kelurahan_desa"
+    kab, kec, desa = _norm_code(kdkab), _norm_code(kdkec), _norm_code(kddesa)
 
     # 1) KAB/KOTA
-    if await page.locator(kab_css).count() > 0:
-        # Skip jika sudah sesuai
-        cur_kab_txt = await _get_selected_text(page, kab_css)
-        if not re.search(rf"\[\s*{re.escape(kdkab_s)}\s*\]", cur_kab_txt or "", re.I):
-            # Tunggu opsi termuat
-            try:
-                await page.wait_for_function(
-                    "(sel)=>document.querySelector(sel)?.querySelectorAll('option').length>1",
-                    arg=kab_css, timeout=5000
-                )
-            except:
-                pass
-            # Pilih berdasarkan label [XX]
-            try:
-                await page.select_option(
-                    kab_css,
-                    label=re.compile(rf"\[\s*{re.escape(kdkab_s)}\s*\]", re.I)
-                )
-            except:
-                logger.warning(f"Gagal set kabupaten via label [ {kdkab_s} ], coba brute-find.")
-                # Brute: cari option yang match lalu set value-nya
-                try:
-                    opt_val = await page.locator(
-                        f"{kab_css} option",
-                        has_text=re.compile(rf"\[\s*{re.escape(kdkab_s)}\s*\]", re.I)
-                    ).first.get_attribute("value")
-                    if opt_val:
-                        await page.select_option(kab_css, value=opt_val)
-                except:
-                    logger.warning("Brute-find kabupaten juga gagal.")
-        await page.wait_for_timeout(600)
+    if kab and await page.locator(kab_css).count() > 0:
+        await _select_wilayah_level(page, "kabupaten", kab_css, kab, WilayahCache.key(prov, kab),
+                                    child_css=kec_css if kec else None)
 
     # 2) KECAMATAN
-    if kdkec_s and await page.locator(kec_css).count() > 0:
-        cur_kec_txt = await _get_selected_text(page, kec_css)
-        if not re.search(rf"\[\s*{re.escape(kdkec_s)}\s*\]", cur_kec_txt or "", re.I):
-            # Tunggu opsi kecamatan muncul setelah pilih kabupaten
-            try:
-                await page.wait_for_function(
-                    "(sel)=>document.querySelector(sel)?.querySelectorAll('option').length>1",
-                    arg=kec_css, timeout=7000
-                )
-            except:
-                pass
-            try:
-                await page.select_option(
-                    kec_css,
-                    label=re.compile(rf"\[\s*{re.escape(kdkec_s)}\s*\]", re.I)
-                )
-            except:
-                logger.warning(f"Gagal set kecamatan via label [ {kdkec_s} ], coba brute-find.")
-                try:
-                    opt_val = await page.locator(
-                        f"{kec_css} option",
-                        has_text=re.compile(rf"\[\s*{re.escape(kdkec_s)}\s*\]", re.I)
-                    ).first.get_attribute("value")
-                    if opt_val:
-                        await page.select_option(kec_css, value=opt_val)
-                except:
-                    logger.warning("Brute-find kecamatan juga gagal.")
-        await page.wait_for_timeout(500)
+    if kab and kec and await page.locator(kec_css).count() > 0:
+        await _select_wilayah_level(page, "kecamatan", kec_css, kec, WilayahCache.key(prov, kab, kec),
+                                    child_css=kel_css if desa else None)
 
     # 3) KELURAHAN/DESA
-    if kddesa_s and await page.locator(kel_css).count() > 0:
-        cur_kel_txt = await _get_selected_text(page, kel_css)
-        if not re.search(rf"\[\s*{re.escape(kddesa_s)}\s*\]", cur_kel_txt or "", re.I):
-            # Tunggu opsi kelurahan muncul setelah pilih kecamatan
-            try:
-                await page.wait_for_function(
-                    "(sel)=>document.querySelector(sel)?.querySelectorAll('option').length>1",
-                    arg=kel_css, timeout=7000
-                )
-            except:
-                pass
-            try:
-                await page.select_option(
-                    kel_css,
-                    label=re.compile(rf"\[\s*{re.escape(kddesa_s)}\s*\]", re.I)
-                )
-            except:
-                logger.warning(f"Gagal set kelurahan via label [ {kddesa_s} ], coba brute-find.")
-                try:
-                    opt_val = await page.locator(
-                        f"{kel_css} option",
-                        has_text=re.compile(rf"\[\s*{re.escape(kddesa_s)}\s*\]", re.I)
-                    ).first.get_attribute("value")
-                    if opt_val:
-                        await page.select_option(kel_css, value=opt_val)
-                except:
-                    logger.warning("Brute-find kelurahan juga gagal.")
-        await page.wait_for_timeout(400)
+    if kab and kec and desa and await page.locator(kel_css).count() > 0:
+        if await _select_wilayah_level(page, "kelurahan", kel_css, desa,
+                                       WilayahCache.key(prov, kab, kec, desa)):
+            await timed_wait("kelurahan selesai", wait_blockui_gone(page))
 
+def _parse_cascade_options(body: str) -> list[tuple[str, str, str]]:
+    """
+    Respons endpoint cascade -> [(kode_norm, value, label)] untuk option berlabel '[kode] NAMA'.
+    Terima JSON (list dict value/id + text/nama, list [value, text], atau {"data": [...]})
+    maupun potongan HTML <option>.
+    """
+    try:
+        items = json.loads(body)
+    except ValueError:
+        items = [(v, re.sub(r"<[^>]+>", "", t)) for v, t in re.findall(
+            r"<option[^>]*value=[\"']?([^\"'\s>]*)[\"']?[^>]*>(.*?)</option>", body, re.I | re.S)]
+    if isinstance(items, dict):
+        items = items.get("data") or []
+    out = []
+    for it in items if isinstance(items, list) else []:
+        if isinstance(it, dict):
+            value = next((it[k] for k in ("value", "id") if it.get(k) not in (None, "")), "")
+            text = next((it[k] for k in ("text", "nama", "label", "name") if it.get(k)), "")
+        elif isinstance(it, (list, tuple)) and len(it) >= 2:
+            value, text = it[0], it[1]
+        else:
+            continue
+        m = re.search(r"\[\s*(\d+)\s*\]", str(text))
+        if value not in (None, "") and m and _norm_code(m.group(1)):
+            out.append((_norm_code(m.group(1)), str(value), str(text).strip()))
+    return out
+
+async def _fetch_cascade(page, level: str, parent: str) -> list[tuple[str, str, str]]:
+    """GET 1 daftar anak wilayah lewat page.request (sesi halaman, tanpa membuka form)."""
+    url = urljoin(BASE_URL, WILAYAH_CASCADE_URL.format(level=level, parent=parent))
+    resp = await page.request.get(url, headers={"X-Requested-With": "XMLHttpRequest", "Referer": page.url})
+    if not resp.ok:
+        raise InfraIssue(f"Cascade {level} parent={parent} HTTP {resp.status} ({url})")
+    return _parse_cascade_options(await resp.text())
+
+async def crawl_wilayah(page, kdprov: str = "31"):
+    """
+    Isi WILAYAH_CACHE untuk 1 provinsi dengan memanggil endpoint cascade
+    (WILAYAH_CASCADE_URL) per kab/kec. Tidak membuka form edit, jadi tidak ada
+    IDSBR yang ikut terkunci.
+    """
+    prov = _norm_code(kdprov) or "31"
+    prov_val = WILAYAH_CACHE.get(WilayahCache.key(prov))
+    if not prov_val:
+        raise InfraIssue(f"Value option provinsi [{prov}] belum diketahui (lihat WILAYAH_SEED).")
+    lv_kab, lv_kec, lv_desa = WILAYAH_CASCADE_LEVELS
+    kabs = await _fetch_cascade(page, lv_kab, prov_val)
+    for kab, kab_val, kab_label in kabs:
+        WILAYAH_CACHE.learn(WilayahCache.key(prov, kab), kab_val, kab_label)
+        kecs = await _fetch_cascade(page, lv_kec, kab_val)
+        for kec, kec_val, kec_label in kecs:
+            WILAYAH_CACHE.learn(WilayahCache.key(prov, kab, kec), kec_val, kec_label)
+            for desa, desa_val, desa_label in await _fetch_cascade(page, lv_desa, kec_val):
+                WILAYAH_CACHE.learn(WilayahCache.key(prov, kab, kec, desa), desa_val, desa_label)
+        logger.info(f"🗺️  crawl {kab_label}: {len(kecs)} kecamatan")
+    logger.info(f"🗺️  crawl selesai: {len(kabs)} kabupaten, {len(WILAYAH_CACHE)} kode di cache")
 
 async def set_wilayah(
     page,
@@ -682,6 +1711,7 @@ async def set_wilayah(
 
     # 1) Provinsi
     if not prov_val.strip():
+        kab_sig = await _options_signature(page, SEL["kabupaten"])
         ok_prov = False
         if kdprov_norm:
             ok_prov = await _select_by_label_code(page, SEL["provinsi"], kdprov_norm)
@@ -697,11 +1727,12 @@ async def set_wilayah(
                     ok_prov = True
                 except:
                     logger.warning("Gagal set provinsi via fallback DKI.")
-        await page.wait_for_timeout(600)
-        await _wait_options_loaded(page, SEL["kabupaten"], min_count=2)
+        if ok_prov:
+            await _wait_cascade(page, SEL["kabupaten"], kab_sig)
 
     # 2) Kab/Kota
     if not kab_val.strip():
+        kec_sig = await _options_signature(page, SEL["kecamatan"])
         ok_kab = False
         if kdkab_norm:
             ok_kab = await _select_by_label_code(page, SEL["kabupaten"], kdkab_norm)
@@ -716,17 +1747,18 @@ async def set_wilayah(
                     ok_kab = True
                 except:
                     logger.warning("Gagal set kabupaten via fallback.")
-        await page.wait_for_timeout(500)
-        await _wait_options_loaded(page, SEL["kecamatan"], min_count=2)
+        if ok_kab:
+            await _wait_cascade(page, SEL["kecamatan"], kec_sig)
 
     # 3) Kecamatan
     if not kec_val.strip():
         if kdkec_norm:
+            kel_sig = await _options_signature(page, SEL["kelurahan"])
             ok_kec = await _select_by_label_code(page, SEL["kecamatan"], kdkec_norm)
-            if not ok_kec:
+            if ok_kec:
+                await _wait_cascade(page, SEL["kelurahan"], kel_sig)
+            else:
                 logger.warning(f"Gagal set kecamatan kode [{kdkec_norm}]")
-        await page.wait_for_timeout(400)
-        await _wait_options_loaded(page, SEL["kelurahan"], min_count=2)
 
     # 4) Kelurahan/Desa
     if not kel_val.strip():
@@ -756,17 +1788,14 @@ async def set_bentuk_badan_usaha(page, text_value: str | None):
         except: pass
 
     try:
-        options = await sel.locator("option").all_inner_texts()
-        values  = await sel.locator("option").evaluate_all("opts=>opts.map(o=>o.value)")
-        if not options or not values: return
-        target = text_value.strip().lower()
-        best_idx, best_score = -1, -1
-        for i, opt in enumerate(options):
-            score = fuzz.token_set_ratio(target, (opt or "").lower())
-            if score > best_score:
-                best_idx, best_score = i, score
-        if 0 <= best_idx < len(values):
-            await sel.select_option(value=values[best_idx])
+        values = await sel.locator("option").evaluate_all("opts=>opts.map(o=>o.value)")
+        if not values: return
+        if FUZZY.needs_vocab("bentuk_badan_usaha", len(values)):
+            # o.text, sama dengan snapshot engine batch
+            FUZZY.set_vocab("bentuk_badan_usaha", await sel.locator("option").evaluate_all("opts=>opts.map(o=>o.text)"))
+        idx, _, _ = FUZZY.match("bentuk_badan_usaha", text_value)
+        if idx is not None and idx < len(values):
+            await sel.select_option(value=values[idx])
     except: pass
 
 async def set_tahun_berdiri(page, year_value: str | None):
@@ -780,30 +1809,212 @@ async def set_jaringan_usaha(page, text_value: str | None):
     if not text_value: return
     radios = page.locator(SEL["jaringan_usaha_radios"])
     n = await radios.count()
-    if n == 0: return
-    target = text_value.strip().lower()
-    best_idx, best_score = -1, -1
-    for i in range(n):
-        r = radios.nth(i)
-        val = (await r.get_attribute("value")) or ""
-        rid = (await r.get_attribute("id")) or ""
-        label_text = ""
-        try:
-            if rid:
-                lbl = page.locator(f"label[for='{rid}']")
-                if await lbl.count() > 0:
-                    label_text = (await lbl.first.inner_text()) or ""
-        except: pass
-        cand = f"{val} {label_text}".lower()
-        score = fuzz.token_set_ratio(target, cand)
-        if score > best_score:
-            best_idx, best_score = i, score
-    if best_idx >= 0:
+    if not n: return
+    if FUZZY.needs_vocab("jaringan", n):
+        # value + label semua radio dalam 1 evaluate
+        FUZZY.set_vocab("jaringan", await radios.evaluate_all(
+            """rs=>rs.map(r=>{ const l=r.id ? document.querySelector(`label[for="${CSS.escape(r.id)}"]`) : null;
+                              return `${r.value} ${l ? l.innerText : ''}` })"""))
+    best_idx, _, _ = FUZZY.match("jaringan", text_value)
+    if best_idx is not None:
         try: await radios.nth(best_idx).check()
         except:
             try: await radios.nth(best_idx).click()
             except: pass
 
+# ---------- Form engine (snapshot + diff) ----------
+# Field teks/checkbox/select/radio yang diisi dari row DB. Wilayah (cascade AJAX)
+# dan KBLI (baris dinamis) tetap lewat setter masing-masing.
+FORM_SPEC = {
+    "inputs": {k: SEL[k] for k in ("sumber", "catatan", "sls", "alamat", "email", "telepon",
+                                   "whatsapp", "website", "lat", "lng", "tahun_berdiri")},
+    "checks": {"email_checkbox": SEL["email_checkbox"]},
+    "selects": {"bentuk_badan_usaha": SEL["bentuk_badan_usaha"]},
+    "radios": {"kondisi": SEL["status_radios"], "jaringan": SEL["jaringan_usaha_radios"]},
+}
+
+FORM_SNAPSHOT_JS = """
+(spec) => {
+  const out = {inputs: {}, checks: {}, selects: {}, radios: {}};
+  for (const [k, css] of Object.entries(spec.inputs)) {
+    const el = document.querySelector(css);
+    out.inputs[k] = el ? (el.value ?? "") : null;
+  }
+  for (const [k, css] of Object.entries(spec.checks)) {
+    const el = document.querySelector(css);
+    out.checks[k] = el ? !!el.checked : null;
+  }
+  for (const [k, css] of Object.entries(spec.selects)) {
+    const el = document.querySelector(css);
+    out.selects[k] = el ? {
+      value: el.value, index: el.selectedIndex,
+      options: Array.from(el.options).map(o => ({value: o.value, text: o.text})),
+    } : null;
+  }
+  for (const [k, css] of Object.entries(spec.radios)) {
+    out.radios[k] = Array.from(document.querySelectorAll(css)).map(r => {
+      const lbl = r.id ? document.querySelector(`label[for="${CSS.escape(r.id)}"]`) : null;
+      return {id: r.id, value: r.value, label: lbl ? lbl.innerText : "", checked: r.checked};
+    });
+  }
+  return out;
+}
+"""
+
+# fill/select: set value + input/change/blur; check/uncheck: click() hanya jika state beda
+# (sama seperti locator.check, jadi handler onclick halaman ikut jalan)
+FORM_APPLY_JS = """
+(ops) => {
+  const fire = (el, ...types) => types.forEach(t => el.dispatchEvent(new Event(t, {bubbles: true})));
+  const missing = [];
+  for (const op of ops) {
+    const el = op.id ? document.getElementById(op.id) : document.querySelector(op.css);
+    if (!el) { missing.push(op.key); continue; }
+    if (op.op === "fill" || op.op === "select") {
+      if (el.focus) el.focus();
+      el.value = op.value;
+      fire(el, "input", "change");
+      if (el.blur) el.blur();
+    } else if ((op.op === "check") !== el.checked) {
+      el.click();
+    }
+  }
+  return missing;
+}
+"""
+
+def plan_form(snap: dict, row) -> list[dict]:
+    """
+    Hitung target state form dari row DB (aturan sama dengan set_* di atas) dan
+    kembalikan hanya operasi untuk field yang nilainya berbeda dari snapshot.
+    """
+    inputs, ops = snap["inputs"], []
+
+    def fill(key, value):
+        if inputs.get(key) is not None and inputs[key] != value:
+            ops.append({"key": key, "css": FORM_SPEC["inputs"][key], "op": "fill", "value": value})
+
+    def check(key, on: bool):
+        cur = snap["checks"].get(key)
+        if cur is not None and cur != on:
+            ops.append({"key": key, "css": FORM_SPEC["checks"][key], "op": "check" if on else "uncheck"})
+
+    def pick_radio(key, idx):
+        radios = snap["radios"].get(key) or []
+        if 0 <= idx < len(radios) and not radios[idx]["checked"]:
+            r = radios[idx]
+            ops.append({"key": key, "id": r["id"] or None,
+                        "css": f"{FORM_SPEC['radios'][key]}[value='{r['value']}']", "op": "check"})
+
+    # teks dasar (selalu ditimpa nilai DB)
+    fill("sumber", to_str(row["sumber_profiling"]))
+    fill("catatan", to_str(row["catatan_profiling"]))
+    fill("sls", to_str(row["nama_sls"]))
+    alamat = (row["alamat"] or "").strip()
+    if alamat:
+        fill("alamat", alamat)
+
+    # email + checkbox
+    if not _is_valid_email(inputs.get("email") or ""):
+        if _is_valid_email(row["email"]):
+            fill("email", row["email"].strip())
+            check("email_checkbox", True)
+        else:
+            fill("email", "")
+            check("email_checkbox", False)
+    else:
+        check("email_checkbox", True)
+
+    for key, col in (("telepon", "nomor_telepon"), ("whatsapp", "nomor_whatsapp")):
+        digits = _only_digits(row[col])
+        if digits:
+            fill(key, digits)
+    website = (row["website"] or "").strip()
+    if website:
+        fill("website", website)
+
+    # lat/lng: kosong di DB -> kosongkan di form
+    for key, col in (("lat", "latitude"), ("lng", "longitude")):
+        v = row[col]
+        fill(key, str(v) if v is not None and str(v).strip() else "")
+
+    year = re.sub(r"[^\d]", "", to_str(row["tahun_berdiri"]))
+    if len(year) >= 4:
+        fill("tahun_berdiri", year[:4])
+
+    # kondisi usaha (radio by id)
+    status = (row["status"] or "").strip().lower()
+    target_id = next((rid for key, rid in STATUS_MAP.items() if key in status), None) if status else None
+    if target_id:
+        ids = [r["id"] for r in snap["radios"].get("kondisi") or []]
+        if target_id in ids:
+            pick_radio("kondisi", ids.index(target_id))
+        else:
+            logger.warning(f"Radio {target_id} tidak ditemukan di halaman")
+
+    # bentuk badan usaha: pertahankan pilihan valid yang sudah ada
+    sel = snap["selects"].get("bentuk_badan_usaha")
+    if sel and sel["options"]:
+        cur_text = sel["options"][sel["index"]]["text"].lower() if sel["index"] >= 0 else ""
+        keep = sel["value"] and cur_text and "pilih" not in cur_text and "lainnya" not in cur_text
+        if not keep:
+            text = (row["bentuk_badan_usaha"] or "").strip().lower()
+            if FUZZY.needs_vocab("bentuk_badan_usaha", len(sel["options"])):
+                FUZZY.set_vocab("bentuk_badan_usaha", [o["text"] for o in sel["options"]])
+            if not text or text == "lainnya":
+                idx = 0
+            else:
+                idx = FUZZY.match("bentuk_badan_usaha", text)[0]
+            if idx is not None and idx != sel["index"]:
+                ops.append({"key": "bentuk_badan_usaha", "css": FORM_SPEC["selects"]["bentuk_badan_usaha"],
+                            "op": "select", "value": sel["options"][idx]["value"]})
+
+    # jaringan usaha (fuzzy atas value + label)
+    jaringan = (row["jaringan_usaha"] or "").strip().lower()
+    radios = snap["radios"].get("jaringan") or []
+    if jaringan and radios:
+        if FUZZY.needs_vocab("jaringan", len(radios)):
+            FUZZY.set_vocab("jaringan", [f"{r['value']} {r['label']}" for r in radios])
+        idx = FUZZY.match("jaringan", jaringan)[0]
+        if idx is not None:
+            pick_radio("jaringan", idx)
+
+    return ops
+
+async def fill_form(page, row):
+    """Isi field dasar dalam 2 round trip: 1 evaluate baca semua nilai, 1 evaluate tulis yang berubah."""
+    snap = await page.evaluate(FORM_SNAPSHOT_JS, FORM_SPEC)
+    ops = plan_form(snap, row)
+    if ops:
+        missing = await page.evaluate(FORM_APPLY_JS, ops)
+        if missing:
+            logger.warning(f"[{row['idsbr']}] field hilang saat apply: {', '.join(missing)}")
+    logger.info(f"[{row['idsbr']}] form diff: {len(ops)} field diubah"
+                f"{' (' + ', '.join(o['key'] for o in ops) + ')' if ops else ''}")
+
+async def fill_form_legacy(page, row):
+    """Jalur lama: setter per field (FORM_ENGINE=legacy)."""
+    await page.fill(SEL["sumber"], to_str(row["sumber_profiling"]))
+    await page.fill(SEL["catatan"], to_str(row["catatan_profiling"]))
+    await page.fill(SEL["sls"], to_str(row["nama_sls"]))
+    await set_alamat(page, row["alamat"])
+
+    await set_email(page, row["email"])
+    await set_telepon(page, row["nomor_telepon"])
+    await set_whatsapp(page, row["nomor_whatsapp"])
+    await set_website(page, row["website"])
+
+    # lat/lng (kosongkan dulu → isi jika ada)
+    await page.fill(SEL["lat"], ""); await page.fill(SEL["lng"], "")
+    lat, lng = row["latitude"], row["longitude"]
+    if lat is not None and str(lat).strip(): await page.fill(SEL["lat"], str(lat))
+    if lng is not None and str(lng).strip(): await page.fill(SEL["lng"], str(lng))
+
+    await set_keberadaan_usaha(page, row["status"])
+    await set_bentuk_badan_usaha(page, row["bentuk_badan_usaha"])
+    await set_tahun_berdiri(page, row["tahun_berdiri"])
+    await set_jaringan_usaha(page, row["jaringan_usaha"])
+
 # ---------- KBLI / Kegiatan Usaha ----------
 async def inject_kbli_row(page, kbli: str | None, kategori: str | None, deskripsi: str | None):
     """
@@ -825,7 +2036,7 @@ async def inject_kbli_row(page, kbli: str | None, kategori: str | None, deskrips
     n = await rows.count()
     if n == 0:
         await page.click(SEL["btn_add_kegiatan"])
-        await page.wait_for_timeout(400)
+        await timed_wait("baris kegiatan usaha", rows.first.wait_for(state="attached", timeout=5000))
         rows = container.locator(SEL["row_kegiatan"])
         n = await rows.count()
         if n == 0:
@@ -924,40 +2135,28 @@ async def open_edit_page(page):
             await new_page.goto(page.url)
             return new_page
 
-# ---------- Proses 1 row ----------
-@retry(
-    stop=stop_after_attempt(2),
-    wait=wait_fixed(2),
-    retry=retry_if_exception_type(InfraIssue),
-    reraise=True,
-)
-async def process_row(page, row):
-    idsbr = row["idsbr"]
-
-    # 0) beranda siap
-    try: await ensure_logged_in(page)
-    except PWTimeout: raise InfraIssue("Timeout memastikan beranda.")
+# ---------- Search & open edit ----------
+async def search_idsbr(page, idsbr):
+    """Langkah 0-2: landing, cari IDSBR, pastikan tepat 1 tombol edit."""
+    # 0) beranda siap (tab yang dipakai ulang biasanya sudah di landing)
+    if not await on_landing(page):
+        try: await ensure_logged_in(page)
+        except PWTimeout: raise InfraIssue("Timeout memastikan beranda.")
     await dismiss_intro_popup(page)
 
     # 1) search
-    logger.info(f"[{idsbr}] step: search")
     await page.fill(SEL["search_input"], to_str(idsbr))
     await wait_blockui_gone(page)
-    await page.click(SEL["btn_filter"])
-    await page.wait_for_timeout(800)
+    await click_filter_and_wait(page, f"[{idsbr}] filter")
 
     # 2) cek hasil
-    await page.wait_for_timeout(1500)
     try:
-        await page.wait_for_load_state("networkidle", timeout=5000)
         edits = await page.locator(SEL["edit_buttons"]).all()
         logger.info(f"[{idsbr}] hasil edit buttons = {len(edits)}")
 
         if len(edits) == 0:
             logger.warning(f"[{idsbr}] Tidak ada hasil, mencoba lagi…")
-            await page.click(SEL["btn_filter"])
-            await page.wait_for_timeout(2000)
-            await page.wait_for_load_state("networkidle", timeout=5000)
+            await click_filter_and_wait(page, f"[{idsbr}] filter ulang")
             edits = await page.locator(SEL["edit_buttons"]).all()
             logger.info(f"[{idsbr}] hasil edit buttons setelah coba ulang = {len(edits)}")
 
@@ -967,12 +2166,12 @@ async def process_row(page, row):
         if "Execution context was destroyed" in str(e):
             logger.warning(f"[{idsbr}] Konteks rusak, reload & coba ulang…")
             await page.reload()
-            await page.wait_for_timeout(2000)
+            await timed_wait(f"[{idsbr}] reload landing",
+                             page.wait_for_selector(SEL["btn_filter"], timeout=TIMEOUT_MS))
+            await dismiss_intro_popup(page)
             await page.fill(SEL["search_input"], to_str(idsbr))
             await wait_blockui_gone(page)
-            await page.click(SEL["btn_filter"])
-            await page.wait_for_timeout(2000)
-            await page.wait_for_load_state("networkidle", timeout=5000)
+            await click_filter_and_wait(page, f"[{idsbr}] filter setelah reload")
             edits = await page.locator(SEL["edit_buttons"]).all()
             logger.info(f"[{idsbr}] hasil edit buttons setelah reload = {len(edits)}")
             if len(edits) != 1:
@@ -980,69 +2179,91 @@ async def process_row(page, row):
         else:
             raise
 
-    # 3) buka edit
-    logger.info(f"[{idsbr}] step: open edit page")
-    page = await open_edit_page(page)
+async def open_edit_direct(page, idsbr, url) -> bool:
+    """Buka form lewat URL edit tersimpan (lewati search + filter). False -> pakai jalur search."""
     try:
-        logger.info(f"[{idsbr}] after edit -> url={page.url} | title={await page.title()}")
-    except: pass
-
-    # Tangani swal lat/lng kalau muncul saat open (jangan skip)
-    await handle_latlng_error_on_open(page)
-
-    # 4) race: locked atau form
-    try:
-        for _ in range(3):
-            await wait_blockui_gone(page, timeout=20000)
-            await dismiss_intro_popup(page)
-            if await is_locked_by_other(page):
-                raise LockedByOther(idsbr)
-            if await is_form_page(page):
-                break
-            await page.wait_for_timeout(800)
-        if await is_locked_by_other(page):
-            raise LockedByOther(idsbr)
-        if not await is_form_page(page):
-            raise InfraIssue("Form tidak muncul setelah edit.")
+        await page.goto(url, timeout=TIMEOUT_MS)
+        if "login" in page.url.lower():
+            raise InfraIssue("Session expired. Re-record storage_state.")
+        await dismiss_intro_popup(page); await handle_any_swal(page)
+        await wait_blockui_gone(page, timeout=20000)
+        if await is_locked_by_other(page) or await is_form_page(page):
+            return True
     except PWTimeout:
-        raise InfraIssue("Timeout menunggu locked/form.")
+        pass
+    logger.warning(f"[{idsbr}] URL edit tersimpan tidak membuka form, kembali ke search")
+    return False
 
-    # 4a) approval in progress?
-    if await is_approval_in_progress(page):
-        logger.info(f"[{idsbr}] 🟡 approval in progress, skip as done")
-        raise ApprovalInProgress(idsbr)
+# ---------- Proses 1 row ----------
+@retry(
+    stop=stop_after_attempt(2),
+    wait=wait_fixed(2),
+    retry=retry_if_exception_type(InfraIssue),
+    reraise=True,
+)
+async def process_row(page, row, edit_urls=None):
+    idsbr = row["idsbr"]
+    known_url = row["edit_url"] if "edit_url" in row.keys() else None
+
+    # 0-3) URL edit sudah dikenal → langsung goto form; kalau tidak, search + filter + klik edit
+    opened = False
+    if known_url:
+        with step("open_direct", idsbr):
+            opened = await open_edit_direct(page, idsbr, known_url)
+        if not opened and edit_urls:
+            edit_urls.forget(idsbr)
+    if not opened:
+        with step("search", idsbr):
+            await search_idsbr(page, idsbr)
+
+        # 3) buka edit
+        with step("open_edit", idsbr):
+            page = await open_edit_page(page)
+            try:
+                logger.info(f"[{idsbr}] after edit -> url={page.url} | title={await page.title()}")
+            except: pass
 
-    # 4b) sudah pernah submit?
-    try:
-        if await page.locator(SEL["cancel_submit"]).is_visible():
-            raise AlreadyDone(idsbr)
-    except: pass
+    with step("detect", idsbr):
+        # Tangani swal lat/lng kalau muncul saat open (jangan skip)
+        await handle_latlng_error_on_open(page)
 
-    # 5) isi field dasar
-    logger.info(f"[{idsbr}] step: fill core fields")
-    status = row.get("status") if isinstance(row, dict) else row["status"]
-    nama_sls = to_str(row["nama_sls"])
+        # 4) race: locked atau form
+        try:
+            for _ in range(3):
+                await wait_blockui_gone(page, timeout=20000)
+                await dismiss_intro_popup(page)
+                if await is_locked_by_other(page):
+                    raise LockedByOther(idsbr)
+                if await is_form_page(page):
+                    break
+                await wait_form_or_lock(page)
+            if await is_locked_by_other(page):
+                raise LockedByOther(idsbr)
+            if not await is_form_page(page):
+                raise InfraIssue("Form tidak muncul setelah edit.")
+        except PWTimeout:
+            raise InfraIssue("Timeout menunggu locked/form.")
 
-    await page.fill(SEL["sumber"], to_str(row["sumber_profiling"]))
-    await page.fill(SEL["catatan"], to_str(row["catatan_profiling"]))
-    await page.fill(SEL["sls"], nama_sls)
-    await set_alamat(page, row.get("alamat") if isinstance(row, dict) else row["alamat"])
+        if edit_urls and page.url != known_url:
+            edit_urls.remember(idsbr, page.url)
 
-    # 6) email & phone & website
-    await set_email(page, row.get("email") if isinstance(row, dict) else row["email"])
-    await set_telepon(page, row.get("nomor_telepon") if isinstance(row, dict) else row["nomor_telepon"])
-    await set_whatsapp(page, row.get("nomor_whatsapp") if isinstance(row, dict) else row["nomor_whatsapp"])
-    await set_website(page, row.get("website") if isinstance(row, dict) else row["website"])
+        # 4a) approval in progress?
+        if await is_approval_in_progress(page):
+            logger.info(f"[{idsbr}] 🟡 approval in progress, skip as done")
+            raise ApprovalInProgress(idsbr)
 
-    # 7) lat/lng (kosongkan dulu → isi jika ada)
-    await page.fill(SEL["lat"], ""); await page.fill(SEL["lng"], "")
-    lat = row.get("latitude") if isinstance(row, dict) else row["latitude"]
-    lng = row.get("longitude") if isinstance(row, dict) else row["longitude"]
-    if lat is not None and str(lat).strip(): await page.fill(SEL["lat"], str(lat))
-    if lng is not None and str(lng).strip(): await page.fill(SEL["lng"], str(lng))
+        # 4b) sudah pernah submit?
+        try:
+            if await page.locator(SEL["cancel_submit"]).is_visible():
+                raise AlreadyDone(idsbr)
+        except: pass
 
-    # 8) status
-    await set_keberadaan_usaha(page, status)
+    # 5-8, 10-12) field dasar, email/telp/web, lat/lng, kondisi, badan usaha, tahun, jaringan
+    with step("fill", idsbr):
+        if FORM_ENGINE == "legacy":
+            await fill_form_legacy(page, row)
+        else:
+            await fill_form(page, row)
 
     # 9) wilayah — gunakan kdprov/kdkab/kdkec/kddesa dari database bila ada
     # await set_wilayah(
@@ -1057,73 +2278,426 @@ async def process_row(page, row):
     kdkab = row.get("kdkab") if isinstance(row, dict) else row["kdkab"]
     kdkec = row.get("kdkec") if isinstance(row, dict) else row["kdkec"]
     kddesa = row.get("kddesa") if isinstance(row, dict) else row["kddesa"]
-    await set_wilayah_from_db(page, kdkab, kdkec, kddesa)
-
-    # 10) bentuk badan usaha
-    await set_bentuk_badan_usaha(page, row.get("bentuk_badan_usaha") if isinstance(row, dict) else row["bentuk_badan_usaha"])
-
-    # 11) tahun berdiri
-    await set_tahun_berdiri(page, row.get("tahun_berdiri") if isinstance(row, dict) else row["tahun_berdiri"])
-
-    # 12) jaringan usaha
-    await set_jaringan_usaha(page, row.get("jaringan_usaha") if isinstance(row, dict) else row["jaringan_usaha"])
+    with step("wilayah", idsbr):
+        await set_wilayah_from_db(page, kdkab, kdkec, kddesa)
 
     # 12b) KBLI/Kegiatan Usaha dari DB (opsional)
-    await inject_kbli_row(
-        page,
-        (row.get("kbli") if isinstance(row, dict) else row["kbli"]),
-        (row.get("kategori") if isinstance(row, dict) else row["kategori"]),
-        (row.get("deskripsi_kegiatan_usaha") if isinstance(row, dict) else row["deskripsi_kegiatan_usaha"]),
-    )
+    with step("kbli", idsbr):
+        await inject_kbli_row(
+            page,
+            (row.get("kbli") if isinstance(row, dict) else row["kbli"]),
+            (row.get("kategori") if isinstance(row, dict) else row["kategori"]),
+            (row.get("deskripsi_kegiatan_usaha") if isinstance(row, dict) else row["deskripsi_kegiatan_usaha"]),
+        )
 
     # 13) cek peta & submit
-    logger.info(f"[{idsbr}] step: cek-peta")
-    await page.click(SEL["cek_peta"])
-    await wait_blockui_gone(page, timeout=25000)
-
-    logger.info(f"[{idsbr}] step: submit")
-    await page.click(SEL["submit"])
-    await click_if_visible(page, SEL["confirm_consistency"], 2000)
-    await click_if_visible(page, SEL["ignore_consistency"], 2000)
-
-    # Jika muncul swal error lat/lng: klik OK dan lanjut submit flow tetap berakhir dengan swal done
-    await handle_latlng_error_after_submit(page)
-
-    ok = await click_if_visible(page, SEL["swal_primary"], 5000)
-    if not ok: await click_if_visible(page, SEL["swal_confirm"], 5000)
-    await page.wait_for_selector(SEL["swal_popup"], timeout=TIMEOUT_MS)
-    await handle_any_swal(page)
+    with step("cek_peta", idsbr):
+        await page.click(SEL["cek_peta"])
+        await wait_blockui_gone(page, timeout=25000)
+
+    with step("submit", idsbr):
+        await page.click(SEL["submit"])
+        await click_if_visible(page, SEL["confirm_consistency"], 2000)
+        await click_if_visible(page, SEL["ignore_consistency"], 2000)
+
+        # Jika muncul swal error lat/lng: klik OK dan lanjut submit flow tetap berakhir dengan swal done
+        await handle_latlng_error_after_submit(page)
+
+        ok = await click_if_visible(page, SEL["swal_primary"], 5000)
+        if not ok: await click_if_visible(page, SEL["swal_confirm"], 5000)
+        await page.wait_for_selector(SEL["swal_popup"], timeout=TIMEOUT_MS)
+        await handle_any_swal(page)
     logger.info(f"[{idsbr}] ✅ submitted")
 
-# ---------- Worker loop ----------
-async def run_worker(idx: int, pool):
-    logger.info(f"[{WORKER_NAME}:{idx}] started")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(
-            headless=HEADLESS,
-            args=[
-                "--disable-blink-features=AutomationControlled",
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-notifications",
-                "--mute-audio",
-                "--window-position=0,0",
-                "--window-size=1366,768",
-            ],
-        )
+# ---------- Request interception ----------
+class NetPolicy:
+    """
+    context.route("**/*") yang membuang resource yang tidak pernah dilihat worker
+    (gambar, font, tile peta, analytics). Per row mencatat jumlah request diblok
+    per tipe dan byte (Content-Length) yang dimuat / dihemat.
+
+    ROUTE_POLICY=measure tidak memblok apa pun, hanya menghitung byte yang AKAN
+    dihemat; pakai untuk menyetel daftar block sebelum diaktifkan.
+    """
+    def __init__(self, mode=ROUTE_POLICY, block_types=BLOCK_RESOURCE_TYPES,
+                 block_patterns=BLOCK_URL_PATTERNS, allow_patterns=ALLOW_URL_PATTERNS):
+        self.mode = mode
+        self.block_types = set(block_types)
+        self.block_re = re.compile("|".join(block_patterns), re.I) if block_patterns else None
+        self.allow_re = re.compile("|".join(allow_patterns), re.I) if allow_patterns else None
+        self.reset()
+
+    def reset(self):
+        self.blocked = {}           # resource_type -> jumlah
+        self.bytes_loaded = 0
+        self.bytes_saved = 0
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if self.allow_re and self.allow_re.search(url):
+            return False
+        if resource_type in self.block_types:
+            return True
+        return bool(self.block_re and self.block_re.search(url))
 
-        if not os.path.exists(STORAGE_STATE):
-            logger.error(f"Storage state '{STORAGE_STATE}' tidak ditemukan. Jalankan login recorder dulu.")
-            await browser.close()
+    async def attach(self, context):
+        if self.mode == "off":
             return
+        if self.mode == "block":
+            await context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+
+    async def _handle(self, route):
+        req = route.request
+        if self.should_block(req.url, req.resource_type):
+            self.blocked[req.resource_type] = self.blocked.get(req.resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.fallback()
+
+    def _on_response(self, response):
+        try: size = int(response.headers.get("content-length") or 0)
+        except ValueError: size = 0
+        req = response.request
+        if self.mode == "measure" and self.should_block(req.url, req.resource_type):
+            self.blocked[req.resource_type] = self.blocked.get(req.resource_type, 0) + 1
+            self.bytes_saved += size
+        else:
+            self.bytes_loaded += size
 
-        NORMAL_UA = (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/124.0.0.0 Safari/537.36"
-        )
+    def summary(self) -> str:
+        n = sum(self.blocked.values())
+        per_type = ", ".join(f"{k}={v}" for k, v in sorted(self.blocked.items()))
+        saved = f" | hemat={self.bytes_saved / 1024:.0f}KB" if self.mode == "measure" else ""
+        return f"blocked={n} ({per_type or '-'}) | dimuat={self.bytes_loaded / 1024:.0f}KB{saved}"
+
+# ---------- Static asset cache ----------
+# Header yang tidak boleh ikut di-fulfill: body dari route.fetch() sudah di-decode
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+class AssetCache:
+    """
+    Cache disk untuk aset statis (JS/CSS/font: DataTables, Select2, SweetAlert2, shepherd, …)
+    yang dilayani lewat context.route. Satu direktori dipakai bersama semua worker &
+    proses di PC ini dan bertahan antar restart. Entri lebih tua dari
+    ASSET_CACHE_REVALIDATE_S direvalidasi dengan If-None-Match / If-Modified-Since.
 
+    Statistik hit/miss kumulatif disimpan di <dir>/stats.json (lihat --cache-report).
+    """
+    label = "asset cache"
+
+    def __init__(self, root=ASSET_CACHE_DIR, revalidate_s=ASSET_CACHE_REVALIDATE_S):
+        self.root = root
+        self.revalidate_s = revalidate_s
+        self.stats = {"hit": 0, "revalidated": 0, "miss": 0, "bytes_served": 0}
+        if root:
+            os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def cache_key(req) -> str:
+        return req.url
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _load(self, url):
+        meta_p, body_p = self._paths(url)
+        try:
+            with open(meta_p, encoding="utf-8") as f: meta = json.load(f)
+            with open(body_p, "rb") as f: body = f.read()
+            return meta, body
+        except (OSError, ValueError):
+            return None, None
+
+    def _store(self, url, meta, body):
+        meta_p, body_p = self._paths(url)
+        os.makedirs(os.path.dirname(meta_p), exist_ok=True)
+        # tulis ke file sementara lalu rename: aman dibaca proses lain di saat bersamaan
+        for path, data, mode in ((body_p, body, "wb"), (meta_p, json.dumps(meta), "w")):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, mode) as f: f.write(data)
+            os.replace(tmp, path)
+
+    @staticmethod
+    def cacheable(req) -> bool:
+        return req.method == "GET" and req.resource_type in ASSET_CACHE_TYPES
+
+    async def attach(self, context):
+        if self.root:
+            await context.route("**/*", self._handle)
+
+    async def _handle(self, route):
+        req = route.request
+        if not self.cacheable(req):
+            return await route.fallback()
+        key = self.cache_key(req)
+        meta, body = await asyncio.to_thread(self._load, key)
+
+        if meta and time.time() - meta["fetched_at"] < self.revalidate_s:
+            self.stats["hit"] += 1
+            return await self._fulfill_cached(route, meta, body)
+
+        headers = dict(req.headers)
+        if meta:
+            if meta.get("etag"): headers["if-none-match"] = meta["etag"]
+            if meta.get("last_modified"): headers["if-modified-since"] = meta["last_modified"]
+        try:
+            resp = await route.fetch(headers=headers)
+        except Exception:
+            if meta:  # offline/timeout: lebih baik aset lama daripada gagal load
+                self.stats["hit"] += 1
+                return await self._fulfill_cached(route, meta, body)
+            return await route.fallback()
+
+        if meta and resp.status == 304:
+            meta["fetched_at"] = time.time()
+            await asyncio.to_thread(self._store, key, meta, body)
+            self.stats["revalidated"] += 1
+            return await self._fulfill_cached(route, meta, body)
+
+        self.stats["miss"] += 1
+        if not meta:
+            self.on_miss(req)
+        new_body = await resp.body()
+        h = resp.headers
+        if self.storable(resp):
+            new_meta = {
+                "url": req.url, "status": resp.status,
+                "headers": {k: v for k, v in h.items() if k.lower() not in _HOP_HEADERS},
+                "etag": h.get("etag"), "last_modified": h.get("last-modified"),
+                "fetched_at": time.time(),
+            }
+            await asyncio.to_thread(self._store, key, new_meta, new_body)
+        await route.fulfill(response=resp, body=new_body)
+
+    @staticmethod
+    def storable(resp) -> bool:
+        return resp.status == 200 and "no-store" not in resp.headers.get("cache-control", "").lower()
+
+    def on_miss(self, req):
+        pass
+
+    async def _fulfill_cached(self, route, meta, body):
+        self.stats["bytes_served"] += len(body)
+        await route.fulfill(status=meta["status"], headers=meta["headers"], body=body)
+
+    def hit_rate(self, stats=None) -> float:
+        st = stats or self.stats
+        total = st["hit"] + st["revalidated"] + st["miss"]
+        return (st["hit"] + st["revalidated"]) / total if total else 0.0
+
+    def save_stats(self):
+        """Gabungkan statistik proses ini ke <dir>/stats.json (kumulatif per PC)."""
+        if not self.root:
+            return
+        path = os.path.join(self.root, "stats.json")
+        try:
+            with open(path, encoding="utf-8") as f: total = json.load(f)
+        except (OSError, ValueError):
+            total = {}
+        for k, v in self.stats.items():
+            total[k] = total.get(k, 0) + v
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f: json.dump(total, f)
+        os.replace(tmp, path)
+        logger.info(f"📦 {self.label}: hit={self.stats['hit']} revalidated={self.stats['revalidated']} "
+                    f"miss={self.stats['miss']} hit-rate={self.hit_rate():.0%} "
+                    f"dilayani={self.stats['bytes_served'] / 1024 / 1024:.1f}MB")
+
+class CascadeCache(AssetCache):
+    """
+    Respons AJAX daftar kabupaten/kecamatan/kelurahan (cascade select wilayah) dilayani
+    dari disk. Daftar ini hampir tidak pernah berubah, jadi cukup diambil ulang tiap
+    CASCADE_REFRESH_S; direktori diberi versi (CASCADE_CACHE_VERSION) supaya seluruh
+    cache bisa dibuang dengan menaikkan angkanya. Daftar yang belum pernah terlihat
+    dicatat di log sebagai miss.
+
+    Hanya GET yang path-nya cocok CASCADE_URL_PATTERNS; POST (bisa mengubah data) hanya
+    bila path-nya persis cocok salah satu CASCADE_POST_ENDPOINTS. Respons no-store tidak disimpan.
+    """
+    label = "cascade cache"
+    _url_re = [re.compile(p, re.I) for p in CASCADE_URL_PATTERNS]
+    _post_re = [re.compile(p, re.I) for p in CASCADE_POST_ENDPOINTS]
+
+    def __init__(self, root=CASCADE_CACHE_DIR, version=CASCADE_CACHE_VERSION, refresh_s=CASCADE_REFRESH_S):
+        super().__init__(os.path.join(root, f"v{version}") if root else "", refresh_s)
+
+    @classmethod
+    def cacheable(cls, req) -> bool:
+        if req.resource_type not in ("xhr", "fetch"):
+            return False
+        path = urlsplit(req.url).path
+        if req.method == "POST":
+            return any(rx.fullmatch(path) for rx in cls._post_re)
+        if req.method != "GET" or "draw=" in req.url:   # draw= : DataTables, bukan cascade
+            return False
+        return any(rx.search(path) for rx in cls._url_re)
+
+    @staticmethod
+    def cache_key(req) -> str:
+        # parent id bisa di query string (GET) atau body (POST); buang token CSRF agar kunci stabil
+        try: body = req.post_data or ""
+        except Exception: body = ""
+        body = urlencode([(k, v) for k, v in parse_qsl(body, keep_blank_values=True) if k != "_token"])
+        return f"{req.method} {req.url} {body}"
+
+    @staticmethod
+    def storable(resp) -> bool:
+        return AssetCache.storable(resp) and "login" not in resp.url.lower()
+
+    def on_miss(self, req):
+        logger.info(f"🗺️  cascade miss: {req.method} {req.url}")
+
+def print_asset_cache_report(root=ASSET_CACHE_DIR):
+    if not root or not os.path.isdir(root):
+        print(f"Cache '{root}' belum ada.")
+        return
+    n, size, oldest = 0, 0, None
+    for dirpath, _, files in os.walk(root):
+        for fn in files:
+            fp = os.path.join(dirpath, fn)
+            if fn.endswith(".body"):
+                n += 1
+                size += os.path.getsize(fp)
+            elif fn.endswith(".json") and fn != "stats.json":
+                try:
+                    with open(fp, encoding="utf-8") as f: ts = json.load(f)["fetched_at"]
+                    oldest = ts if oldest is None else min(oldest, ts)
+                except (OSError, ValueError, KeyError):
+                    pass
+    try:
+        with open(os.path.join(root, "stats.json"), encoding="utf-8") as f: st = json.load(f)
+    except (OSError, ValueError):
+        st = {"hit": 0, "revalidated": 0, "miss": 0, "bytes_served": 0}
+    total = st["hit"] + st["revalidated"] + st["miss"]
+    print(f"📦 {root}: {n} aset, {size / 1024 / 1024:.1f}MB")
+    if oldest:
+        print(f"   validasi tertua: {(time.time() - oldest) / 3600:.1f} jam lalu")
+    print(f"   request={total} hit={st['hit']} revalidated={st['revalidated']} miss={st['miss']}")
+    print(f"   hit-rate={(st['hit'] + st['revalidated']) / total if total else 0:.1%} "
+          f"| dilayani dari cache={st['bytes_served'] / 1024 / 1024:.1f}MB")
+
+# ---------- Browser pool ----------
+CHROMIUM_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-notifications",
+    "--mute-audio",
+    "--window-position=0,0",
+    "--window-size=1366,768",
+]
+
+NORMAL_UA = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Safari/537.36"
+)
+
+# Stealth patches
+STEALTH_JS = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    window.chrome = window.chrome || { runtime: {} };
+    const originalQuery = window.navigator.permissions && window.navigator.permissions.query;
+    if (originalQuery) {
+      window.navigator.permissions.query = (parameters) => (
+        parameters && parameters.name === 'notifications'
+          ? Promise.resolve({ state: Notification.permission })
+          : originalQuery(parameters)
+      );
+    }
+    Object.defineProperty(navigator, 'plugins', { get: () => [1,2,3,4,5] });
+    Object.defineProperty(navigator, 'languages', { get: () => ['id-ID','id','en-US','en'] });
+    Object.defineProperty(navigator, 'platform', { get: () => 'Win32' });
+    Object.defineProperty(window, 'devicePixelRatio', { get: () => 1 });
+    const getParameter = WebGLRenderingContext.prototype.getParameter;
+    WebGLRenderingContext.prototype.getParameter = function(parameter) {
+      const debugInfo = this.getExtension('WEBGL_debug_renderer_info');
+      if (debugInfo) {
+        if (parameter === debugInfo.UNMASKED_VENDOR_WEBGL) return 'Intel Inc.';
+        if (parameter === debugInfo.UNMASKED_RENDERER_WEBGL) return 'Intel Iris OpenGL Engine';
+      }
+      return getParameter.apply(this, [parameter]);
+    };
+"""
+
+# Paksa window.open → same-tab
+SAME_TAB_JS = """
+  (function(){
+    const _open = window.open;
+    window.open = function(url, name, feats){
+      try { if (url) { window.location.href = url; return window; } }
+      catch(e){}
+      return _open.apply(window, arguments);
+    };
+  })();
+"""
+
+class BrowserPool:
+    """
+    K proses Chromium per host (BROWSERS_PER_HOST) dipakai bersama semua worker;
+    tiap worker dapat BrowserContext sendiri (cookie/storage terisolasi).
+    stats_loop() mencatat RSS & CPU seluruh proses browser agar K bisa dipilih dari data.
+    Browser yang terputus (crash/OOM) diluncurkan ulang di slot yang sama; context
+    lamanya ikut mati, worker membuat context baru lewat new_context() (lihat alive()).
+    """
+    def __init__(self, size=BROWSERS_PER_HOST):
+        self.size = size
+        self.browsers = []
+        self.assets = AssetCache()
+        self.cascade = CascadeCache()
+        self.relaunches = 0
+        self._pw = None
+        self._contexts = 0
+        self._closing = False
+        self._relaunching = {}      # slot -> Task peluncuran ulang yang sedang berjalan
+
+    async def start(self):
+        self._pw = await async_playwright().start()
+        for slot in range(self.size):
+            self.browsers.append(await self._launch(slot))
+        logger.info(f"🌐 {self.size} browser Chromium siap")
+
+    async def _launch(self, slot: int):
+        browser = await self._pw.chromium.launch(headless=HEADLESS, args=CHROMIUM_ARGS)
+        browser.on("disconnected", lambda _: self._on_disconnected(slot, browser))
+        return browser
+
+    def _on_disconnected(self, slot: int, browser):
+        if self._closing or slot >= len(self.browsers) or self.browsers[slot] is not browser:
+            return
+        logger.warning(f"💥 browser #{slot + 1} terputus (crash/OOM?), diluncurkan ulang")
+        self._relaunch(slot)
+
+    def _relaunch(self, slot: int) -> asyncio.Task:
+        task = self._relaunching.get(slot)
+        if task is None or task.done():
+            task = self._relaunching[slot] = asyncio.create_task(self._relaunch_slot(slot))
+        return task
+
+    async def _relaunch_slot(self, slot: int):
+        try:
+            self.browsers[slot] = await self._launch(slot)
+        except Exception as e:
+            # dicoba lagi oleh new_context() berikutnya
+            logger.error(f"Gagal meluncurkan ulang browser #{slot + 1}: {e}")
+            return
+        self.relaunches += 1
+        logger.info(f"🌐 browser #{slot + 1} diluncurkan ulang (total {self.relaunches}x)")
+
+    @staticmethod
+    def alive(context) -> bool:
+        """False bila browser milik context sudah terputus (context tidak bisa dipakai lagi)."""
+        browser = context.browser if context is not None else None
+        return browser is not None and browser.is_connected()
+
+    async def new_context(self, idx: int):
+        slot = (idx - 1) % len(self.browsers)
+        if not self.browsers[slot].is_connected():
+            await self._relaunch(slot)
+        browser = self.browsers[slot]
         context = await browser.new_context(
             storage_state=STORAGE_STATE,
             user_agent=NORMAL_UA,
@@ -1133,90 +2707,438 @@ async def run_worker(idx: int, pool):
             color_scheme="light",
             device_scale_factor=1.0,
         )
+        await context.add_init_script(STEALTH_JS)
+        await context.add_init_script(SAME_TAB_JS)
+        # route yang didaftarkan belakangan jalan lebih dulu: NetPolicy (run_worker) -> AssetCache
+        # -> CascadeCache; masing-masing fallback() untuk request yang bukan bagiannya
+        await self.cascade.attach(context)
+        await self.assets.attach(context)
+        self._contexts += 1
+        context.on("close", lambda _: self._release_context())
+        return context
+
+    def _release_context(self):
+        self._contexts -= 1
+
+    def usage(self):
+        """(rss_mb, cpu_percent, n_proses) semua proses turunan (driver Playwright + Chromium)."""
+        if psutil is None:
+            return None
+        rss, cpu, n = 0, 0.0, 0
+        for proc in psutil.Process().children(recursive=True):
+            try:
+                rss += proc.memory_info().rss
+                cpu += proc.cpu_percent(interval=None)
+                n += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return rss / 1024 / 1024, cpu, n
 
-        # Stealth patches
-        await context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-            window.chrome = window.chrome || { runtime: {} };
-            const originalQuery = window.navigator.permissions && window.navigator.permissions.query;
-            if (originalQuery) {
-              window.navigator.permissions.query = (parameters) => (
-                parameters && parameters.name === 'notifications'
-                  ? Promise.resolve({ state: Notification.permission })
-                  : originalQuery(parameters)
-              );
-            }
-            Object.defineProperty(navigator, 'plugins', { get: () => [1,2,3,4,5] });
-            Object.defineProperty(navigator, 'languages', { get: () => ['id-ID','id','en-US','en'] });
-            Object.defineProperty(navigator, 'platform', { get: () => 'Win32' });
-            Object.defineProperty(window, 'devicePixelRatio', { get: () => 1 });
-            const getParameter = WebGLRenderingContext.prototype.getParameter;
-            WebGLRenderingContext.prototype.getParameter = function(parameter) {
-              const debugInfo = this.getExtension('WEBGL_debug_renderer_info');
-              if (debugInfo) {
-                if (parameter === debugInfo.UNMASKED_VENDOR_WEBGL) return 'Intel Inc.';
-                if (parameter === debugInfo.UNMASKED_RENDERER_WEBGL) return 'Intel Iris OpenGL Engine';
-              }
-              return getParameter.apply(this, [parameter]);
-            };
-        """)
-
-        # Paksa window.open → same-tab
-        await context.add_init_script("""
-          (function(){
-            const _open = window.open;
-            window.open = function(url, name, feats){
-              try { if (url) { window.location.href = url; return window; } }
-              catch(e){}
-              return _open.apply(window, arguments);
-            };
-          })();
-        """)
+    async def stats_loop(self, interval_s=BROWSER_STATS_S):
+        if psutil is None:
+            logger.info("psutil tidak terpasang, statistik RAM/CPU browser dimatikan (pip install psutil)")
+            return
+        self.usage()  # cpu_percent pertama selalu 0, jadikan baseline
+        while True:
+            await asyncio.sleep(interval_s)
+            rss_mb, cpu, n = self.usage()
+            per_ctx = rss_mb / self._contexts if self._contexts else 0
+            logger.info(f"📊 browser={self.size} context={self._contexts} proses={n} "
+                        f"RSS={rss_mb:.0f}MB (~{per_ctx:.0f}MB/worker) CPU={cpu:.0f}%"
+                        + (f" relaunch={self.relaunches}" if self.relaunches else ""))
+
+    async def close(self):
+        self._closing = True
+        for task in self._relaunching.values():
+            task.cancel()
+        for b in self.browsers:
+            try: await b.close()
+            except Exception: pass
+        self.browsers = []
+        for cache in (self.assets, self.cascade):
+            try: cache.save_stats()
+            except OSError as e: logger.warning(f"Gagal simpan statistik {cache.label}: {e}")
+        if self._pw:
+            await self._pw.stop()
+            self._pw = None
 
+# ---------- Worker loop ----------
+async def run_worker(idx: int, pool, claims: ClaimBuffer, status: StatusWriter,
+                     browsers: BrowserPool, daemon: bool = False):
+    logger.info(f"[{WORKER_NAME}:{idx}] started")
+    _WORKER_TAG.set(f"{WORKER_NAME}:{idx}")
+    context, net = None, NetPolicy()
+    page, rows_on_page = None, 0
+    try:
         while True:
-            row = await claim_one(pool, f"{WORKER_NAME}:{idx}")
+            new_rows = claims.new_rows_event()
+            row = await claims.get()
             if not row:
+                if daemon:
+                    logger.info(f"[{WORKER_NAME}:{idx}] no more rows. menunggu NOTIFY…")
+                    await claims.wait_new_rows(new_rows)
+                    continue
                 logger.info(f"[{WORKER_NAME}:{idx}] no more rows. exiting.")
                 break
 
             id_db, idsbr = row["id"], row["idsbr"]
-            page = await context.new_page()
-            page.set_default_timeout(TIMEOUT_MS)
-            page.set_default_navigation_timeout(TIMEOUT_MS)
+            try:
+                # context baru bila browser-nya crash (BrowserPool meluncurkan ulang browser)
+                if context is None or not browsers.alive(context):
+                    if context is not None:
+                        logger.warning(f"[{WORKER_NAME}:{idx}] 💥 browser terputus, buat context baru")
+                    page = None
+                    context = await browsers.new_context(idx)
+                    await net.attach(context)
+                if page is None or page.is_closed():
+                    page = await context.new_page()
+                    page.set_default_timeout(TIMEOUT_MS)
+                    page.set_default_navigation_timeout(TIMEOUT_MS)
+                    rows_on_page = 0
+            except Exception as e:
+                # jangan matikan worker: row dikembalikan, context dibuat ulang di row berikutnya
+                status.release(id_db, f"browser_error:{str(e)[:160]}")
+                METRICS.inc("matchapro_rows_total", outcome="released")
+                logger.warning(f"[{WORKER_NAME}:{idx}] 🌐 tab/context gagal dibuat, release idsbr={idsbr}: {e}")
+                if context is not None:
+                    with contextlib.suppress(Exception):
+                        await context.close()
+                context, page = None, None
+                await asyncio.sleep(5)
+                continue
+            healthy, outcome = False, None
 
             try:
-                await process_row(page, row)
-                await mark_done(pool, id_db)
+                with step("row", idsbr):
+                    await process_row(page, row, edit_urls=status.edit_urls)
+                status.done(id_db)
+                healthy = True
+                outcome = "done"
                 logger.info(f"[{WORKER_NAME}:{idx}] ✅ done idsbr={idsbr}")
 
             except ApprovalInProgress:
-                await mark_done(pool, id_db, "approval_in_progress")
+                status.done(id_db, "approval_in_progress")
+                healthy = True
+                outcome = "approval"
                 logger.info(f"[{WORKER_NAME}:{idx}] 🟡 approval in progress -> mark done idsbr={idsbr}")
 
             except AlreadyDone:
-                await mark_done(pool, id_db, "already_submitted_cancel_present")
+                status.done(id_db, "already_submitted_cancel_present")
+                healthy = True
+                outcome = "already_done"
                 logger.info(f"[{WORKER_NAME}:{idx}] ⏩ skip (already submitted) idsbr={idsbr}")
 
             except LockedByOther:
-                await mark_locked(pool, id_db, "locked_by_other")
+                status.locked(id_db, "locked_by_other")
+                healthy = True
+                outcome = "locked"
                 logger.info(f"[{WORKER_NAME}:{idx}] 🔒 locked idsbr={idsbr}")
 
             except RetryError as e:
-                await release_to_new(pool, id_db, f"retry_timeout:{str(e)[:180]}")
+                status.release(id_db, f"retry_timeout:{str(e)[:180]}")
+                outcome = "released"
                 logger.warning(f"[{WORKER_NAME}:{idx}] ⏳ retry timeout, release idsbr={idsbr}")
 
             except InfraIssue as e:
-                await release_to_new(pool, id_db, str(e)[:180])
+                status.release(id_db, str(e)[:180])
+                outcome = "released"
                 logger.warning(f"[{WORKER_NAME}:{idx}] 🌐 infra issue, release idsbr={idsbr}: {e}")
 
             except Exception as e:
-                await mark_failed(pool, id_db, str(e)[:1000])
-                logger.error(f"[{WORKER_NAME}:{idx}] ❌ failed idsbr={idsbr} err={e}")
+                if not browsers.alive(context):
+                    # browser crash di tengah row: bukan kesalahan data, kembalikan ke antrian
+                    status.release(id_db, f"browser_disconnected:{str(e)[:160]}")
+                    outcome = "released"
+                    logger.warning(f"[{WORKER_NAME}:{idx}] 💥 browser terputus, release idsbr={idsbr}")
+                else:
+                    status.failed(id_db, str(e)[:1000])
+                    outcome = "failed"
+                    logger.error(f"[{WORKER_NAME}:{idx}] ❌ failed idsbr={idsbr} err={e}")
 
             finally:
-                await page.close()
+                if outcome:
+                    METRICS.inc("matchapro_rows_total", outcome=outcome)
+                if net.mode != "off":
+                    logger.info(f"[{WORKER_NAME}:{idx}] 🚫 net idsbr={idsbr}: {net.summary()}")
+                    net.reset()
+                rows_on_page += 1
+                # tab popup (jika edit terbuka di tab lain) tidak dipakai ulang
+                for other in context.pages:
+                    if other is not page:
+                        try: await other.close()
+                        except: pass
+                # tab baru hanya setelah N row atau setelah error
+                if not healthy or rows_on_page >= PAGE_RECYCLE_ROWS or not await return_to_landing(page):
+                    try: await page.close()
+                    except: pass
+                    page = None
+    finally:
+        if context is not None:
+            with contextlib.suppress(Exception):
+                await context.close()
 
-        await browser.close()
+# ---------- Pre-resolve URL edit ----------
+async def resolve_edit_urls(pool, browsers: BrowserPool, limit: int):
+    """
+    Isi direktori_edit_urls untuk IDSBR yang belum punya URL: search di landing
+    lalu baca href tombol edit (tanpa klik, jadi form tidak ter-lock).
+    """
+    async with pool.acquire() as c:
+        rows = await c.fetch("""
+            SELECT d.idsbr FROM direktori_ids d
+            LEFT JOIN direktori_edit_urls u ON u.idsbr = d.idsbr
+            WHERE u.edit_url IS NULL AND d.automation_status <> 'done'
+            ORDER BY d.attempt_count ASC, d.id ASC
+            LIMIT $1""", limit)
+    queue = asyncio.Queue()
+    for r in rows:
+        queue.put_nowait(r["idsbr"])
+    logger.info(f"🔗 resolve URL edit untuk {len(rows)} IDSBR")
+    store = EditUrlStore()
+    found = 0
+
+    async def flush():
+        async with pool.acquire() as c:
+            await store.flush(c)
+
+    async def one(idx):
+        nonlocal found
+        context = await browsers.new_context(idx)
+        await NetPolicy().attach(context)
+        page = await context.new_page()
+        page.set_default_timeout(TIMEOUT_MS)
+        try:
+            while not queue.empty():
+                idsbr = queue.get_nowait()
+                try:
+                    await search_idsbr(page, idsbr)
+                    href = await page.locator(SEL["edit_buttons"]).first.get_attribute("href")
+                    if href and not href.startswith(("javascript", "#")):
+                        store.remember(idsbr, urljoin(page.url, href))
+                        found += 1
+                except Exception as e:
+                    logger.warning(f"[{idsbr}] gagal resolve URL edit: {e}")
+                if store.pending >= 50:
+                    await flush()
+        finally:
+            await context.close()
+
+    await asyncio.gather(*[one(i + 1) for i in range(min(NUM_WORKERS, len(rows)))])
+    await flush()
+    logger.info(f"🔗 selesai: {found}/{len(rows)} URL edit tersimpan")
+
+# ---------- Crawl cache wilayah ----------
+async def run_crawl_wilayah(pool, browsers: BrowserPool):
+    """Isi direktori_wilayah_options untuk DKI dari endpoint cascade (sesi halaman listing, tanpa form)."""
+    if not WILAYAH_CASCADE_URL:
+        raise SystemExit("WILAYAH_CASCADE_URL belum diset (salin URL request cascade dari DevTools, "
+                         "ganti level & parent dengan {level} dan {parent}).")
+    async with pool.acquire() as c:
+        await WILAYAH_CACHE.load(c)
+    context = await browsers.new_context(1)
+    await NetPolicy().attach(context)
+    page = await context.new_page()
+    page.set_default_timeout(TIMEOUT_MS)
+    try:
+        await page.goto(BASE_URL, wait_until="domcontentloaded")
+        await crawl_wilayah(page)
+    finally:
+        await context.close()
+        async with pool.acquire() as c:
+            await WILAYAH_CACHE.flush(c)
+
+# ---------- Harvester listing (endpoint DataTables) ----------
+# State hanya dari sel kolom status (HARVEST_STATUS_COLUMN, seluruh isi sel harus cocok)
+# atau markup tombol; teks bebas baris (nama usaha, alamat, ...) tidak pernah dibaca.
+HARVEST_STATE_RULES = [
+    # (state, regex fullmatch atas teks sel status tanpa tag HTML) — urutan = prioritas
+    ("approval", re.compile(r"((menunggu|dalam\s+proses|proses)\s+)?approval", re.I)),
+    ("submitted", re.compile(r"submitted|sudah\s+(di)?submit", re.I)),
+    ("locked", re.compile(r"sedang\s+diedit.*|terkunci|locked", re.I)),
+]
+# state listing -> catatan 'done' (sama dengan hasil worker saat membuka form)
+HARVEST_DONE_NOTES = {
+    "approval": "approval_in_progress",
+    "submitted": "already_submitted_cancel_present",
+}
+TAG_RE = re.compile(r"<[^>]+>")
+EDIT_TAG_RE = re.compile(r"<a\b[^>]*\bbtn-edit-perusahaan\b[^>]*>", re.I)
+CANCEL_TAG_RE = re.compile(r"<(?:a|button)\b[^>]*\bcancel-submit[\w-]*[^>]*>", re.I)   # = SEL["cancel_submit"]
+HREF_RE = re.compile(r"""\b(?:href|data-url)\s*=\s*["']([^"']+)["']""", re.I)
+
+# Kandidat yang akan ditandai 'done' oleh --harvest-mark-done (dilaporkan saja tanpa flag)
+HARVEST_DONE_CANDIDATES_SQL = """
+SELECT u.listing_state, COUNT(*) AS n, (array_agg(d.idsbr ORDER BY d.idsbr))[1:5] AS contoh
+FROM direktori_ids d
+JOIN direktori_edit_urls u ON u.idsbr = d.idsbr
+WHERE u.listing_state = ANY($1::text[])
+  AND d.automation_status = 'new'
+  AND u.harvested_at >= $2
+GROUP BY u.listing_state
+ORDER BY u.listing_state
+"""
+
+async def capture_datatable_request(page):
+    """Picu 1 request DataTables lewat UI (filter kosong) dan kembalikan request-nya sebagai template."""
+    await ensure_logged_in(page)
+    await page.fill(SEL["search_input"], "")
+    async with page.expect_response(_is_datatable_xhr, timeout=TIMEOUT_MS) as resp_info:
+        await page.click(SEL["btn_filter"])
+    return (await resp_info.value).request
+
+def _with_paging(params: str, start: int, length: int, draw: int) -> str:
+    q = [(k, v) for k, v in parse_qsl(params, keep_blank_values=True)
+         if k not in ("start", "length", "draw")]
+    q += [("draw", str(draw)), ("start", str(start)), ("length", str(length))]
+    return urlencode(q)
+
+def _parse_listing_row(raw, wanted: set[str]):
+    """
+    Satu baris JSON DataTables -> (idsbr, edit_url|None, state) atau None bila
+    IDSBR tidak ada di direktori_ids. Baris bisa berupa list sel atau dict kolom.
+    """
+    cells = list(raw.values()) if isinstance(raw, dict) else list(raw)
+    cells = [to_str(c) for c in cells]
+    idsbr = None
+    if isinstance(raw, dict):
+        idsbr = next((to_str(v).strip() for k, v in raw.items() if "idsbr" in str(k).lower()), None)
+    if idsbr not in wanted:
+        idsbr = next((t for t in (TAG_RE.sub("", c).strip() for c in cells) if t in wanted), None)
+    if not idsbr:
+        return None
+    edit_url = None
+    for c in cells:
+        tag = EDIT_TAG_RE.search(c)
+        href = HREF_RE.search(tag.group(0)) if tag else None
+        if href and not href.group(1).startswith(("javascript", "#")):
+            edit_url = urljoin(BASE_URL, href.group(1)); break
+    state = "open"
+    status_cell = _listing_status_cell(raw)
+    if status_cell is not None:
+        text = " ".join(TAG_RE.sub(" ", status_cell).split())
+        state = next((name for name, rx in HARVEST_STATE_RULES if rx.fullmatch(text)), "open")
+    if state == "open" and any(CANCEL_TAG_RE.search(c) for c in cells):
+        state = "submitted"
+    return idsbr, edit_url, state
+
+def _listing_status_cell(raw):
+    """Isi sel HARVEST_STATUS_COLUMN (key untuk baris dict, indeks untuk baris list); None bila tidak diset/tidak ada."""
+    col = HARVEST_STATUS_COLUMN
+    if not col:
+        return None
+    if isinstance(raw, dict):
+        return to_str(raw[col]) if col in raw else None
+    if col.lstrip("-").isdigit() and -len(raw) <= int(col) < len(raw):
+        return to_str(raw[int(col)])
+    return None
+
+def _listing_total(body: dict) -> int | None:
+    """recordsFiltered (atau recordsTotal / nama DataTables lama) sebagai int; None bila tidak ada."""
+    for key in ("recordsFiltered", "iTotalDisplayRecords", "recordsTotal", "iTotalRecords"):
+        try:
+            return int(body[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+async def harvest_listing(pool, browsers: BrowserPool, page_len: int = HARVEST_PAGE_LEN,
+                          mark_done: bool = False):
+    """
+    Panggil endpoint DataTables langsung (page.request, sesi storage_state) dengan
+    page length besar untuk seluruh wilayah akun, simpan URL edit + state listing
+    ke direktori_edit_urls. Baris 'new' yang sudah approval/submit hanya dilaporkan;
+    dengan mark_done (--harvest-mark-done) baris itu ditandai 'done' sehingga worker
+    tidak perlu membuka form-nya.
+    """
+    async with pool.acquire() as c:
+        started = await c.fetchval("SELECT LOCALTIMESTAMP")   # harvested_at bertipe TIMESTAMP (tanpa zona)
+        wanted = {r["idsbr"] for r in await c.fetch(
+            "SELECT idsbr FROM direktori_ids WHERE automation_status <> 'done'")}
+    logger.info(f"🌾 harvest listing untuk {len(wanted)} IDSBR yang belum done")
+
+    context = await browsers.new_context(1)
+    await NetPolicy().attach(context)
+    page = await context.new_page()
+    page.set_default_timeout(TIMEOUT_MS)
+    t0 = time.perf_counter()
+    seen, states = 0, {}
+    try:
+        tpl = await capture_datatable_request(page)
+        headers = {k: v for k, v in tpl.headers.items()
+                   if not k.startswith(":") and k.lower() not in ("content-length", "cookie", "host")}
+        is_post = tpl.method.upper() == "POST"
+        parts = urlsplit(tpl.url)
+        start, draw = 0, 1
+        while True:
+            draw += 1
+            if is_post:
+                resp = await page.request.post(tpl.url, headers=headers,
+                                               data=_with_paging(tpl.post_data or "", start, page_len, draw))
+            else:
+                url = urlunsplit(parts._replace(query=_with_paging(parts.query, start, page_len, draw)))
+                resp = await page.request.get(url, headers=headers)
+            if not resp.ok:
+                raise InfraIssue(f"DataTables HTTP {resp.status} pada start={start}")
+            body = await resp.json()
+            data = body.get("data") or body.get("aaData") or []
+            total = _listing_total(body)      # None: halaman terus sampai respons kosong
+
+            batch = [r for r in (_parse_listing_row(raw, wanted) for raw in data) if r]
+            if batch:
+                async with pool.acquire() as c:
+                    await c.execute("""
+                        INSERT INTO direktori_edit_urls (idsbr, edit_url, listing_state, harvested_at, resolved_at)
+                        SELECT v.idsbr, v.url, v.state, NOW(), NOW()
+                        FROM unnest($1::text[], $2::text[], $3::text[]) AS v(idsbr, url, state)
+                        ON CONFLICT (idsbr) DO UPDATE SET
+                          edit_url = COALESCE(EXCLUDED.edit_url, direktori_edit_urls.edit_url),
+                          listing_state = EXCLUDED.listing_state,
+                          harvested_at = NOW(),
+                          resolved_at = CASE WHEN EXCLUDED.edit_url IS NULL
+                                             THEN direktori_edit_urls.resolved_at ELSE NOW() END
+                    """, [b[0] for b in batch], [b[1] for b in batch], [b[2] for b in batch])
+            for _, _, st in batch:
+                states[st] = states.get(st, 0) + 1
+            seen += len(data)
+            logger.info(f"🌾 {start + len(data)}/{'?' if total is None else total} baris listing, "
+                        f"{len(batch)} cocok")
+            if not data:
+                break
+            start += len(data)      # server boleh membatasi length (mis. maks 100)
+            if total is not None and start >= total:
+                break
+    finally:
+        await context.close()
+
+    summary = ", ".join(f"{k}={v}" for k, v in sorted(states.items())) or "-"
+    logger.info(f"🌾 selesai dalam {time.perf_counter() - t0:.1f}s: {seen} baris listing | {summary}")
+    if HARVEST_STATUS_COLUMN == "":
+        logger.info("🌾 HARVEST_STATUS_COLUMN kosong: state hanya dari tombol cancel submit (approval tidak terdeteksi)")
+
+    async with pool.acquire() as c:
+        if not mark_done:
+            rows = await c.fetch(HARVEST_DONE_CANDIDATES_SQL, list(HARVEST_DONE_NOTES), started)
+            for r in rows:
+                logger.info(f"🌾 {r['n']} baris 'new' berstate {r['listing_state']} di listing, "
+                            f"contoh: {', '.join(r['contoh'])}")
+            if rows:
+                logger.info("🌾 dry-run: status tidak diubah; cek contoh di situs lalu jalankan "
+                            "--harvest --harvest-mark-done untuk menandainya 'done'")
+            return
+        skipped = await c.fetch("""
+            UPDATE direktori_ids d
+            SET automation_status = 'done',
+                error = n.note,
+                lease_expires_at = NULL,
+                last_updated = NOW()
+            FROM direktori_edit_urls u
+            JOIN unnest($1::text[], $2::text[]) AS n(state, note) ON n.state = u.listing_state
+            WHERE u.idsbr = d.idsbr
+              AND d.automation_status = 'new'
+              AND u.harvested_at >= $3
+            RETURNING d.id
+        """, list(HARVEST_DONE_NOTES), list(HARVEST_DONE_NOTES.values()), started)
+    logger.info(f"🌾 {len(skipped)} baris ditandai done tanpa membuka form")
 
 # ---------- DEBUG MODE (single IDsBR) ----------
 async def get_pool_oneoff():
@@ -1260,16 +3182,7 @@ async def run_debug_single(idsbr: int | str, slowmo: int = 200, devtools: bool =
             locale="id-ID",
             timezone_id="Asia/Jakarta",
         )
-        await context.add_init_script("""
-          (function(){
-            const _open = window.open;
-            window.open = function(url, name, feats){
-              try { if (url) { window.location.href = url; return window; } }
-              catch(e){}
-              return _open.apply(window, arguments);
-            };
-          })();
-        """)
+        await context.add_init_script(SAME_TAB_JS)
         page = await context.new_page()
         page.set_default_timeout(TIMEOUT_MS)
         page.set_default_navigation_timeout(TIMEOUT_MS)
@@ -1300,10 +3213,28 @@ def parse_args():
     ap.add_argument("--debug-idsbr", type=str, help="Jalankan 1 IDsBR (headful) untuk melihat seluruh tahapan")
     ap.add_argument("--slowmo", type=int, default=200, help="Delay ms antar aksi saat debug (default 200)")
     ap.add_argument("--devtools", action="store_true", help="Buka DevTools saat debug")
+    ap.add_argument("--daemon", action="store_true", default=DAEMON,
+                    help="Jangan exit saat antrian kosong; tunggu NOTIFY dari importer/requeue")
+    ap.add_argument("--resolve-edit-urls", type=int, metavar="N",
+                    help="Pre-resolve URL edit untuk N IDSBR yang belum punya, lalu keluar")
+    ap.add_argument("--harvest", action="store_true",
+                    help="Tarik listing DataTables (URL edit + status approval/submit) ke DB, lalu keluar")
+    ap.add_argument("--harvest-mark-done", action="store_true",
+                    help="Dengan --harvest: tandai 'done' baris 'new' yang approval/submit di listing "
+                         "(tanpa flag hanya dilaporkan)")
+    ap.add_argument("--crawl-wilayah", action="store_true",
+                    help="Isi cache value option wilayah DKI dari endpoint cascade (WILAYAH_CASCADE_URL), lalu keluar")
+    ap.add_argument("--fuzzy-report", action="store_true",
+                    help="Tampilkan pemetaan nilai badan usaha/jaringan usaha DB -> pilihan form, lalu keluar")
+    ap.add_argument("--cache-report", action="store_true", help="Tampilkan isi & hit-rate asset cache lalu keluar")
     return ap.parse_args()
 
 async def main():
     args = parse_args()
+    if args.cache_report:
+        print_asset_cache_report()
+        print_asset_cache_report(CascadeCache().root)
+        return
     missing = [k for k,v in {"PGHOST":PGHOST,"PGDATABASE":PGDATABASE,"PGUSER":PGUSER,"PGPASSWORD":PGPASSWORD}.items() if not v]
     if missing: raise RuntimeError(f"ENV kurang: {', '.join(missing)}")
 
@@ -1311,10 +3242,64 @@ async def main():
         await run_debug_single(args.debug_idsbr, slowmo=args.slowmo, devtools=args.devtools)
         return
 
+    if args.fuzzy_report:
+        pool = await get_pool()
+        try: await fuzzy_precheck(pool, verbose=True)
+        finally: await pool.close()
+        return
+
+    if not os.path.exists(STORAGE_STATE):
+        logger.error(f"Storage state '{STORAGE_STATE}' tidak ditemukan. Jalankan login recorder dulu.")
+        return
+
     pool = await get_pool()
+    browsers = BrowserPool()
+
+    if args.resolve_edit_urls or args.harvest or args.crawl_wilayah:
+        try:
+            await browsers.start()
+            if args.crawl_wilayah:
+                await run_crawl_wilayah(pool, browsers)
+            elif args.harvest:
+                await harvest_listing(pool, browsers, mark_done=args.harvest_mark_done)
+            else:
+                await resolve_edit_urls(pool, browsers, args.resolve_edit_urls)
+        finally:
+            await browsers.close()
+            await pool.close()
+        return
+
+    claims = ClaimBuffer(pool, WORKER_NAME)
+    async with pool.acquire() as c:
+        await WILAYAH_CACHE.load(c)
+        unvalidated = await c.fetchval(
+            "SELECT COUNT(*) FROM direktori_ids WHERE automation_status = 'new' AND validation_status IS NULL")
+    if unvalidated:
+        logger.warning(f"🔎 {unvalidated} baris 'new' belum divalidasi dan tidak akan diklaim; jalankan validate.py")
+    await fuzzy_precheck(pool)
+    status = StatusWriter(pool, claims=claims, edit_urls=EditUrlStore(), wilayah=WILAYAH_CACHE,
+                          timings=TIMINGS)
+    status.start()
+    METRICS.collector(worker_collector(pool, claims, status, browsers))
+    await METRICS.start()
+    bg = [asyncio.create_task(claims.heartbeat_loop())]
+    if REAP_INTERVAL_S > 0:
+        bg.append(asyncio.create_task(reaper_loop(pool)))
     try:
-        await asyncio.gather(*[run_worker(i+1, pool) for i in range(NUM_WORKERS)])
+        await browsers.start()
+        bg.append(asyncio.create_task(browsers.stats_loop()))
+        if args.daemon:
+            await claims.listen()
+        await asyncio.gather(*[run_worker(i+1, pool, claims, status, browsers, args.daemon)
+                               for i in range(NUM_WORKERS)])
     finally:
+        for t in bg: t.cancel()
+        await asyncio.gather(*bg, return_exceptions=True)
+        await METRICS.close()
+        await status.close()
+        try: await claims.release()
+        except Exception as e: logger.error(f"Gagal mengembalikan baris prefetch: {e}")
+        await browsers.close()
         await pool.close()
 
 if __name__ == "__main__":